@@ -10,6 +10,8 @@ from flask_login import LoginManager
 from flask_migrate import Migrate
 from config import Config
 from .models import db
+from .utils.profiler import sql_profiler
+from .utils.metrics import metrics
 
 # 初始化扩展
 login_manager = LoginManager()
@@ -24,6 +26,8 @@ def create_app(config_class=Config):
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
+    sql_profiler.init_app(app)
+    metrics.init_app(app)
     
     # 配置登录管理器
     login_manager.login_view = 'auth.login'
@@ -37,6 +41,7 @@ def create_app(config_class=Config):
     from .routes.shift import shift_bp
     from .routes.logs import logs_bp
     from .routes.api import api_bp
+    from .routes.metrics import metrics_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(main_bp)
@@ -44,10 +49,13 @@ def create_app(config_class=Config):
     app.register_blueprint(shift_bp)
     app.register_blueprint(logs_bp)
     app.register_blueprint(api_bp)
+    app.register_blueprint(metrics_bp)
     
-    # 创建数据库表
+    # 创建数据库表，并为已有数据库补齐唯一索引
     with app.app_context():
+        from .utils.schema import ensure_schema
         db.create_all()
+        ensure_schema()
         init_default_data()
     
     return app
@@ -90,6 +98,7 @@ def init_default_data():
         {'key': 'no_work_url', 'value': '', 'description': '下班提醒URL'},
         {'key': 'work_overtime', 'value': '0', 'description': '加班时间(分钟)'},
         {'key': 'reminder_enabled', 'value': 'true', 'description': '是否启用提醒功能'},
+        {'key': 'webhook_secret', 'value': '', 'description': '打卡事件webhook签名密钥'},
     ]
     
     for config_data in default_configs:
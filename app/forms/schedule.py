@@ -6,10 +6,11 @@
 """
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, DateField, TextAreaField, BooleanField, SubmitField, IntegerField
+from flask_wtf.file import FileField, FileRequired, FileAllowed
+from wtforms import SelectField, SelectMultipleField, DateField, TextAreaField, BooleanField, SubmitField, IntegerField
 from wtforms.validators import DataRequired, Optional, ValidationError
 from datetime import date
-from ..models import User, ShiftType
+from ..utils.lookups import lookup_cache
 
 class ScheduleForm(FlaskForm):
     """排班表单"""
@@ -24,13 +25,11 @@ class ScheduleForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(ScheduleForm, self).__init__(*args, **kwargs)
         # 动态加载用户选项
-        self.user_id.choices = [(user.id, user.username) for user in 
-                               User.query.filter_by(is_active=True).order_by(User.username).all()]
+        self.user_id.choices = lookup_cache.user_choices()
         self.user_id.choices.insert(0, (0, '请选择用户'))
         
         # 动态加载班次类型选项
-        self.shift_type_id.choices = [(shift.id, f"{shift.name} ({shift.start_time}-{shift.end_time})") 
-                                     for shift in ShiftType.query.filter_by(is_active=True).order_by(ShiftType.name).all()]
+        self.shift_type_id.choices = lookup_cache.shift_type_choices()
         self.shift_type_id.choices.insert(0, (0, '请选择班次类型'))
     
     def validate_work_date(self, work_date):
@@ -38,9 +37,9 @@ class ScheduleForm(FlaskForm):
         if work_date.data < date.today():
             raise ValidationError('工作日期不能早于今天')
     
-    def validate(self):
+    def validate(self, extra_validators=None):
         """自定义验证"""
-        if not super(ScheduleForm, self).validate():
+        if not super(ScheduleForm, self).validate(extra_validators):
             return False
         
         # 检查休息日是否选择了班次类型
@@ -56,8 +55,8 @@ class ScheduleForm(FlaskForm):
         return True
 
 class BatchScheduleForm(FlaskForm):
-    """批量排班表单"""
-    user_id = SelectField('用户', coerce=int, validators=[DataRequired(message='请选择用户')])
+    """批量排班表单（支持一次选择多个用户）"""
+    user_ids = SelectMultipleField('用户', coerce=int, validators=[DataRequired(message='请选择用户')])
     start_date = DateField('开始日期', validators=[DataRequired(message='请选择开始日期')])
     end_date = DateField('结束日期', validators=[DataRequired(message='请选择结束日期')])
     shift_type_id = SelectField('班次类型', coerce=int, validators=[DataRequired(message='请选择班次类型')])
@@ -68,13 +67,10 @@ class BatchScheduleForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(BatchScheduleForm, self).__init__(*args, **kwargs)
         # 动态加载用户选项
-        self.user_id.choices = [(user.id, user.username) for user in 
-                               User.query.filter_by(is_active=True).order_by(User.username).all()]
-        self.user_id.choices.insert(0, (0, '请选择用户'))
+        self.user_ids.choices = lookup_cache.user_choices()
         
         # 动态加载班次类型选项
-        self.shift_type_id.choices = [(shift.id, f"{shift.name} ({shift.start_time}-{shift.end_time})") 
-                                     for shift in ShiftType.query.filter_by(is_active=True).order_by(ShiftType.name).all()]
+        self.shift_type_id.choices = lookup_cache.shift_type_choices()
         self.shift_type_id.choices.insert(0, (0, '请选择班次类型'))
     
     def validate_start_date(self, start_date):
@@ -91,9 +87,9 @@ class BatchScheduleForm(FlaskForm):
         if (end_date.data - self.start_date.data).days > 365:
             raise ValidationError('日期范围不能超过一年')
     
-    def validate(self):
+    def validate(self, extra_validators=None):
         """自定义验证"""
-        if not super(BatchScheduleForm, self).validate():
+        if not super(BatchScheduleForm, self).validate(extra_validators):
             return False
         
         # 检查日期范围
@@ -106,6 +102,9 @@ class BatchScheduleForm(FlaskForm):
 
 class ScheduleImportForm(FlaskForm):
     """排班导入表单"""
-    file = StringField('文件名', validators=[DataRequired(message='请选择文件')])
+    file = FileField('排班文件', validators=[
+        FileRequired(message='请选择文件'),
+        FileAllowed(['csv', 'xlsx'], message='仅支持CSV或XLSX文件')
+    ])
     
     submit = SubmitField('导入', render_kw={'class': 'btn btn-primary'})
\ No newline at end of file
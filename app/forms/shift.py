@@ -6,8 +6,8 @@
 """
 
 from flask_wtf import FlaskForm
-from wtforms import StringField, TimeField, TextAreaField, SubmitField, ColorField
-from wtforms.validators import DataRequired, Length, ValidationError
+from wtforms import StringField, TimeField, TextAreaField, SubmitField, ColorField, IntegerField
+from wtforms.validators import DataRequired, Length, ValidationError, Optional, NumberRange
 from datetime import datetime
 
 class ShiftTypeForm(FlaskForm):
@@ -31,13 +31,39 @@ class ShiftTypeForm(FlaskForm):
         Length(max=500, message='描述长度不能超过500个字符')
     ], render_kw={'class': 'form-control', 'rows': 3, 'placeholder': '请输入班次描述（可选）'})
     
+    min_staff = IntegerField('最少人数', validators=[
+        Optional(),
+        NumberRange(min=0, message='人数不能为负数')
+    ], render_kw={'class': 'form-control', 'placeholder': '不限'})
+    
+    max_staff = IntegerField('最多人数', validators=[
+        Optional(),
+        NumberRange(min=0, message='人数不能为负数')
+    ], render_kw={'class': 'form-control', 'placeholder': '不限'})
+    
     submit = SubmitField('保存', render_kw={'class': 'btn btn-primary'})
     
+    def __init__(self, *args, **kwargs):
+        super(ShiftTypeForm, self).__init__(*args, **kwargs)
+        # 班次时间以 'HH:MM' 字符串保存，编辑时转换为 time 供 TimeField 渲染
+        for field in (self.start_time, self.end_time):
+            if isinstance(field.data, str):
+                try:
+                    field.data = datetime.strptime(field.data, '%H:%M').time()
+                except ValueError:
+                    field.data = None
+    
+    def validate_max_staff(self, max_staff):
+        """验证最多人数不能少于最少人数"""
+        if max_staff.data is not None and self.min_staff.data is not None:
+            if max_staff.data < self.min_staff.data:
+                raise ValidationError('最多人数不能少于最少人数')
+    
     def validate_end_time(self, end_time):
-        """验证结束时间必须晚于开始时间"""
+        """验证结束时间不能等于开始时间（早于开始时间视为跨零点的夜班）"""
         if self.start_time.data and end_time.data:
-            if end_time.data <= self.start_time.data:
-                raise ValidationError('结束时间必须晚于开始时间')
+            if end_time.data == self.start_time.data:
+                raise ValidationError('结束时间不能与开始时间相同')
     
     def validate_name(self, name):
         """验证班次名称格式"""
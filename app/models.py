@@ -6,13 +6,15 @@
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, time
 import json
 
 db = SQLAlchemy()
 
-class User(db.Model):
+class User(UserMixin, db.Model):
     """用户表"""
     __tablename__ = 'users'
     
@@ -28,6 +30,7 @@ class User(db.Model):
     # 关联关系
     schedules = db.relationship('Schedule', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     logs = db.relationship('SystemLog', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    calendar_feed = db.relationship('CalendarFeed', backref='user', uselist=False, cascade='all, delete-orphan')
     
     def set_password(self, password):
         """设置密码哈希"""
@@ -57,8 +60,12 @@ class ShiftType(db.Model):
     name = db.Column(db.String(50), unique=True, nullable=False)  # 班次名称
     start_time = db.Column(db.String(5), nullable=False)  # 开始时间 (HH:MM)
     end_time = db.Column(db.String(5), nullable=False)  # 结束时间 (HH:MM)
+    start_minute = db.Column(db.Integer, nullable=True)  # 开始时间（当天第几分钟，随 start_time 维护）
+    end_minute = db.Column(db.Integer, nullable=True)  # 结束时间（当天第几分钟，随 end_time 维护）
     color = db.Column(db.String(7), default='#3498db', nullable=False)  # 显示颜色
     description = db.Column(db.Text, nullable=True)  # 班次描述
+    min_staff = db.Column(db.Integer, nullable=True)  # 每天最少在岗人数
+    max_staff = db.Column(db.Integer, nullable=True)  # 每天最多在岗人数
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -75,14 +82,42 @@ class ShiftType(db.Model):
             'end_time': self.end_time,
             'color': self.color,
             'description': self.description,
+            'min_staff': self.min_staff,
+            'max_staff': self.max_staff,
             'is_active': self.is_active,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
+def time_to_minute(value):
+    """'HH:MM'（或 datetime.time）转换为当天第几分钟，格式不正确时返回None"""
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    try:
+        hour, minute = value.split(':')
+        hour, minute = int(hour), int(minute)
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour * 60 + minute
+
+@event.listens_for(ShiftType.start_time, 'set')
+def _set_start_minute(target, value, oldvalue, initiator):
+    """修改开始时间时同步 start_minute"""
+    target.start_minute = time_to_minute(value)
+
+@event.listens_for(ShiftType.end_time, 'set')
+def _set_end_minute(target, value, oldvalue, initiator):
+    """修改结束时间时同步 end_minute"""
+    target.end_minute = time_to_minute(value)
+
 class Schedule(db.Model):
     """排班表"""
     __tablename__ = 'schedules'
+    __table_args__ = (
+        db.Index('uq_schedules_user_date', 'user_id', 'work_date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -118,6 +153,11 @@ class Schedule(db.Model):
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
+@event.listens_for(Schedule.work_date, 'set', active_history=True)
+@event.listens_for(Schedule.user_id, 'set', active_history=True)
+def _load_schedule_previous_value(target, value, oldvalue, initiator):
+    """修改日期或用户时总是加载原值，使 flush 时能取到修改前的日期/用户（用于缓存失效和覆盖率刷新）"""
+
 class SystemConfig(db.Model):
     """系统配置表"""
     __tablename__ = 'system_configs'
@@ -167,9 +207,75 @@ class SystemLog(db.Model):
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
+class CacheVersion(db.Model):
+    """缓存版本表
+
+    各进程的本地缓存以此处的版本号判断是否失效，写操作递增版本号。
+    """
+    __tablename__ = 'cache_versions'
+    
+    name = db.Column(db.String(100), primary_key=True)  # 缓存命名空间
+    version = db.Column(db.Integer, default=0, nullable=False)  # 版本号
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+class CalendarFeed(db.Model):
+    """日历订阅表"""
+    __tablename__ = 'calendar_feeds'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), unique=True, nullable=False)
+    token = db.Column(db.String(64), unique=True, nullable=False, index=True)  # 订阅令牌
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+class ShiftCoverage(db.Model):
+    """班次每日在岗人数汇总表（由排班变更增量维护）"""
+    __tablename__ = 'shift_coverage'
+    
+    work_date = db.Column(db.Date, primary_key=True)
+    shift_type_id = db.Column(db.Integer, primary_key=True)  # 派生数据，不设外键，随排班刷新
+    headcount = db.Column(db.Integer, default=0, nullable=False)
+
+class ShiftReminderWindow(db.Model):
+    """班次打卡提醒时间窗口表（由班次和加班时间配置派生）
+
+    分钟数相对于排班日期 00:00，可小于0（前一天）或大于等于1440（跨零点到次日）。
+    """
+    __tablename__ = 'shift_reminder_windows'
+    
+    shift_type_id = db.Column(db.Integer, primary_key=True)  # 派生数据，不设外键，随班次刷新
+    check_in_from = db.Column(db.Integer, nullable=False)  # 上班提醒开始（含）
+    check_in_to = db.Column(db.Integer, nullable=False)  # 上班提醒结束（不含），即上班时间
+    check_out_from = db.Column(db.Integer, nullable=False)  # 下班提醒开始（含），即下班时间加加班时间
+    check_out_to = db.Column(db.Integer, nullable=False)  # 下班提醒结束（含）
+
+class ReminderJob(db.Model):
+    """打卡提醒任务表（由排班和提醒窗口物化，调度器按 due_at 认领）"""
+    __tablename__ = 'reminder_jobs'
+    __table_args__ = (
+        db.Index('uq_reminder_jobs_user_date_kind', 'user_id', 'work_date', 'kind', unique=True),
+        db.Index('ix_reminder_jobs_state_due', 'state', 'due_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, nullable=False)  # 派生数据，不设外键，随排班同步
+    work_date = db.Column(db.Date, nullable=False)  # 排班日期
+    shift_type_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # check_in / check_out
+    due_at = db.Column(db.DateTime, nullable=False)  # 提醒时间
+    expire_at = db.Column(db.DateTime, nullable=False)  # 过期时间（不含），之后不再提醒
+    state = db.Column(db.String(20), default='pending', nullable=False)  # pending/claimed/sent/skipped/expired/cancelled
+    claim_token = db.Column(db.String(32), nullable=True)  # 认领批次标识
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
 class AttendanceRecord(db.Model):
     """考勤记录表"""
     __tablename__ = 'attendance_records'
+    __table_args__ = (
+        db.Index('uq_attendance_user_date', 'user_id', 'work_date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -182,6 +288,10 @@ class AttendanceRecord(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
+    # 关联关系
+    user = db.relationship('User')
+    shift_type = db.relationship('ShiftType')
+    
     def to_dict(self):
         """转换为字典格式"""
         return {
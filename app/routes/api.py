@@ -9,9 +9,16 @@ API路由模块
 from flask import Blueprint, jsonify, request
 from flask_login import login_required, current_user
 from datetime import datetime
-from ..models import db, User, ShiftType, Schedule, SystemConfig
+from sqlalchemy import text
+from ..models import db, Schedule, SystemConfig, SystemLog
 from ..utils.decorators import admin_required
 from ..utils.scheduler import scheduler
+from ..utils.bulk_schedule import bulk_schedule_operation, BulkScheduleError, ACTIONS
+from ..utils.coverage import analyze_coverage, CoverageError
+from ..utils.serializers import json_response
+from ..utils.lookups import lookup_cache
+from ..utils.clock_events import ingest_clock_events, verify_signature, ClockEventError, WebhookSignatureError
+from .schedule import log_schedule_action, json_flag
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -20,10 +27,9 @@ api_bp = Blueprint('api', __name__, url_prefix='/api')
 def get_users():
     """获取用户列表"""
     try:
-        users = User.query.filter_by(is_active=True).order_by(User.username).all()
-        return jsonify({
+        return json_response({
             'success': True,
-            'data': [user.to_dict() for user in users]
+            'data': lookup_cache.active_users()
         })
     except Exception as e:
         return jsonify({
@@ -36,10 +42,9 @@ def get_users():
 def get_shift_types():
     """获取班次类型列表"""
     try:
-        shifts = ShiftType.query.filter_by(is_active=True).order_by(ShiftType.name).all()
-        return jsonify({
+        return json_response({
             'success': True,
-            'data': [shift.to_dict() for shift in shifts]
+            'data': lookup_cache.active_shift_types()
         })
     except Exception as e:
         return jsonify({
@@ -159,6 +164,133 @@ def stop_scheduler():
             'message': f'停止定时任务失败: {str(e)}'
         })
 
+@api_bp.route('/schedules/bulk', methods=['POST', 'PATCH', 'DELETE'])
+@login_required
+@admin_required
+def bulk_schedules():
+    """批量创建(POST)/更新(PATCH)/删除(DELETE)排班
+
+    请求体为操作数组，或 {"items": [...], "atomic": true}：
+    - POST: [{"user_id"|"username", "work_date", "shift_type_id"|"shift_name", "is_rest_day", "note"}]
+    - PATCH: [{"id", 需要修改的字段...}]
+    - DELETE: [id, ...] 或 [{"id"}]
+    atomic 默认为 true，任一项失败则全部不写入；为 false 时写入通过校验的项。
+    返回逐项结果，并记录一条汇总操作日志。
+    """
+    action = {'POST': 'create', 'PATCH': 'update', 'DELETE': 'delete'}[request.method]
+    try:
+        data = request.get_json(silent=True)
+        if isinstance(data, dict):
+            items = data.get('items')
+            try:
+                atomic = json_flag(data, 'atomic', True)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)})
+        else:
+            items = data
+            atomic = True
+        
+        report = bulk_schedule_operation(action, items, atomic=atomic)
+        log_schedule_action(f'bulk_{action}_schedule',
+                            f'用户 {current_user.username} 通过API批量{ACTIONS[action]}排班: '
+                            f'共 {report["total"]} 项，成功 {report["succeeded"]} 项，失败 {report["failed"]} 项',
+                            'INFO' if not report['failed'] else 'WARNING')
+        
+        return jsonify({
+            'success': report['failed'] == 0,
+            'data': report
+        })
+    except BulkScheduleError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'批量{ACTIONS[action]}排班失败: {str(e)}'
+        })
+
+@api_bp.route('/attendance/events', methods=['POST'])
+def attendance_events():
+    """接收打卡事件 webhook（钉钉回调转发或本地替代服务）
+
+    请求头 X-Timestamp 为Unix时间戳，X-Signature 为 HMAC-SHA256(webhook_secret, 时间戳 + '.' + 请求体)
+    的十六进制摘要（可带 sha256= 前缀）。
+    请求体为事件数组或 {"events": [...]}，事件格式：
+    {"user_id"|"username", "type": "clock_in"|"clock_out", "time": "YYYY-MM-DD HH:MM:SS", "work_date": 可选}
+    """
+    try:
+        body = request.get_data()
+        verify_signature(body, request.headers.get('X-Timestamp'), request.headers.get('X-Signature'))
+    except WebhookSignatureError as e:
+        return jsonify({'success': False, 'message': str(e)}), 401
+    
+    try:
+        data = request.get_json(silent=True)
+        events = data.get('events') if isinstance(data, dict) else data
+        report = ingest_clock_events(events)
+        db.session.commit()
+        
+        if report['rejected']:
+            db.session.add(SystemLog(
+                log_type='attendance_events',
+                log_level='WARNING',
+                message=f'打卡事件 {report["received"]} 个，其中 {report["rejected"]} 个无效',
+                ip_address=request.remote_addr,
+                user_agent=request.headers.get('User-Agent', '')[:200]
+            ))
+            db.session.commit()
+        
+        return jsonify({
+            'success': report['rejected'] == 0,
+            'data': report
+        })
+    except ClockEventError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'接收打卡事件失败: {str(e)}'}), 500
+
+@api_bp.route('/coverage')
+@login_required
+def get_coverage():
+    """获取排班覆盖率：日期 × 班次在岗人数，以及缺员和超编明细
+
+    参数 start_date、end_date（YYYY-MM-DD，闭区间），默认为本月。
+    """
+    try:
+        from datetime import date, timedelta
+        
+        today = date.today()
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        try:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else today.replace(day=1)
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else \
+                (start_date.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': '日期格式无效'
+            })
+        
+        return jsonify({
+            'success': True,
+            'data': analyze_coverage(start_date, end_date)
+        })
+    except CoverageError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取排班覆盖率失败: {str(e)}'
+        })
+
 @api_bp.route('/dashboard/stats')
 @login_required
 def get_dashboard_stats():
@@ -216,7 +348,10 @@ def get_dashboard_stats():
 def test_notification():
     """测试通知功能"""
     try:
-        from ..utils.notification import notification_service
+        from ..utils.notification import NotificationService
+        
+        # 每个请求使用独立实例，HTTP会话不在请求线程间共享
+        notification_service = NotificationService()
         
         data = request.get_json()
         message = data.get('message', '测试通知消息')
@@ -244,7 +379,7 @@ def health_check():
     """健康检查接口"""
     try:
         # 检查数据库连接
-        db.session.execute('SELECT 1')
+        db.session.execute(text('SELECT 1'))
         
         return jsonify({
             'status': 'healthy',
@@ -5,11 +5,13 @@
 确保中文字符编码正确处理
 """
 
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from ..models import db, SystemLog, AttendanceRecord
 from ..utils.decorators import admin_required
+from ..utils.serializers import system_log_serializer, attendance_serializer, json_response
+from ..utils.profiler import sql_profiler, PROFILE_HEADER
 
 logs_bp = Blueprint('logs', __name__, url_prefix='/logs')
 
@@ -35,14 +37,14 @@ def list_system_logs():
         end_date = request.args.get('end_date')
         
         # 构建查询
-        query = SystemLog.query
+        query = system_log_serializer.query()
         
         # 过滤条件
         if log_type:
-            query = query.filter_by(log_type=log_type)
+            query = query.filter(SystemLog.log_type == log_type)
         
         if log_level:
-            query = query.filter_by(log_level=log_level)
+            query = query.filter(SystemLog.log_level == log_level)
         
         if start_date:
             try:
@@ -64,7 +66,7 @@ def list_system_logs():
         
         # 转换为JSON格式
         data = {
-            'logs': [log.to_dict() for log in logs.items],
+            'logs': system_log_serializer.dump_rows(logs.items),
             'pagination': {
                 'page': logs.page,
                 'pages': logs.pages,
@@ -77,7 +79,7 @@ def list_system_logs():
             }
         }
         
-        return jsonify({'success': True, 'data': data})
+        return json_response({'success': True, 'data': data})
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取系统日志失败: {str(e)}'})
 
@@ -102,11 +104,11 @@ def list_attendance_logs():
         end_date = request.args.get('end_date')
         
         # 构建查询
-        query = AttendanceRecord.query
+        query = attendance_serializer.query()
         
         # 过滤条件
         if user_id:
-            query = query.filter_by(user_id=user_id)
+            query = query.filter(AttendanceRecord.user_id == user_id)
         
         if start_date:
             try:
@@ -128,7 +130,7 @@ def list_attendance_logs():
         
         # 转换为JSON格式
         data = {
-            'records': [record.to_dict() for record in records.items],
+            'records': attendance_serializer.dump_rows(records.items),
             'pagination': {
                 'page': records.page,
                 'pages': records.pages,
@@ -141,7 +143,7 @@ def list_attendance_logs():
             }
         }
         
-        return jsonify({'success': True, 'data': data})
+        return json_response({'success': True, 'data': data})
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取考勤日志失败: {str(e)}'})
 
@@ -206,4 +208,41 @@ def statistics():
                              title='日志统计',
                              statistics=stats)
     except Exception as e:
-        return jsonify({'success': False, 'message': f'获取统计信息失败: {str(e)}'})
\ No newline at end of file
+        return jsonify({'success': False, 'message': f'获取统计信息失败: {str(e)}'})
+
+@logs_bp.route('/sql-profile')
+@login_required
+@admin_required
+def sql_profile():
+    """SQL性能分析页面"""
+    return render_template('logs/sql_profile.html',
+                         title='SQL性能分析',
+                         stats=sql_profiler.snapshot(),
+                         enabled=current_app.config['SQL_PROFILING'],
+                         header=PROFILE_HEADER)
+
+@logs_bp.route('/sql-profile/data')
+@login_required
+@admin_required
+def sql_profile_data():
+    """获取各端点的SQL统计（条数、耗时、疑似N+1和慢语句）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                'enabled': current_app.config['SQL_PROFILING'],
+                'slow_query_ms': current_app.config['SQL_SLOW_QUERY_MS'],
+                'repeat_threshold': current_app.config['SQL_REPEAT_THRESHOLD'],
+                'endpoints': sql_profiler.snapshot()
+            }
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'获取SQL统计失败: {str(e)}'})
+
+@logs_bp.route('/sql-profile/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset_sql_profile():
+    """清空SQL统计"""
+    sql_profiler.reset()
+    return jsonify({'success': True, 'message': 'SQL统计已清空'})
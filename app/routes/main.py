@@ -5,12 +5,15 @@
 确保中文字符编码正确处理
 """
 
-from flask import Blueprint, render_template, current_app, jsonify, request
+from flask import Blueprint, render_template, current_app, jsonify, request, url_for
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from ..models import db, User, Schedule, ShiftType, SystemLog, AttendanceRecord, SystemConfig
+from zoneinfo import ZoneInfo
+from ..models import db, User, Schedule, ShiftType, SystemLog, AttendanceRecord, SystemConfig, CalendarFeed
 from ..utils.scheduler import SchedulerService
 from ..utils.notification import NotificationService
+from ..utils.calendar import calendar_cache
+from ..utils.ics import ics_cache, get_or_create_feed
 
 main_bp = Blueprint('main', __name__)
 
@@ -138,10 +141,16 @@ def calendar():
 @main_bp.route('/calendar-events')
 @login_required
 def calendar_events():
-    """获取日历事件数据"""
+    """获取日历事件数据
+
+    事件按月缓存，响应携带强ETag，客户端缓存未失效时返回304。
+    format=compact 时返回字典编码的列式数据，由前端展开。
+    """
     try:
         start_str = request.args.get('start')
         end_str = request.args.get('end')
+        user_id = request.args.get('user_id', type=int)
+        fmt = 'compact' if request.args.get('format') == 'compact' else 'json'
         
         if not start_str or not end_str:
             return jsonify({'success': False, 'message': '缺少日期参数'})
@@ -149,48 +158,76 @@ def calendar_events():
         start_date = datetime.strptime(start_str, '%Y-%m-%d').date()
         end_date = datetime.strptime(end_str, '%Y-%m-%d').date()
         
-        # 获取指定日期范围内的排班
-        schedules = Schedule.query.filter(
-            Schedule.work_date >= start_date,
-            Schedule.work_date <= end_date
-        ).all()
-        
-        events = []
-        for schedule in schedules:
-            if schedule.is_rest_day:
-                events.append({
-                    'id': schedule.id,
-                    'title': '休息',
-                    'start': schedule.work_date.strftime('%Y-%m-%d'),
-                    'color': '#95a5a6',
-                    'allDay': True,
-                    'extendedProps': {
-                        'type': 'rest',
-                        'user': schedule.user.username if schedule.user else '未知',
-                        'note': schedule.note or ''
-                    }
-                })
-            elif schedule.shift_type:
-                events.append({
-                    'id': schedule.id,
-                    'title': f'{schedule.shift_type.name} ({schedule.user.username})',
-                    'start': schedule.work_date.strftime('%Y-%m-%d'),
-                    'color': schedule.shift_type.color,
-                    'allDay': True,
-                    'extendedProps': {
-                        'type': 'work',
-                        'shift_name': schedule.shift_type.name,
-                        'start_time': schedule.shift_type.start_time,
-                        'end_time': schedule.shift_type.end_time,
-                        'user': schedule.user.username if schedule.user else '未知',
-                        'note': schedule.note or ''
-                    }
-                })
-        
-        return jsonify(events)
+        # 先读版本号再读数据，版本未变时直接返回304
+        versions = calendar_cache.get_versions(start_date, end_date)
+        etag = calendar_cache.make_etag(start_date, end_date, user_id, versions, fmt)
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            body = calendar_cache.render(start_date, end_date, user_id, versions, fmt)
+            response = current_app.response_class(body, mimetype='application/json')
+        
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取日历事件失败: {str(e)}'})
 
+@main_bp.route('/calendar/feed/<token>.ics')
+def calendar_feed(token):
+    """用户排班iCalendar订阅（令牌认证）
+
+    内容按用户版本号缓存，仅在该用户排班变更时重新生成；
+    响应携带ETag和Last-Modified，客户端轮询未变更时返回304。
+    """
+    feed = db.session.query(CalendarFeed.user_id).join(
+        User, CalendarFeed.user_id == User.id
+    ).filter(
+        CalendarFeed.token == token,
+        User.is_active == True
+    ).first()
+    if not feed:
+        return jsonify({'success': False, 'message': '订阅不存在'}), 404
+    
+    today = datetime.now(ZoneInfo(current_app.config.get('TIMEZONE', 'Asia/Shanghai'))).date()
+    etag, last_modified, version = ics_cache.get_state(feed.user_id, today)
+    last_modified = last_modified.replace(microsecond=0)
+    
+    if request.if_none_match:
+        not_modified = etag in request.if_none_match
+    else:
+        not_modified = bool(request.if_modified_since and request.if_modified_since >= last_modified)
+    
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        body = ics_cache.get_feed(feed.user_id, version, today, request.host)
+        response = current_app.response_class(body, mimetype='text/calendar')
+        response.charset = 'utf-8'
+    
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@main_bp.route('/calendar/feed-url', methods=['GET', 'POST'])
+@login_required
+def calendar_feed_url():
+    """获取当前用户的订阅地址，POST时轮换令牌"""
+    try:
+        feed = get_or_create_feed(current_user, rotate=request.method == 'POST')
+        return jsonify({
+            'success': True,
+            'data': {
+                'url': url_for('main.calendar_feed', token=feed.token, _external=True)
+            }
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'获取订阅地址失败: {str(e)}'})
+
 @main_bp.route('/about')
 @login_required
 def about():
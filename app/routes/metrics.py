@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监控指标路由模块
+以 Prometheus 文本格式导出指标
+确保中文字符编码正确处理
+"""
+
+import hmac
+from flask import Blueprint, Response, current_app, request
+from flask_login import current_user
+from ..utils.metrics import exposition
+
+metrics_bp = Blueprint('metrics', __name__)
+
+def authorized():
+    """携带正确的 Bearer 令牌或已登录的管理员；未配置令牌且不要求认证时公开"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    if current_user.is_authenticated and current_user.is_admin:
+        return True
+    return not token and not current_app.config.get('METRICS_REQUIRE_AUTH')
+
+@metrics_bp.route('/metrics')
+def export_metrics():
+    """Prometheus 指标
+
+    配置了 METRICS_TOKEN 时需携带 Authorization: Bearer <token>；
+    生产环境（METRICS_REQUIRE_AUTH）未配置令牌时只允许已登录的管理员访问。
+    """
+    if not authorized():
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    
+    body, content_type = exposition()
+    return Response(body, content_type=content_type)
@@ -7,13 +7,49 @@
 
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, date, timedelta
 from ..models import db, Schedule, ShiftType, User, SystemLog
-from ..forms.schedule import ScheduleForm, BatchScheduleForm
+from ..forms.schedule import ScheduleForm, BatchScheduleForm, ScheduleImportForm
 from ..utils.decorators import admin_required
+from ..utils.roster import batch_create_schedules, create_schedule
+from ..utils.importer import import_schedule_file, ScheduleImportError
+from ..utils.rotation import generate_rotation, RotationError
+from ..utils.solver import solve_roster, active_user_ids, SolverError
+from ..utils.clone import clone_schedules, CloneError
+from ..utils.listing import list_schedule_page, schedule_count_cache, CursorError, MAX_PER_PAGE
+from ..utils.lookups import lookup_cache
+from ..utils.serializers import json_response
 
 schedule_bp = Blueprint('schedule', __name__, url_prefix='/schedule')
 
+# 批量生成排班的最大日期跨度（与批量排班表单一致）
+MAX_RANGE_DAYS = 365
+
+def json_flag(data, key, default):
+    """读取JSON请求中的布尔参数，只接受 true/false（布尔值或字符串），其他值抛出ValueError"""
+    value = data.get(key, default)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+        return value.strip().lower() == 'true'
+    raise ValueError(f'{key} 必须为 true 或 false')
+
+def check_user_ids(user_ids):
+    """校验用户均存在且已启用，返回错误信息（无错误时返回None）"""
+    invalid = lookup_cache.inactive_user_ids(user_ids)
+    if invalid:
+        return f'用户不存在或已停用: {", ".join(str(user_id) for user_id in invalid)}'
+    return None
+
+def check_date_range(start_date, end_date):
+    """校验日期范围，返回错误信息（无错误时返回None）"""
+    if end_date < start_date:
+        return '结束日期不能早于开始日期'
+    if (end_date - start_date).days > MAX_RANGE_DAYS:
+        return '日期范围不能超过一年'
+    return None
+
 def log_schedule_action(action, message, level='INFO'):
     """记录排班操作日志"""
     try:
@@ -39,56 +75,51 @@ def index():
 @schedule_bp.route('/list')
 @login_required
 def list_schedules():
-    """获取排班列表"""
+    """获取排班列表
+
+    按工作日期、ID倒序的游标分页：cursor 为上一页返回的 next_cursor。
+    总数需要额外统计，仅在 with_total=1 时返回（按版本号缓存）。
+    """
     try:
         # 获取查询参数
-        page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
+        cursor = request.args.get('cursor') or None
         user_id = request.args.get('user_id', type=int)
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        with_total = request.args.get('with_total', type=int) == 1
         
-        # 构建查询
-        query = Schedule.query
-        
-        # 过滤条件
-        if user_id:
-            query = query.filter_by(user_id=user_id)
-        
+        start_date_obj = None
+        end_date_obj = None
         if start_date:
             try:
                 start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                query = query.filter(Schedule.work_date >= start_date_obj)
             except ValueError:
                 pass
         
         if end_date:
             try:
                 end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-                query = query.filter(Schedule.work_date <= end_date_obj)
             except ValueError:
                 pass
         
-        # 排序和分页
-        schedules = query.order_by(Schedule.work_date.desc()).paginate(
-            page=page, per_page=per_page, error_out=False)
+        schedules, next_cursor = list_schedule_page(user_id, start_date_obj, end_date_obj, cursor, per_page)
         
-        # 转换为JSON格式
         data = {
-            'schedules': [schedule.to_dict() for schedule in schedules.items],
+            'schedules': schedules,
             'pagination': {
-                'page': schedules.page,
-                'pages': schedules.pages,
-                'per_page': schedules.per_page,
-                'total': schedules.total,
-                'has_prev': schedules.has_prev,
-                'has_next': schedules.has_next,
-                'prev_num': schedules.prev_num,
-                'next_num': schedules.next_num
+                'per_page': min(max(per_page, 1), MAX_PER_PAGE),
+                'cursor': cursor,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
             }
         }
+        if with_total:
+            data['pagination']['total'] = schedule_count_cache.count(user_id, start_date_obj, end_date_obj)
         
-        return jsonify({'success': True, 'data': data})
+        return json_response({'success': True, 'data': data})
+    except CursorError as e:
+        return jsonify({'success': False, 'message': str(e)})
     except Exception as e:
         return jsonify({'success': False, 'message': f'获取排班列表失败: {str(e)}'})
 
@@ -100,18 +131,8 @@ def create():
     
     if form.validate_on_submit():
         try:
-            # 检查是否已存在该日期的排班
-            existing = Schedule.query.filter_by(
-                user_id=form.user_id.data,
-                work_date=form.work_date.data
-            ).first()
-            
-            if existing:
-                flash('该日期已存在排班记录', 'error')
-                return render_template('schedule/create.html', form=form, title='创建排班')
-            
-            # 创建新排班
-            schedule = Schedule(
+            # 单条 INSERT ... ON CONFLICT DO NOTHING，冲突即表示该日期已有排班
+            created = create_schedule(
                 user_id=form.user_id.data,
                 work_date=form.work_date.data,
                 shift_type_id=form.shift_type_id.data if not form.is_rest_day.data else None,
@@ -119,11 +140,15 @@ def create():
                 note=form.note.data
             )
             
-            db.session.add(schedule)
+            if not created:
+                db.session.rollback()
+                flash('该日期已存在排班记录', 'error')
+                return render_template('schedule/create.html', form=form, title='创建排班')
+            
             db.session.commit()
             
             flash('排班创建成功', 'success')
-            log_schedule_action('create_schedule', f'用户 {current_user.username} 创建排班: {schedule.work_date}')
+            log_schedule_action('create_schedule', f'用户 {current_user.username} 创建排班: {form.work_date.data}')
             
             return redirect(url_for('schedule.index'))
         except Exception as e:
@@ -155,6 +180,9 @@ def edit(id):
             log_schedule_action('update_schedule', f'用户 {current_user.username} 更新排班: {schedule.work_date}')
             
             return redirect(url_for('schedule.index'))
+        except IntegrityError:
+            db.session.rollback()
+            flash('该日期已存在排班记录', 'error')
         except Exception as e:
             db.session.rollback()
             flash('排班更新失败，请稍后重试', 'error')
@@ -190,38 +218,19 @@ def batch_create():
     
     if form.validate_on_submit():
         try:
-            created_count = 0
-            start_date = form.start_date.data
-            end_date = form.end_date.data
-            
-            # 计算日期范围
-            current_date = start_date
-            while current_date <= end_date:
-                # 检查是否已存在排班
-                existing = Schedule.query.filter_by(
-                    user_id=form.user_id.data,
-                    work_date=current_date
-                ).first()
-                
-                if not existing:
-                    # 判断是否为工作日
-                    is_work_day = current_date.weekday() < 5  # 周一到周五为工作日
-                    
-                    if is_work_day or not form.skip_weekends.data:
-                        schedule = Schedule(
-                            user_id=form.user_id.data,
-                            work_date=current_date,
-                            shift_type_id=form.shift_type_id.data if is_work_day else None,
-                            is_rest_day=not is_work_day
-                        )
-                        db.session.add(schedule)
-                        created_count += 1
-                
-                current_date += timedelta(days=1)
+            # 一次查询取回已有排班，内存中计算缺失日期后单条批量写入
+            user_ids = form.user_ids.data
+            created_count = batch_create_schedules(
+                user_ids,
+                form.start_date.data,
+                form.end_date.data,
+                form.shift_type_id.data,
+                form.skip_weekends.data
+            )
             
             db.session.commit()
             flash(f'批量创建成功，共创建 {created_count} 条排班记录', 'success')
-            log_schedule_action('batch_create_schedule', f'用户 {current_user.username} 批量创建排班: {created_count} 条')
+            log_schedule_action('batch_create_schedule', f'用户 {current_user.username} 为 {len(user_ids)} 名用户批量创建排班: {created_count} 条')
             
             return redirect(url_for('schedule.index'))
         except Exception as e:
@@ -231,6 +240,168 @@ def batch_create():
     
     return render_template('schedule/batch_create.html', form=form, title='批量创建排班')
 
+@schedule_bp.route('/rotation', methods=['POST'])
+@login_required
+@admin_required
+def rotation():
+    """按轮班模式生成排班
+
+    请求体示例：
+    {"pattern": [1, 1, 2, 2, "休", "休"], "user_ids": [1, 2, 3], "stagger": 2,
+     "start_date": "2024-01-01", "end_date": "2024-12-31", "dry_run": true}
+    也可用 users=[{"user_id": 1, "offset": 0}] 为每个用户单独指定相位偏移。
+    dry_run 默认为 true，只返回预览；overwrite 为 true 时覆盖已有排班。
+    用户须存在且已启用，日期范围不超过一年。
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        start_date = datetime.strptime(data.get('start_date', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(data.get('end_date', ''), '%Y-%m-%d').date()
+        anchor_date = datetime.strptime(data['anchor_date'], '%Y-%m-%d').date() if data.get('anchor_date') else None
+        
+        if data.get('users'):
+            user_offsets = [(int(item['user_id']), int(item.get('offset', 0))) for item in data['users']]
+        else:
+            stagger = int(data.get('stagger', 0))
+            user_offsets = [(int(user_id), index * stagger) for index, user_id in enumerate(data.get('user_ids') or [])]
+        dry_run = json_flag(data, 'dry_run', True)
+        overwrite = json_flag(data, 'overwrite', False)
+    except (ValueError, TypeError, KeyError):
+        return jsonify({'success': False, 'message': '参数格式错误'})
+    
+    error = check_date_range(start_date, end_date) or check_user_ids(user_id for user_id, _ in user_offsets)
+    if error:
+        return jsonify({'success': False, 'message': error})
+    try:
+        report = generate_rotation(
+            data.get('pattern'),
+            user_offsets,
+            start_date,
+            end_date,
+            anchor_date=anchor_date,
+            dry_run=dry_run,
+            overwrite=overwrite,
+            note=data.get('note')
+        )
+        if not dry_run:
+            db.session.commit()
+            log_schedule_action('rotation_schedule',
+                                f'用户 {current_user.username} 为 {report["users"]} 名用户生成轮班排班 '
+                                f'{start_date} 至 {end_date}: 写入 {report["written"]} 条')
+        return jsonify({'success': True, 'data': report})
+    except RotationError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    except Exception as e:
+        db.session.rollback()
+        log_schedule_action('rotation_schedule_error', f'用户 {current_user.username} 生成轮班排班失败: {str(e)}', 'ERROR')
+        return jsonify({'success': False, 'message': f'生成轮班排班失败: {str(e)}'})
+
+@schedule_bp.route('/auto-roster', methods=['POST'])
+@login_required
+@admin_required
+def auto_roster():
+    """自动排班
+
+    请求体示例：
+    {"start_date": "2024-03-01", "end_date": "2024-03-31", "user_ids": [1, 2, 3],
+     "demand": {"1": 5, "2": 3}, "max_consecutive": 6, "min_rest_hours": 11,
+     "night_shift_ids": [3], "leave": [{"user_id": 1, "date": "2024-03-08"}],
+     "time_budget": 2, "dry_run": true}
+    user_ids 缺省为全部启用的非管理员用户，指定时须存在且已启用；demand 缺省使用班次的最少人数配置。
+    日期范围不超过一年。
+    已有排班保持不变，只填充空白日期。dry_run 默认为 true，只返回预览。
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        start_date = datetime.strptime(data.get('start_date', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(data.get('end_date', ''), '%Y-%m-%d').date()
+        user_ids = [int(user_id) for user_id in data['user_ids']] if data.get('user_ids') else active_user_ids()
+        leave = [(int(item['user_id']), datetime.strptime(item['date'], '%Y-%m-%d').date())
+                 for item in data.get('leave') or []]
+        options = {
+            'demand': data.get('demand'),
+            'max_consecutive': int(data.get('max_consecutive', 6)),
+            'min_rest_hours': float(data.get('min_rest_hours', 11)),
+            'night_shift_ids': [int(shift_id) for shift_id in data['night_shift_ids']]
+            if data.get('night_shift_ids') is not None else None,
+            'leave': leave,
+            'time_budget': float(data.get('time_budget', 2)),
+            'seed': data.get('seed')
+        }
+        dry_run = json_flag(data, 'dry_run', True)
+    except (ValueError, TypeError, KeyError):
+        return jsonify({'success': False, 'message': '参数格式错误'})
+    
+    error = check_date_range(start_date, end_date) or check_user_ids(user_ids)
+    if error:
+        return jsonify({'success': False, 'message': error})
+    try:
+        report = solve_roster(user_ids, start_date, end_date, dry_run=dry_run, note=data.get('note'), **options)
+        if not dry_run:
+            db.session.commit()
+            log_schedule_action('auto_roster',
+                                f'用户 {current_user.username} 自动排班 {start_date} 至 {end_date}: '
+                                f'{report["users"]} 名用户，写入 {report["written"]} 条，缺员 {report["shortage"]} 人次')
+        return jsonify({'success': True, 'data': report})
+    except SolverError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    except Exception as e:
+        db.session.rollback()
+        log_schedule_action('auto_roster_error', f'用户 {current_user.username} 自动排班失败: {str(e)}', 'ERROR')
+        return jsonify({'success': False, 'message': f'自动排班失败: {str(e)}'})
+
+@schedule_bp.route('/clone', methods=['POST'])
+@login_required
+@admin_required
+def clone():
+    """复制排班到新的日期范围
+
+    请求体示例：
+    {"source_start": "2024-01-01", "source_end": "2024-01-07", "target_start": "2024-01-08",
+     "user_ids": [1, 2], "include_rest": true, "conflict": "skip", "dry_run": true}
+    user_ids 缺省为全部启用用户，指定时须存在且已启用。
+    conflict 为 skip（保留已有排班）或 overwrite（覆盖）；dry_run 默认为 true，只返回差异。
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        source_start = datetime.strptime(data.get('source_start', ''), '%Y-%m-%d').date()
+        source_end = datetime.strptime(data.get('source_end', ''), '%Y-%m-%d').date()
+        if data.get('target_start'):
+            target_start = datetime.strptime(data['target_start'], '%Y-%m-%d').date()
+        else:
+            target_start = source_start + timedelta(days=int(data['offset_days']))
+        user_ids = [int(user_id) for user_id in data.get('user_ids') or []]
+        include_rest = json_flag(data, 'include_rest', True)
+        dry_run = json_flag(data, 'dry_run', True)
+    except (ValueError, TypeError, KeyError):
+        return jsonify({'success': False, 'message': '参数格式错误'})
+    
+    error = check_user_ids(user_ids)
+    if error:
+        return jsonify({'success': False, 'message': error})
+    try:
+        report = clone_schedules(
+            source_start,
+            source_end,
+            target_start,
+            user_ids=user_ids,
+            include_rest=include_rest,
+            conflict=data.get('conflict', 'skip'),
+            dry_run=dry_run
+        )
+        if not dry_run:
+            db.session.commit()
+            log_schedule_action('clone_schedule',
+                                f'用户 {current_user.username} 复制排班 {source_start} 至 {source_end} -> '
+                                f'{report["target_start"]} 至 {report["target_end"]}: 写入 {report["will_write"]} 条')
+        return jsonify({'success': True, 'data': report})
+    except CloneError as e:
+        return jsonify({'success': False, 'message': str(e)})
+    except Exception as e:
+        db.session.rollback()
+        log_schedule_action('clone_schedule_error', f'用户 {current_user.username} 复制排班失败: {str(e)}', 'ERROR')
+        return jsonify({'success': False, 'message': f'复制排班失败: {str(e)}'})
+
 @schedule_bp.route('/today')
 @login_required
 def today_schedule():
@@ -251,14 +422,39 @@ def today_schedule():
 @login_required
 @admin_required
 def import_schedule():
-    """导入排班数据"""
-    if request.method == 'POST':
+    """导入排班数据
+
+    支持CSV和XLSX文件，表头需包含 用户名、日期、班次（可选 休息日、备注）。
+    逐行校验后按块写入，同一用户同一天已有排班时更新。
+    """
+    form = ScheduleImportForm()
+    wants_json = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    report = None
+    
+    if form.validate_on_submit():
+        upload = form.file.data
         try:
-            # 这里可以实现Excel或CSV导入功能
-            # 暂时返回提示信息
-            flash('导入功能开发中，敬请期待', 'info')
-            return redirect(url_for('schedule.index'))
+            report = import_schedule_file(upload.stream, upload.filename)
+            log_schedule_action('import_schedule',
+                                f'用户 {current_user.username} 导入排班文件 {upload.filename}: '
+                                f'新增 {report["inserted"]} 条，更新 {report["updated"]} 条，'
+                                f'重复 {report["duplicates"]} 行，错误 {report["error_count"]} 行')
+        except ScheduleImportError as e:
+            if wants_json:
+                return jsonify({'success': False, 'message': str(e)})
+            flash(str(e), 'error')
         except Exception as e:
+            db.session.rollback()
+            log_schedule_action('import_schedule_error', f'用户 {current_user.username} 导入排班失败: {str(e)}', 'ERROR')
+            if wants_json:
+                return jsonify({'success': False, 'message': f'导入失败: {str(e)}'})
             flash('导入失败，请稍后重试', 'error')
+        else:
+            if wants_json:
+                return jsonify({'success': True, 'data': report})
+            flash(f'导入完成：新增 {report["inserted"]} 条，更新 {report["updated"]} 条，'
+                  f'重复 {report["duplicates"]} 行，错误 {report["error_count"]} 行', 'success' if not report['error_count'] else 'warning')
+    elif wants_json and request.method == 'POST':
+        return jsonify({'success': False, 'message': '；'.join(form.file.errors) or '请选择文件'})
     
-    return render_template('schedule/import.html', title='导入排班数据')
\ No newline at end of file
+    return render_template('schedule/import.html', form=form, report=report, title='导入排班数据')
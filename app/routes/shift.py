@@ -10,6 +10,8 @@ from flask_login import login_required, current_user
 from ..models import db, ShiftType, SystemLog
 from ..forms.shift import ShiftTypeForm
 from ..utils.decorators import admin_required
+from ..utils.serializers import json_response
+from ..utils.lookups import lookup_cache
 
 shift_bp = Blueprint('shift', __name__, url_prefix='/shift')
 
@@ -40,10 +42,9 @@ def index():
 def list_shifts():
     """获取班次列表"""
     try:
-        shifts = ShiftType.query.filter_by(is_active=True).order_by(ShiftType.name).all()
-        return jsonify({
+        return json_response({
             'success': True,
-            'data': [shift.to_dict() for shift in shifts]
+            'data': lookup_cache.active_shift_types()
         })
     except Exception as e:
         return jsonify({
@@ -69,10 +70,12 @@ def create():
             # 创建新班次
             shift = ShiftType(
                 name=form.name.data,
-                start_time=form.start_time.data,
-                end_time=form.end_time.data,
+                start_time=form.start_time.data.strftime('%H:%M'),
+                end_time=form.end_time.data.strftime('%H:%M'),
                 color=form.color.data,
-                description=form.description.data
+                description=form.description.data,
+                min_staff=form.min_staff.data,
+                max_staff=form.max_staff.data
             )
             
             db.session.add(shift)
@@ -111,10 +114,12 @@ def edit(id):
             
             # 更新班次信息
             shift.name = form.name.data
-            shift.start_time = form.start_time.data
-            shift.end_time = form.end_time.data
+            shift.start_time = form.start_time.data.strftime('%H:%M')
+            shift.end_time = form.end_time.data.strftime('%H:%M')
             shift.color = form.color.data
             shift.description = form.description.data
+            shift.min_staff = form.min_staff.data
+            shift.max_staff = form.max_staff.data
             
             db.session.commit()
             
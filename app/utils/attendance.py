@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+考勤记录预生成
+日期切换时以单条 INSERT ... SELECT 为当天和次日的排班批量生成考勤记录，
+当天新增或修改的排班增量补齐，提醒时只需更新已有记录
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import false, literal, select, update
+from ..models import db, Schedule, ShiftType, AttendanceRecord
+from .sql import upsert
+
+NOT_CLOCKED = '未打卡'
+# 预生成范围：今天和次日
+MATERIALIZE_DAYS = 2
+USER_CHUNK_SIZE = 500
+INSERT_COLUMNS = ['user_id', 'work_date', 'shift_type_id', 'clock_in_status', 'clock_out_status',
+                  'clock_in_reminded', 'clock_out_reminded', 'created_at', 'updated_at']
+REMINDED_COLUMNS = {'check_in': 'clock_in_reminded', 'check_out': 'clock_out_reminded'}
+STATUS_COLUMNS = {'check_in': 'clock_in_status', 'check_out': 'clock_out_status'}
+
+
+def materialize_dates(today):
+    """需要预生成考勤记录的日期"""
+    return [today + timedelta(days=offset) for offset in range(MATERIALIZE_DAYS)]
+
+
+def _materialize(connection, dates, user_ids):
+    schedules = Schedule.__table__
+    shift_types = ShiftType.__table__
+    now = datetime.utcnow()
+    rows = select(
+        schedules.c.user_id, schedules.c.work_date, schedules.c.shift_type_id,
+        literal(NOT_CLOCKED), literal(NOT_CLOCKED), false(), false(),
+        literal(now, db.DateTime), literal(now, db.DateTime)
+    ).select_from(schedules.join(
+        shift_types, shift_types.c.id == schedules.c.shift_type_id
+    )).where(schedules.c.work_date.in_(dates), schedules.c.is_rest_day == False)
+    if user_ids is not None:
+        rows = rows.where(schedules.c.user_id.in_(user_ids))
+    # 已有记录只同步班次，打卡状态和提醒标记保持不变
+    stmt = upsert(AttendanceRecord.__table__, connection, ['user_id', 'work_date'], ['shift_type_id'])
+    return connection.execute(stmt.from_select(INSERT_COLUMNS, rows)).rowcount
+
+
+def materialize_attendance(dates, user_ids=None, connection=None, today=None):
+    """为给定日期（仅预生成范围内）的排班批量生成考勤记录，可重复执行
+
+    user_ids 为 None 时处理全部用户；不提交事务。
+    """
+    conn = connection if connection is not None else db.session.connection()
+    today = today or datetime.now().date()
+    dates = sorted(set(dates) & set(materialize_dates(today)))
+    if not dates:
+        return 0
+    if user_ids is None:
+        return _materialize(conn, dates, None)
+    user_ids = sorted(set(user_ids))
+    return sum(_materialize(conn, dates, user_ids[i:i + USER_CHUNK_SIZE])
+               for i in range(0, len(user_ids), USER_CHUNK_SIZE))
+
+
+def mark_reminded(user_id, work_date, kind):
+    """将未打卡且未提醒的考勤记录标记为已提醒（不提交事务）
+
+    以条件更新代替先查后改，返回是否标记成功；记录已打卡、已提醒或不存在时返回False。
+    """
+    table = AttendanceRecord.__table__
+    status = table.c[STATUS_COLUMNS[kind]]
+    reminded = table.c[REMINDED_COLUMNS[kind]]
+    result = db.session.connection().execute(update(table).where(
+        table.c.user_id == user_id,
+        table.c.work_date == work_date,
+        status == NOT_CLOCKED,
+        reminded == False
+    ).values({reminded: True, table.c.updated_at: datetime.utcnow()}))
+    return result.rowcount == 1
+
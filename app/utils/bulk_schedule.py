@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班批量操作服务
+一次性加载用户和班次查找表，逐项校验批量创建/更新/删除操作，
+再以批量语句写入，返回逐项结果
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime
+from sqlalchemy import bindparam, delete, insert, update
+from ..models import db, User, ShiftType, Schedule
+from .importer import parse_date, REST_SHIFT_NAMES
+from .roster import IN_CHUNK_SIZE, existing_schedule_ids, invalidate_schedule_caches
+
+# 非原子模式下每个事务写入的条数
+BULK_CHUNK_SIZE = 1000
+# 单次请求允许的最大操作数
+MAX_BULK_ITEMS = 10000
+
+ACTIONS = {'create': '创建', 'update': '更新', 'delete': '删除'}
+
+
+class BulkScheduleError(ValueError):
+    """批量请求整体格式错误"""
+
+
+def load_schedule_rows(schedule_ids):
+    """按ID加载排班的当前字段，返回 ID -> 字段字典"""
+    schedule_ids = list(schedule_ids)
+    rows = {}
+    for i in range(0, len(schedule_ids), IN_CHUNK_SIZE):
+        result = db.session.query(
+            Schedule.id, Schedule.user_id, Schedule.work_date,
+            Schedule.shift_type_id, Schedule.is_rest_day, Schedule.note
+        ).filter(Schedule.id.in_(schedule_ids[i:i + IN_CHUNK_SIZE])).all()
+        for row in result:
+            rows[row.id] = {
+                'user_id': row.user_id,
+                'work_date': row.work_date,
+                'shift_type_id': row.shift_type_id,
+                'is_rest_day': row.is_rest_day,
+                'note': row.note
+            }
+    return rows
+
+
+class BulkScheduleProcessor:
+    """批量排班处理器
+
+    atomic 为 True 时任一项校验失败则全部不写入，通过校验的操作在同一事务中提交；
+    为 False 时跳过失败项，其余按 chunk_size 分块写入并逐块提交。
+    """
+
+    def __init__(self, atomic=True, chunk_size=BULK_CHUNK_SIZE):
+        self.atomic = atomic
+        self.chunk_size = chunk_size
+        self.user_ids = {}
+        self.user_names = {}
+        self.shift_ids = {}
+        self.shift_names = {}
+        self.results = []
+
+    def load_lookups(self):
+        """加载启用的用户和班次查找表"""
+        users = db.session.query(User.id, User.username).filter(User.is_active == True).all()
+        self.user_ids = {user_id: username for user_id, username in users}
+        self.user_names = {username: user_id for user_id, username in users}
+        shifts = db.session.query(ShiftType.id, ShiftType.name).filter(ShiftType.is_active == True).all()
+        self.shift_ids = {shift_id: name for shift_id, name in shifts}
+        self.shift_names = {name: shift_id for shift_id, name in shifts}
+
+    def fail(self, index, message):
+        """标记单项失败"""
+        self.results[index].update(success=False, message=message)
+
+    def resolve_user(self, item):
+        """解析 user_id 或 username"""
+        if 'user_id' in item:
+            user_id = item['user_id']
+            # bool 是 int 的子类，True 不能当作用户ID 1
+            if isinstance(user_id, bool) or not isinstance(user_id, int) or user_id not in self.user_ids:
+                raise ValueError(f'用户不存在或已禁用: {user_id}')
+            return user_id
+        username = item.get('username')
+        if username not in self.user_names:
+            raise ValueError(f'用户不存在或已禁用: {username}')
+        return self.user_names[username]
+
+    def resolve_shift(self, item):
+        """解析 shift_type_id 或 shift_name，休息班次返回 None"""
+        if 'shift_type_id' in item:
+            shift_type_id = item['shift_type_id']
+            if shift_type_id is None:
+                return None
+            if isinstance(shift_type_id, bool) or not isinstance(shift_type_id, int) \
+                    or shift_type_id not in self.shift_ids:
+                raise ValueError(f'班次不存在或已停用: {shift_type_id}')
+            return shift_type_id
+        shift_name = item.get('shift_name')
+        if shift_name in REST_SHIFT_NAMES:
+            return None
+        if shift_name not in self.shift_names:
+            raise ValueError(f'班次不存在或已停用: {shift_name}')
+        return self.shift_names[shift_name]
+
+    def apply_fields(self, item, row):
+        """将请求项中的字段合并到 row，并校验班次与休息日的组合"""
+        if 'user_id' in item or 'username' in item:
+            row['user_id'] = self.resolve_user(item)
+        if 'work_date' in item:
+            row['work_date'] = parse_date(item['work_date'])
+        if 'shift_type_id' in item or 'shift_name' in item:
+            row['shift_type_id'] = self.resolve_shift(item)
+            if 'is_rest_day' not in item:
+                row['is_rest_day'] = row['shift_type_id'] is None
+        if 'is_rest_day' in item:
+            if not isinstance(item['is_rest_day'], bool):
+                raise ValueError(f'休息日标记必须为布尔值: {item["is_rest_day"]}')
+            row['is_rest_day'] = item['is_rest_day']
+        if 'note' in item:
+            row['note'] = item['note'] or None
+        if row['is_rest_day']:
+            row['shift_type_id'] = None
+        elif row['shift_type_id'] is None:
+            raise ValueError('非休息日必须指定班次')
+        return row
+
+    def find_occupied(self, rows):
+        """查询目标 (user_id, work_date) 当前被哪条排班占用"""
+        if not rows:
+            return {}
+        return existing_schedule_ids(
+            {row['user_id'] for row in rows},
+            min(row['work_date'] for row in rows),
+            max(row['work_date'] for row in rows)
+        )
+
+    def validate_create(self, items):
+        """校验创建项，返回 [(序号, 写入行)]"""
+        parsed = []
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('操作项必须为对象')
+                if 'work_date' not in item:
+                    raise ValueError('缺少工作日期')
+                row = {'user_id': None, 'work_date': None, 'shift_type_id': None, 'is_rest_day': False, 'note': None}
+                if 'user_id' not in item and 'username' not in item:
+                    raise ValueError('缺少用户')
+                parsed.append((index, self.apply_fields(item, row)))
+            except (ValueError, TypeError) as e:
+                self.fail(index, str(e))
+
+        occupied = self.find_occupied([row for _, row in parsed])
+        claimed = set()
+        valid = []
+        for index, row in parsed:
+            key = (row['user_id'], row['work_date'])
+            if key in occupied:
+                self.fail(index, '该日期已存在排班记录')
+            elif key in claimed:
+                self.fail(index, '请求中存在重复的用户和日期')
+            else:
+                claimed.add(key)
+                valid.append((index, row))
+        return valid
+
+    def load_targets(self, items):
+        """解析更新/删除项中的排班ID并加载当前字段，返回 [(序号, ID, 当前字段)]"""
+        ids = []
+        for index, item in enumerate(items):
+            schedule_id = item.get('id') if isinstance(item, dict) else item
+            if not isinstance(schedule_id, int) or isinstance(schedule_id, bool):
+                self.fail(index, '缺少排班ID')
+                continue
+            ids.append((index, schedule_id))
+
+        current = load_schedule_rows({schedule_id for _, schedule_id in ids})
+        seen = set()
+        targets = []
+        for index, schedule_id in ids:
+            self.results[index]['id'] = schedule_id
+            if schedule_id not in current:
+                self.fail(index, '排班不存在')
+            elif schedule_id in seen:
+                self.fail(index, '请求中存在重复的排班ID')
+            else:
+                seen.add(schedule_id)
+                targets.append((index, schedule_id, current[schedule_id]))
+        return targets
+
+    def validate_update(self, items):
+        """校验更新项，返回 [(序号, ID, 新字段, 原字段)]"""
+        parsed = []
+        for index, schedule_id, old in self.load_targets(items):
+            try:
+                parsed.append((index, schedule_id, self.apply_fields(items[index], dict(old)), old))
+            except (ValueError, TypeError) as e:
+                self.fail(index, str(e))
+
+        occupied = self.find_occupied([row for _, _, row, _ in parsed])
+        claimed = set()
+        valid = []
+        for index, schedule_id, row, old in parsed:
+            key = (row['user_id'], row['work_date'])
+            if occupied.get(key, schedule_id) != schedule_id:
+                self.fail(index, '该日期已存在排班记录')
+            elif key in claimed:
+                self.fail(index, '请求中存在重复的用户和日期')
+            else:
+                claimed.add(key)
+                valid.append((index, schedule_id, row, old))
+        return valid
+
+    def write_create(self, ops):
+        """批量INSERT，并回填新排班ID"""
+        now = datetime.utcnow()
+        rows = [dict(row, created_at=now, updated_at=now) for _, row in ops]
+        db.session.connection().execute(insert(Schedule.__table__), rows)
+        invalidate_schedule_caches(rows)
+        created = self.find_occupied(rows)
+        for index, row in ops:
+            self.results[index]['id'] = created.get((row['user_id'], row['work_date']))
+
+    def write_update(self, ops):
+        """按ID批量UPDATE（executemany）"""
+        now = datetime.utcnow()
+        table = Schedule.__table__
+        stmt = update(table).where(table.c.id == bindparam('_id')).values(
+            user_id=bindparam('_user_id'),
+            work_date=bindparam('_work_date'),
+            shift_type_id=bindparam('_shift_type_id'),
+            is_rest_day=bindparam('_is_rest_day'),
+            note=bindparam('_note'),
+            updated_at=bindparam('_updated_at')
+        )
+        params = [{
+            '_id': schedule_id,
+            '_user_id': row['user_id'],
+            '_work_date': row['work_date'],
+            '_shift_type_id': row['shift_type_id'],
+            '_is_rest_day': row['is_rest_day'],
+            '_note': row['note'],
+            '_updated_at': now
+        } for _, schedule_id, row, _ in ops]
+        db.session.connection().execute(stmt, params)
+        # 日期或用户变更时，原月份和原用户的缓存同样失效
+        invalidate_schedule_caches([row for _, _, row, _ in ops] + [old for _, _, _, old in ops])
+
+    def write_delete(self, ops):
+        """按ID批量DELETE"""
+        db.session.connection().execute(delete(Schedule.__table__).where(
+            Schedule.__table__.c.id.in_([schedule_id for _, schedule_id, _ in ops])
+        ))
+        invalidate_schedule_caches([old for _, _, old in ops])
+
+    def execute(self, writer, ops):
+        """写入通过校验的操作
+
+        原子模式下所有操作同一事务提交；否则逐块提交，某块失败时回滚该块并标记失败。
+        """
+        if not ops:
+            return
+        if self.atomic:
+            try:
+                for i in range(0, len(ops), self.chunk_size):
+                    writer(ops[i:i + self.chunk_size])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                for op in ops:
+                    self.fail(op[0], f'写入失败: {str(e)}')
+            return
+
+        for i in range(0, len(ops), self.chunk_size):
+            chunk = ops[i:i + self.chunk_size]
+            try:
+                writer(chunk)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                for op in chunk:
+                    self.fail(op[0], f'写入失败: {str(e)}')
+
+    def run(self, action, items):
+        """执行批量操作，返回汇总报告"""
+        if action not in ACTIONS:
+            raise BulkScheduleError(f'不支持的操作: {action}')
+        if not isinstance(items, list) or not items:
+            raise BulkScheduleError('操作列表不能为空')
+        if len(items) > MAX_BULK_ITEMS:
+            raise BulkScheduleError(f'单次最多 {MAX_BULK_ITEMS} 项操作')
+
+        self.results = [{'index': index, 'success': True} for index in range(len(items))]
+        self.load_lookups()
+        if action == 'create':
+            ops, writer = self.validate_create(items), self.write_create
+        elif action == 'update':
+            ops, writer = self.validate_update(items), self.write_update
+        else:
+            ops, writer = self.load_targets(items), self.write_delete
+
+        if self.atomic and len(ops) < len(items):
+            # 原子模式：存在校验失败项时整体不写入
+            for op in ops:
+                self.results[op[0]].update(success=False, message='其他操作项校验失败，未写入')
+            ops = []
+        self.execute(writer, ops)
+        return self.report(action)
+
+    def report(self, action):
+        """生成汇总报告"""
+        succeeded = sum(1 for result in self.results if result['success'])
+        return {
+            'action': action,
+            'atomic': self.atomic,
+            'total': len(self.results),
+            'succeeded': succeeded,
+            'failed': len(self.results) - succeeded,
+            'results': self.results
+        }
+
+
+def bulk_schedule_operation(action, items, atomic=True):
+    """执行批量排班操作的便捷入口"""
+    return BulkScheduleProcessor(atomic=atomic).run(action, items)
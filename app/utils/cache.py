@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+版本化缓存工具
+进程内缓存 + 数据库版本号，多个worker之间通过版本号判断失效
+确保中文字符编码正确处理
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import update
+from ..models import db, CacheVersion
+from .sql import insert_ignore
+
+
+def get_versions(names):
+    """批量读取缓存版本号，不存在的命名空间版本为0"""
+    return {name: info[0] for name, info in get_version_info(names).items()}
+
+
+def get_version_info(names):
+    """批量读取缓存版本号及其更新时间 {name: (version, updated_at)}"""
+    names = list(names)
+    info = dict.fromkeys(names, (0, None))
+    if names:
+        rows = db.session.query(CacheVersion.name, CacheVersion.version, CacheVersion.updated_at).filter(
+            CacheVersion.name.in_(names)
+        ).all()
+        info.update((name, (version, updated_at)) for name, version, updated_at in rows)
+    return info
+
+
+def bump_versions(names, connection=None):
+    """递增缓存版本号
+
+    可传入当前事务的连接，使版本号与数据修改在同一事务内提交。
+    """
+    names = sorted(set(names))
+    if not names:
+        return
+    conn = connection if connection is not None else db.session.connection()
+    now = datetime.utcnow()
+    table = CacheVersion.__table__
+    conn.execute(
+        insert_ignore(table, conn, ['name']),
+        [{'name': name, 'version': 0, 'updated_at': now} for name in names]
+    )
+    conn.execute(
+        update(table).where(table.c.name.in_(names)).values(
+            version=table.c.version + 1, updated_at=now
+        )
+    )
+
+
+class LocalCache:
+    """线程安全的进程内LRU缓存，条目附带版本号"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """版本号一致时返回缓存值，否则返回None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, version, value):
+        """写入缓存并淘汰最久未使用的条目"""
+        with self._lock:
+            self._data[key] = (version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
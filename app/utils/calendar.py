@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班日历事件服务
+使用单条关联投影查询构建日历事件，避免逐条懒加载
+按月缓存序列化后的事件，并在排班或班次变更时按月失效
+支持字典编码的紧凑列式格式，由前端展开为事件
+确保中文字符编码正确处理
+"""
+
+import hashlib
+import json
+from datetime import date, timedelta
+from ..models import db, Schedule, ShiftType, User
+from .cache import LocalCache, get_versions
+
+REST_COLOR = '#95a5a6'
+CALENDAR_NAMESPACE = 'calendar'
+
+
+def query_calendar_rows(start_date, end_date, user_id=None):
+    """查询日期范围内的排班投影行
+
+    一次 JOIN 取回构建事件所需的全部列，返回元组列表：
+    (id, work_date, is_rest_day, note, username,
+     shift_name, color, start_time, end_time)
+    """
+    query = db.session.query(
+        Schedule.id,
+        Schedule.work_date,
+        Schedule.is_rest_day,
+        Schedule.note,
+        User.username,
+        ShiftType.name,
+        ShiftType.color,
+        ShiftType.start_time,
+        ShiftType.end_time
+    ).outerjoin(
+        User, Schedule.user_id == User.id
+    ).outerjoin(
+        ShiftType, Schedule.shift_type_id == ShiftType.id
+    ).filter(
+        Schedule.work_date >= start_date,
+        Schedule.work_date <= end_date
+    )
+    if user_id:
+        query = query.filter(Schedule.user_id == user_id)
+    return query.order_by(Schedule.work_date, Schedule.id).all()
+
+
+def build_calendar_events(rows):
+    """由投影行直接构建FullCalendar事件列表"""
+    events = []
+    append = events.append
+    for (schedule_id, work_date, is_rest_day, note, username,
+         shift_name, color, start_time, end_time) in rows:
+        user = username or '未知'
+        if is_rest_day:
+            append({
+                'id': schedule_id,
+                'title': '休息',
+                'start': work_date.isoformat(),
+                'color': REST_COLOR,
+                'allDay': True,
+                'extendedProps': {
+                    'type': 'rest',
+                    'user': user,
+                    'note': note or ''
+                }
+            })
+        elif shift_name is not None:
+            append({
+                'id': schedule_id,
+                'title': f'{shift_name} ({user})',
+                'start': work_date.isoformat(),
+                'color': color,
+                'allDay': True,
+                'extendedProps': {
+                    'type': 'work',
+                    'shift_name': shift_name,
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'user': user,
+                    'note': note or ''
+                }
+            })
+    return events
+
+
+def get_calendar_events(start_date, end_date, user_id=None):
+    """获取日期范围内的日历事件"""
+    return build_calendar_events(query_calendar_rows(start_date, end_date, user_id))
+
+
+def encode_compact_events(rows, base_date):
+    """将投影行编码为字典 + 列式数组的紧凑格式
+
+    users/shifts/notes 为共享字典，id/d/u/s/n 为等长列：
+    d 为相对 base 的天数，s 为 -1 表示休息，n 为 0 表示无备注。
+    """
+    users, shifts, notes = {}, {}, {'': 0}
+    ids, days, user_idx, shift_idx, note_idx = [], [], [], [], []
+    base_ordinal = base_date.toordinal()
+    for (schedule_id, work_date, is_rest_day, note, username,
+         shift_name, color, start_time, end_time) in rows:
+        if is_rest_day:
+            shift = -1
+        elif shift_name is not None:
+            shift = shifts.setdefault((shift_name, color, start_time, end_time), len(shifts))
+        else:
+            continue
+        ids.append(schedule_id)
+        days.append(work_date.toordinal() - base_ordinal)
+        user_idx.append(users.setdefault(username or '未知', len(users)))
+        shift_idx.append(shift)
+        note_idx.append(notes.setdefault(note or '', len(notes)))
+    return {
+        'format': 'compact',
+        'base': base_date.isoformat(),
+        'users': list(users),
+        'shifts': [list(shift) for shift in shifts],
+        'notes': list(notes),
+        'rest_color': REST_COLOR,
+        'id': ids,
+        'd': days,
+        'u': user_idx,
+        's': shift_idx,
+        'n': note_idx
+    }
+
+
+def month_start(day):
+    """日期所在月份的第一天"""
+    return day.replace(day=1)
+
+
+def next_month(day):
+    """下个月的第一天"""
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def iter_months(start_date, end_date):
+    """遍历与日期范围重叠的每个月（以月初日期表示）"""
+    current = month_start(start_date)
+    while current <= end_date:
+        yield current
+        current = next_month(current)
+
+
+def month_version_name(day):
+    """月份缓存版本的命名空间"""
+    return f'{CALENDAR_NAMESPACE}:{day.strftime("%Y-%m")}'
+
+
+class CalendarEventCache:
+    """按 (月份, 过滤条件) 缓存序列化后的日历事件"""
+
+    def __init__(self, max_entries=256):
+        self._cache = LocalCache(max_entries)
+
+    def get_versions(self, start_date, end_date):
+        """一次查询读取全局及各月份的版本号"""
+        months = list(iter_months(start_date, end_date))
+        names = [CALENDAR_NAMESPACE] + [month_version_name(m) for m in months]
+        versions = get_versions(names)
+        return versions[CALENDAR_NAMESPACE], [(m, versions[month_version_name(m)]) for m in months]
+
+    def make_etag(self, start_date, end_date, user_id, versions, fmt='json'):
+        """由请求范围、过滤条件、格式和版本号生成强ETag"""
+        global_version, month_versions = versions
+        key = '|'.join([
+            fmt, start_date.isoformat(), end_date.isoformat(), str(user_id or ''), str(global_version)
+        ] + [f'{m.isoformat()}={v}' for m, v in month_versions])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get_rows(self, month, user_id, version):
+        """获取某月的缓存投影行，未命中时查询并写入缓存"""
+        key = ('rows', month, user_id or 0)
+        rows = self._cache.get(key, version)
+        if rows is None:
+            last_day = next_month(month) - timedelta(days=1)
+            rows = [tuple(row) for row in query_calendar_rows(month, last_day, user_id)]
+            self._cache.set(key, version, rows)
+        return rows
+
+    def get_bucket(self, month, user_id, version):
+        """获取某月的缓存事件 [(日期, 序列化事件)]"""
+        key = ('json', month, user_id or 0)
+        bucket = self._cache.get(key, version)
+        if bucket is None:
+            rows = self.get_rows(month, user_id, version)
+            events = build_calendar_events(rows)
+            bucket = [
+                (date.fromisoformat(e['start']),
+                 json.dumps(e, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                for e in events
+            ]
+            self._cache.set(key, version, bucket)
+        return bucket
+
+    def render(self, start_date, end_date, user_id, versions, fmt='json'):
+        """由各月缓存拼装日期范围内的响应体"""
+        global_version, month_versions = versions
+        if fmt == 'compact':
+            rows = []
+            for month, version in month_versions:
+                rows.extend(row for row in self.get_rows(month, user_id, (global_version, version))
+                            if start_date <= row[1] <= end_date)
+            payload = {'success': True, 'data': encode_compact_events(rows, start_date)}
+            return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        chunks = []
+        for month, version in month_versions:
+            bucket = self.get_bucket(month, user_id, (global_version, version))
+            if month >= start_date and next_month(month) <= end_date + timedelta(days=1):
+                chunks.extend(payload for _, payload in bucket)
+            else:
+                chunks.extend(payload for day, payload in bucket if start_date <= day <= end_date)
+        return b'[' + b','.join(chunks) + b']'
+
+    def clear(self):
+        """清空本进程缓存"""
+        self._cache.clear()
+
+
+# 全局日历缓存实例
+calendar_cache = CalendarEventCache()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打卡事件接入
+校验 webhook 签名，批量接收上班/下班打卡事件，UPSERT 写入考勤记录并取消对应的待发送提醒，
+考勤状态由推送实时更新，发送提醒前无需再轮询打卡检测接口
+确保中文字符编码正确处理
+"""
+
+import hashlib
+import hmac
+import time
+from datetime import datetime
+from sqlalchemy import bindparam, update
+from ..models import db, Schedule, SystemConfig, AttendanceRecord, ReminderJob
+from .attendance import NOT_CLOCKED
+from .importer import parse_date
+from .lookups import lookup_cache
+from .reminder_jobs import PENDING, CANCELLED
+from .roster import IN_CHUNK_SIZE
+from .sql import upsert
+
+CLOCKED_IN = '已打卡'
+SECRET_KEY = 'webhook_secret'
+# 请求时间戳与服务器时间允许的最大偏差（秒），超出视为重放
+MAX_CLOCK_SKEW = 300
+# 单次请求允许的最大事件数
+MAX_EVENTS = 5000
+# 事件类型 -> (考勤状态列, 提醒任务类型)
+EVENT_TYPES = {
+    'clock_in': ('clock_in_status', 'check_in'),
+    'clock_out': ('clock_out_status', 'check_out'),
+}
+
+
+class WebhookSignatureError(ValueError):
+    """签名缺失、错误或已过期"""
+
+
+class ClockEventError(ValueError):
+    """事件请求整体格式错误"""
+
+
+def webhook_secret():
+    """读取 webhook 签名密钥，未配置时返回空字符串"""
+    return db.session.query(SystemConfig.value).filter(SystemConfig.key == SECRET_KEY).scalar() or ''
+
+
+def sign_payload(secret, timestamp, body):
+    """计算签名：HMAC-SHA256(密钥, '时间戳.' + 请求体) 的十六进制摘要"""
+    message = f'{timestamp}.'.encode('ascii') + body
+    return hmac.new(secret.encode('utf-8'), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, timestamp, signature, secret=None, now=None):
+    """校验 X-Timestamp / X-Signature 请求头，失败时抛出 WebhookSignatureError"""
+    secret = webhook_secret() if secret is None else secret
+    if not secret:
+        raise WebhookSignatureError('未配置 webhook 签名密钥')
+    if not timestamp or not signature:
+        raise WebhookSignatureError('缺少签名请求头')
+    try:
+        timestamp_value = int(timestamp)
+    except ValueError:
+        raise WebhookSignatureError('时间戳格式无效')
+    now = time.time() if now is None else now
+    if abs(now - timestamp_value) > MAX_CLOCK_SKEW:
+        raise WebhookSignatureError('请求已过期')
+    if signature.startswith('sha256='):
+        signature = signature[len('sha256='):]
+    if not hmac.compare_digest(sign_payload(secret, timestamp, body), signature):
+        raise WebhookSignatureError('签名错误')
+
+
+def parse_event(item, users_by_name):
+    """解析单个事件，返回 (用户ID, 排班日期, 事件类型)，无效时抛出 ValueError"""
+    if not isinstance(item, dict):
+        raise ValueError('事件格式无效')
+    event_type = item.get('type')
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f'不支持的事件类型: {event_type}')
+
+    if item.get('user_id') is not None:
+        try:
+            # bool 是 int 的子类，True 不能当作用户ID 1
+            user = None if isinstance(item['user_id'], bool) else lookup_cache.user(int(item['user_id']))
+        except (TypeError, ValueError):
+            user = None
+    else:
+        user = users_by_name.get(item.get('username'))
+    if user is None or not user['is_active']:
+        raise ValueError('用户不存在或已停用')
+
+    # 排班日期默认取打卡时间的日期，跨零点班次的下班打卡需显式提供 work_date
+    if item.get('work_date'):
+        work_date = parse_date(item['work_date'])
+    elif item.get('time'):
+        try:
+            work_date = datetime.fromisoformat(str(item['time'])).date()
+        except ValueError:
+            raise ValueError(f'时间格式无效: {item["time"]}')
+    else:
+        raise ValueError('缺少 time 或 work_date')
+    return user['id'], work_date, event_type
+
+
+def load_shift_ids(keys):
+    """查询 (用户, 日期) 对应排班的班次ID，用于新建考勤记录"""
+    user_ids = sorted({user_id for user_id, _ in keys})
+    dates = sorted({work_date for _, work_date in keys})
+    shift_ids = {}
+    for i in range(0, len(user_ids), IN_CHUNK_SIZE):
+        rows = db.session.query(Schedule.user_id, Schedule.work_date, Schedule.shift_type_id).filter(
+            Schedule.user_id.in_(user_ids[i:i + IN_CHUNK_SIZE]),
+            Schedule.work_date.in_(dates)
+        ).all()
+        shift_ids.update(((user_id, work_date), shift_type_id) for user_id, work_date, shift_type_id in rows)
+    return shift_ids
+
+
+def ingest_clock_events(items):
+    """批量写入打卡事件（不提交事务）
+
+    每种事件类型一条 UPSERT 语句：新建的考勤记录只标记该类型已打卡，
+    已有记录只更新该类型的打卡状态；随后取消这些用户当天对应类型的待发送提醒。
+    返回汇总结果和无效事件的错误明细。
+    """
+    if not isinstance(items, list):
+        raise ClockEventError('请求体应为事件数组或 {"events": [...]}')
+    if len(items) > MAX_EVENTS:
+        raise ClockEventError(f'单次最多提交 {MAX_EVENTS} 个事件')
+
+    users_by_name = {user['username']: user for user in lookup_cache.active_users()}
+    keys = {event_type: set() for event_type in EVENT_TYPES}
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            user_id, work_date, event_type = parse_event(item, users_by_name)
+        except ValueError as e:
+            errors.append({'index': index, 'message': str(e)})
+            continue
+        keys[event_type].add((user_id, work_date))
+
+    conn = db.session.connection()
+    attendance = AttendanceRecord.__table__
+    jobs = ReminderJob.__table__
+    shift_ids = load_shift_ids(set().union(*keys.values()))
+    now = datetime.utcnow()
+    cancelled = 0
+    for event_type, (status_column, job_kind) in EVENT_TYPES.items():
+        if not keys[event_type]:
+            continue
+        rows = [{
+            'user_id': user_id,
+            'work_date': work_date,
+            'shift_type_id': shift_ids.get((user_id, work_date)),
+            'clock_in_status': NOT_CLOCKED,
+            'clock_out_status': NOT_CLOCKED,
+            'clock_in_reminded': False,
+            'clock_out_reminded': False,
+            'created_at': now,
+            'updated_at': now,
+            status_column: CLOCKED_IN
+        } for user_id, work_date in sorted(keys[event_type])]
+        conn.execute(upsert(attendance, conn, ['user_id', 'work_date'], [status_column, 'updated_at']), rows)
+        cancelled += conn.execute(update(jobs).where(
+            jobs.c.user_id == bindparam('_user_id'),
+            jobs.c.work_date == bindparam('_work_date'),
+            jobs.c.kind == job_kind,
+            jobs.c.state == PENDING
+        ).values(state=CANCELLED, updated_at=now), [
+            {'_user_id': user_id, '_work_date': work_date} for user_id, work_date in keys[event_type]
+        ]).rowcount
+
+    return {
+        'received': len(items),
+        'accepted': len(items) - len(errors),
+        'rejected': len(errors),
+        'clock_in': len(keys['clock_in']),
+        'clock_out': len(keys['clock_out']),
+        'cancelled_reminders': max(cancelled, 0),
+        'errors': errors
+    }
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班复制服务
+将源日期范围内的排班按天数偏移复制到目标范围，单条 INSERT ... SELECT 完成写入，
+冲突时跳过或覆盖，并支持只统计差异的预览
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, func, literal, or_, select
+from ..models import db, User, Schedule
+from .roster import SCHEDULE_KEY, SCHEDULE_UPDATE_COLUMNS, iter_dates
+from .invalidation import invalidate_schedule_range
+from .sql import date_add_days, insert_ignore, upsert
+
+MAX_CLONE_DAYS = 366
+PREVIEW_LIMIT = 200
+CONFLICT_MODES = ('skip', 'overwrite')
+INSERT_COLUMNS = ['user_id', 'work_date', 'shift_type_id', 'is_rest_day', 'note', 'created_at', 'updated_at']
+
+
+class CloneError(ValueError):
+    """复制参数错误"""
+
+
+class ScheduleCloner:
+    """排班复制
+
+    源排班只取启用用户的记录；user_ids 为空时复制全部用户。
+    """
+
+    def __init__(self, source_start, source_end, target_start, user_ids=None, include_rest=True, conflict='skip'):
+        if source_end < source_start:
+            raise CloneError('源结束日期不能早于开始日期')
+        span = (source_end - source_start).days + 1
+        if span > MAX_CLONE_DAYS:
+            raise CloneError(f'复制范围不能超过 {MAX_CLONE_DAYS} 天')
+        self.offset = (target_start - source_start).days
+        if abs(self.offset) < span:
+            raise CloneError('目标范围不能与源范围重叠')
+        if conflict not in CONFLICT_MODES:
+            raise CloneError(f'不支持的冲突处理方式: {conflict}')
+        self.source_start = source_start
+        self.source_end = source_end
+        self.target_start = target_start
+        self.target_end = source_end + timedelta(days=self.offset)
+        self.user_ids = list(user_ids or [])
+        self.include_rest = include_rest
+        self.conflict = conflict
+
+        self.connection = db.session.connection()
+        self.source = Schedule.__table__.alias('source')
+        self.target = Schedule.__table__.alias('target')
+        self.users = User.__table__
+        self.target_date = date_add_days(self.source.c.work_date, self.offset, self.connection)
+
+    def source_from(self):
+        """源排班关联启用用户"""
+        return self.source.join(self.users, and_(self.users.c.id == self.source.c.user_id,
+                                                 self.users.c.is_active == True))
+
+    def diff_from(self):
+        """源排班左关联目标日期上的已有排班"""
+        return self.source_from().outerjoin(self.target, and_(
+            self.target.c.user_id == self.source.c.user_id,
+            self.target.c.work_date == self.target_date
+        ))
+
+    def conditions(self):
+        """源排班过滤条件"""
+        conditions = [self.source.c.work_date >= self.source_start, self.source.c.work_date <= self.source_end]
+        if self.user_ids:
+            conditions.append(self.source.c.user_id.in_(self.user_ids))
+        if not self.include_rest:
+            conditions.append(self.source.c.is_rest_day == False)
+        return conditions
+
+    def same_as_target(self):
+        """目标已有排班与源排班相同"""
+        return and_(
+            self.target.c.is_rest_day == self.source.c.is_rest_day,
+            or_(self.target.c.shift_type_id == self.source.c.shift_type_id,
+                and_(self.target.c.shift_type_id.is_(None), self.source.c.shift_type_id.is_(None)))
+        )
+
+    def summarize(self):
+        """一次聚合查询统计 新增/相同/冲突 条数"""
+        total, new, unchanged = self.connection.execute(select(
+            func.count(self.source.c.id),
+            func.coalesce(func.sum(case((self.target.c.id.is_(None), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((and_(self.target.c.id.isnot(None), self.same_as_target()), 1), else_=0)), 0)
+        ).select_from(self.diff_from()).where(*self.conditions())).one()
+        conflicts = total - new - unchanged
+        return {
+            'source_rows': total,
+            'new': new,
+            'unchanged': unchanged,
+            'conflicts': conflicts,
+            'will_write': new + (conflicts if self.conflict == 'overwrite' else 0)
+        }
+
+    def preview(self):
+        """差异明细（冲突优先，最多 PREVIEW_LIMIT 条）"""
+        rows = self.connection.execute(select(
+            self.source.c.user_id, self.users.c.username, self.source.c.work_date, self.source.c.shift_type_id,
+            self.source.c.is_rest_day, self.target.c.id, self.target.c.shift_type_id, self.target.c.is_rest_day
+        ).select_from(self.diff_from()).where(
+            *self.conditions(),
+            or_(self.target.c.id.is_(None), ~self.same_as_target())
+        ).order_by(
+            self.target.c.id.is_(None), self.source.c.work_date, self.source.c.user_id
+        ).limit(PREVIEW_LIMIT)).all()
+        return [{
+            'user_id': user_id,
+            'username': username,
+            'source_date': work_date.isoformat(),
+            'target_date': (work_date + timedelta(days=self.offset)).isoformat(),
+            'shift_type_id': shift_type_id,
+            'is_rest_day': is_rest_day,
+            'action': 'insert' if target_id is None else ('update' if self.conflict == 'overwrite' else 'skip'),
+            'existing': None if target_id is None else {
+                'id': target_id, 'shift_type_id': target_shift_id, 'is_rest_day': target_rest
+            }
+        } for user_id, username, work_date, shift_type_id, is_rest_day, target_id, target_shift_id, target_rest in rows]
+
+    def execute(self):
+        """单条 INSERT ... SELECT 写入（不提交事务）"""
+        now = datetime.utcnow()
+        rows = select(
+            self.source.c.user_id, self.target_date, self.source.c.shift_type_id, self.source.c.is_rest_day,
+            self.source.c.note, literal(now, db.DateTime), literal(now, db.DateTime)
+        ).select_from(self.source_from()).where(*self.conditions())
+        table = Schedule.__table__
+        if self.conflict == 'overwrite':
+            stmt = upsert(table, self.connection, SCHEDULE_KEY, SCHEDULE_UPDATE_COLUMNS)
+        else:
+            stmt = insert_ignore(table, self.connection, SCHEDULE_KEY)
+        self.connection.execute(stmt.from_select(INSERT_COLUMNS, rows))
+
+        user_ids = [user_id for user_id, in self.connection.execute(
+            select(self.source.c.user_id).distinct().select_from(self.source_from()).where(*self.conditions())
+        )]
+        invalidate_schedule_range(user_ids, set(iter_dates(self.target_start, self.target_end)))
+
+
+def clone_schedules(source_start, source_end, target_start, user_ids=None, include_rest=True,
+                    conflict='skip', dry_run=True):
+    """复制排班，返回差异统计；dry_run 时附带差异明细且不写入（不提交事务）"""
+    cloner = ScheduleCloner(source_start, source_end, target_start, user_ids, include_rest, conflict)
+    report = {
+        'source_start': source_start.isoformat(),
+        'source_end': source_end.isoformat(),
+        'target_start': cloner.target_start.isoformat(),
+        'target_end': cloner.target_end.isoformat(),
+        'offset_days': cloner.offset,
+        'conflict': conflict,
+        'dry_run': dry_run,
+        **cloner.summarize()
+    }
+    if dry_run:
+        report['preview'] = cloner.preview()
+    elif report['source_rows']:
+        cloner.execute()
+    return report
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班覆盖率分析
+按 日期 × 班次 统计在岗人数，并与班次配置的最少/最多人数比较，找出缺员和超编
+在岗人数汇总在 shift_coverage 表中，排班变更时只重新汇总受影响的日期
+确保中文字符编码正确处理
+"""
+
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import bindparam, delete, func, select
+from ..models import db, Schedule, ShiftType, ShiftCoverage
+from .sql import upsert
+
+# IN 列表分块大小，兼容SQLite的参数个数限制
+DATE_CHUNK_SIZE = 500
+# 单次分析允许的最大天数
+MAX_COVERAGE_DAYS = 366
+
+
+class CoverageError(ValueError):
+    """覆盖率查询参数错误"""
+
+
+def refresh_coverage(dates, connection=None):
+    """重新汇总给定日期的各班次在岗人数
+
+    按日期 GROUP BY 统计最新人数（结果不超过 日期数 × 班次数 行），
+    UPSERT 写入后删除已无排班的 (日期, 班次) 行，与排班修改在同一事务中执行。
+    """
+    dates = sorted(set(dates))
+    if not dates:
+        return
+    conn = connection if connection is not None else db.session.connection()
+    coverage = ShiftCoverage.__table__
+    schedules = Schedule.__table__
+    for i in range(0, len(dates), DATE_CHUNK_SIZE):
+        chunk = dates[i:i + DATE_CHUNK_SIZE]
+        counts = conn.execute(select(
+            schedules.c.work_date, schedules.c.shift_type_id, func.count(schedules.c.id)
+        ).where(
+            schedules.c.work_date.in_(chunk),
+            schedules.c.shift_type_id.isnot(None),
+            schedules.c.is_rest_day == False
+        ).group_by(schedules.c.work_date, schedules.c.shift_type_id)).all()
+        fresh = {(work_date, shift_type_id): count for work_date, shift_type_id, count in counts}
+
+        stale = [
+            {'_work_date': work_date, '_shift_type_id': shift_type_id}
+            for work_date, shift_type_id in conn.execute(select(
+                coverage.c.work_date, coverage.c.shift_type_id
+            ).where(coverage.c.work_date.in_(chunk)))
+            if (work_date, shift_type_id) not in fresh
+        ]
+        if stale:
+            conn.execute(delete(coverage).where(
+                coverage.c.work_date == bindparam('_work_date'),
+                coverage.c.shift_type_id == bindparam('_shift_type_id')
+            ), stale)
+        if fresh:
+            conn.execute(upsert(coverage, conn, ['work_date', 'shift_type_id'], ['headcount']), [
+                {'work_date': work_date, 'shift_type_id': shift_type_id, 'headcount': count}
+                for (work_date, shift_type_id), count in fresh.items()
+            ])
+
+
+def rebuild_coverage():
+    """全量重建在岗人数汇总（用于已有数据库首次启用）"""
+    dates = [row[0] for row in db.session.query(Schedule.work_date).distinct()]
+    db.session.execute(delete(ShiftCoverage.__table__))
+    refresh_coverage(dates)
+    db.session.commit()
+    return len(dates)
+
+
+def load_headcount_matrix(start_date, end_date, shift_ids):
+    """读取 (天数, 班次数) 的在岗人数矩阵，列顺序与 shift_ids 一致"""
+    days = (end_date - start_date).days + 1
+    matrix = np.zeros((days, len(shift_ids)), dtype=np.int64)
+    if not shift_ids:
+        return matrix
+    rows = db.session.query(
+        ShiftCoverage.work_date, ShiftCoverage.shift_type_id, ShiftCoverage.headcount
+    ).filter(
+        ShiftCoverage.work_date >= start_date,
+        ShiftCoverage.work_date <= end_date,
+        ShiftCoverage.shift_type_id.in_(shift_ids)
+    ).all()
+    if rows:
+        column = {shift_id: index for index, shift_id in enumerate(shift_ids)}
+        day_index = np.fromiter(((work_date - start_date).days for work_date, _, _ in rows), np.int64, len(rows))
+        shift_index = np.fromiter((column[shift_id] for _, shift_id, _ in rows), np.int64, len(rows))
+        matrix[day_index, shift_index] = np.fromiter((count for _, _, count in rows), np.int64, len(rows))
+    return matrix
+
+
+def analyze_coverage(start_date, end_date):
+    """分析日期范围内启用班次的在岗人数
+
+    返回人数矩阵，以及低于最少人数的缺员项和高于最多人数的超编项。
+    未配置最少/最多人数的班次不参与对应比较。
+    """
+    if end_date < start_date:
+        raise CoverageError('结束日期不能早于开始日期')
+    if (end_date - start_date).days + 1 > MAX_COVERAGE_DAYS:
+        raise CoverageError(f'查询范围不能超过 {MAX_COVERAGE_DAYS} 天')
+
+    shifts = db.session.query(
+        ShiftType.id, ShiftType.name, ShiftType.color, ShiftType.min_staff, ShiftType.max_staff
+    ).filter(ShiftType.is_active == True).order_by(ShiftType.id).all()
+    shift_ids = [shift.id for shift in shifts]
+    matrix = load_headcount_matrix(start_date, end_date, shift_ids)
+
+    # 未配置的下限/上限用不会触发比较的值代替，整表一次广播比较
+    minimums = np.array([shift.min_staff if shift.min_staff is not None else 0 for shift in shifts], dtype=np.int64)
+    maximums = np.array([shift.max_staff if shift.max_staff is not None else np.iinfo(np.int64).max
+                         for shift in shifts], dtype=np.int64)
+    shortage = minimums[np.newaxis, :] - matrix
+    excess = matrix - maximums[np.newaxis, :]
+
+    def date_at(day):
+        return (start_date + timedelta(days=int(day))).isoformat()
+
+    gaps = [{
+        'date': date_at(day),
+        'shift_type_id': shifts[col].id,
+        'shift_name': shifts[col].name,
+        'headcount': int(matrix[day, col]),
+        'min_staff': shifts[col].min_staff,
+        'shortage': int(shortage[day, col])
+    } for day, col in zip(*np.nonzero(shortage > 0))]
+    overloads = [{
+        'date': date_at(day),
+        'shift_type_id': shifts[col].id,
+        'shift_name': shifts[col].name,
+        'headcount': int(matrix[day, col]),
+        'max_staff': shifts[col].max_staff,
+        'excess': int(excess[day, col])
+    } for day, col in zip(*np.nonzero(excess > 0))]
+
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'shifts': [{
+            'id': shift.id,
+            'name': shift.name,
+            'color': shift.color,
+            'min_staff': shift.min_staff,
+            'max_staff': shift.max_staff
+        } for shift in shifts],
+        'dates': [date_at(day) for day in range(matrix.shape[0])],
+        'matrix': matrix.tolist(),
+        'gaps': gaps,
+        'overloads': overloads
+    }
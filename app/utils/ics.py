@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+iCalendar订阅服务
+为每个用户生成 .ics 排班订阅，按用户版本号缓存，仅在该用户排班变更时重新生成
+确保中文字符编码正确处理
+"""
+
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from flask import current_app
+from ..models import db, Schedule, ShiftType, CalendarFeed
+from .cache import LocalCache, get_version_info
+
+ICS_NAMESPACE = 'ics'
+PRODID = '-//DingTalk Reminder//Schedule Feed//CN'
+
+
+def user_version_name(user_id):
+    """用户订阅缓存版本的命名空间"""
+    return f'{ICS_NAMESPACE}:user:{user_id}'
+
+
+def get_or_create_feed(user, rotate=False):
+    """获取用户的订阅记录，不存在或需要轮换时生成新令牌"""
+    feed = CalendarFeed.query.filter_by(user_id=user.id).first()
+    if feed is None:
+        feed = CalendarFeed(user_id=user.id, token=secrets.token_urlsafe(32))
+        db.session.add(feed)
+        db.session.commit()
+    elif rotate:
+        feed.token = secrets.token_urlsafe(32)
+        db.session.commit()
+    return feed
+
+
+def _escape(text):
+    """转义TEXT属性值"""
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """按RFC 5545以75字节折行"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        # 避免截断多字节字符
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+        limit = 74
+    return '\r\n '.join(parts)
+
+
+def _utc_stamp(value):
+    """格式化为UTC时间戳 YYYYMMDDTHHMMSSZ"""
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local_to_utc(work_date, hhmm, tz):
+    """将时区内的日期 + HH:MM 转换为UTC时间"""
+    hour, minute = (int(part) for part in hhmm.split(':'))
+    local = datetime(work_date.year, work_date.month, work_date.day, hour, minute, tzinfo=tz)
+    return local.astimezone(timezone.utc)
+
+
+def build_user_ics(user_id, today, tz_name, past_days, future_days, host='localhost'):
+    """生成单个用户的iCalendar内容"""
+    tz = ZoneInfo(tz_name)
+    rows = db.session.query(
+        Schedule.id,
+        Schedule.work_date,
+        Schedule.is_rest_day,
+        Schedule.note,
+        Schedule.updated_at,
+        ShiftType.name,
+        ShiftType.start_time,
+        ShiftType.end_time
+    ).outerjoin(
+        ShiftType, Schedule.shift_type_id == ShiftType.id
+    ).filter(
+        Schedule.user_id == user_id,
+        Schedule.work_date >= today - timedelta(days=past_days),
+        Schedule.work_date <= today + timedelta(days=future_days)
+    ).order_by(Schedule.work_date, Schedule.id).all()
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape("排班")}',
+        f'X-WR-TIMEZONE:{tz_name}',
+    ]
+    for (schedule_id, work_date, is_rest_day, note, updated_at,
+         shift_name, start_time, end_time) in rows:
+        if not is_rest_day and shift_name is None:
+            continue
+        event_lines = [
+            'BEGIN:VEVENT',
+            f'UID:schedule-{schedule_id}@{host}',
+            f'DTSTAMP:{_utc_stamp(updated_at)}',
+        ]
+        if is_rest_day:
+            event_lines += [
+                f'DTSTART;VALUE=DATE:{work_date.strftime("%Y%m%d")}',
+                f'DTEND;VALUE=DATE:{(work_date + timedelta(days=1)).strftime("%Y%m%d")}',
+                f'SUMMARY:{_escape("休息")}',
+                'TRANSP:TRANSPARENT',
+            ]
+        else:
+            start = _local_to_utc(work_date, start_time, tz)
+            end = _local_to_utc(work_date, end_time, tz)
+            if end <= start:
+                # 跨零点班次在次日结束
+                end = _local_to_utc(work_date + timedelta(days=1), end_time, tz)
+            event_lines += [
+                f'DTSTART:{_utc_stamp(start)}',
+                f'DTEND:{_utc_stamp(end)}',
+                f'SUMMARY:{_escape(shift_name)}',
+            ]
+        if note:
+            event_lines.append(f'DESCRIPTION:{_escape(note)}')
+        event_lines.append('END:VEVENT')
+        lines.extend(event_lines)
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode('utf-8')
+
+
+class ICSFeedCache:
+    """按用户缓存生成后的订阅内容"""
+
+    def __init__(self, max_entries=1024):
+        self._cache = LocalCache(max_entries)
+
+    def get_state(self, user_id, today):
+        """读取用户订阅的版本状态，返回 (ETag, Last-Modified（带时区的UTC时间）, 版本键)"""
+        names = [ICS_NAMESPACE, user_version_name(user_id)]
+        info = get_version_info(names)
+        version = (today.isoformat(),) + tuple(info[name][0] for name in names)
+        # 订阅窗口随日期滚动，最后修改时间不早于配置时区的当日零点；版本号更新时间为UTC
+        tz = ZoneInfo(current_app.config.get('TIMEZONE', 'Asia/Shanghai'))
+        midnight = datetime(today.year, today.month, today.day, tzinfo=tz).astimezone(timezone.utc)
+        last_modified = max([midnight] + [info[name][1].replace(tzinfo=timezone.utc)
+                                          for name in names if info[name][1]])
+        etag = hashlib.sha1(f'{user_id}|{version}'.encode('utf-8')).hexdigest()
+        return etag, last_modified, version
+
+    def get_feed(self, user_id, version, today, host='localhost'):
+        """获取用户订阅内容，版本未变时直接复用缓存"""
+        body = self._cache.get(user_id, version)
+        if body is None:
+            config = current_app.config
+            body = build_user_ics(
+                user_id, today,
+                config.get('TIMEZONE', 'Asia/Shanghai'),
+                config.get('ICS_PAST_DAYS', 30),
+                config.get('ICS_FUTURE_DAYS', 180),
+                host
+            )
+            self._cache.set(user_id, version, body)
+        return body
+
+    def clear(self):
+        """清空本进程缓存"""
+        self._cache.clear()
+
+
+# 全局订阅缓存实例
+ics_cache = ICSFeedCache()
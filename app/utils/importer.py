@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班导入服务
+流式读取CSV/XLSX文件，逐行校验，并按块批量UPSERT（已有排班则更新）
+确保中文字符编码正确处理
+"""
+
+import csv
+import io
+from datetime import datetime, date
+from ..models import db, User, ShiftType
+from .roster import existing_schedule_keys, upsert_schedules
+
+# 每个事务写入的行数
+CHUNK_SIZE = 2000
+# 错误报告中保留的最大条数，超出部分只计数
+MAX_REPORTED_ERRORS = 1000
+
+# 表头别名 -> 字段
+HEADER_ALIASES = {
+    'username': 'username', '用户名': 'username', '用户': 'username',
+    'work_date': 'work_date', 'date': 'work_date', '日期': 'work_date', '工作日期': 'work_date',
+    'shift': 'shift', 'shift_name': 'shift', '班次': 'shift', '班次名称': 'shift',
+    'is_rest_day': 'is_rest_day', 'rest': 'is_rest_day', '休息日': 'is_rest_day',
+    'note': 'note', '备注': 'note',
+}
+REST_SHIFT_NAMES = {'休', '休息'}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', '是', '休息'}
+DATE_FORMATS = ('%Y-%m-%d', '%Y/%m/%d', '%Y%m%d')
+
+
+class ScheduleImportError(Exception):
+    """导入文件格式错误"""
+
+
+def iter_csv_rows(stream):
+    """流式读取CSV行（兼容带BOM的UTF-8）"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        for row in csv.reader(text):
+            yield row
+    finally:
+        text.detach()
+
+
+def iter_xlsx_rows(stream):
+    """以openpyxl只读模式流式读取第一个工作表"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for row in workbook.worksheets[0].iter_rows(values_only=True):
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def iter_file_rows(stream, filename):
+    """按扩展名选择读取方式"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return iter_csv_rows(stream)
+    if extension == 'xlsx':
+        return iter_xlsx_rows(stream)
+    raise ScheduleImportError('仅支持CSV或XLSX文件')
+
+
+def _cell_text(value):
+    """单元格值转为去除首尾空白的字符串"""
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def parse_date(value):
+    """解析日期（date/datetime 或 DATE_FORMATS 中任一格式的字符串），无效时抛出ValueError"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = _cell_text(value)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f'日期格式无效: {text}')
+
+
+class ScheduleImporter:
+    """排班导入器
+
+    用户名和班次名称在导入开始时一次性加载为查找表，之后逐行校验，
+    每 chunk_size 行批量写入并提交一次。
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, max_errors=MAX_REPORTED_ERRORS):
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.users = {}
+        self.shifts = {}
+        self.total = 0
+        self.inserted = 0
+        self.updated = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+
+    def load_lookups(self):
+        """加载用户名和班次名称查找表"""
+        self.users = dict(db.session.query(User.username, User.id).filter(User.is_active == True).all())
+        self.shifts = dict(db.session.query(ShiftType.name, ShiftType.id).filter(ShiftType.is_active == True).all())
+
+    def add_error(self, row_number, message):
+        """记录行级错误"""
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row_number, 'message': message})
+
+    def parse_header(self, header):
+        """解析表头，返回 字段 -> 列序号"""
+        columns = {}
+        for index, name in enumerate(header):
+            field = HEADER_ALIASES.get(_cell_text(name).lower())
+            if field and field not in columns:
+                columns[field] = index
+        missing = [field for field in ('username', 'work_date') if field not in columns]
+        if missing or ('shift' not in columns and 'is_rest_day' not in columns):
+            raise ScheduleImportError('表头缺少必需列：用户名、日期、班次')
+        return columns
+
+    def parse_row(self, row, columns):
+        """校验单行并转换为排班字段"""
+        def cell(field):
+            index = columns.get(field)
+            return row[index] if index is not None and index < len(row) else None
+
+        username = _cell_text(cell('username'))
+        if not username:
+            raise ValueError('用户名为空')
+        user_id = self.users.get(username)
+        if user_id is None:
+            raise ValueError(f'用户不存在或已禁用: {username}')
+
+        work_date = parse_date(cell('work_date'))
+
+        shift_name = _cell_text(cell('shift'))
+        is_rest_day = _cell_text(cell('is_rest_day')).lower() in TRUE_VALUES or shift_name in REST_SHIFT_NAMES
+        shift_type_id = None
+        if not is_rest_day:
+            if not shift_name:
+                raise ValueError('非休息日必须填写班次')
+            shift_type_id = self.shifts.get(shift_name)
+            if shift_type_id is None:
+                raise ValueError(f'班次不存在或已停用: {shift_name}')
+
+        note = _cell_text(cell('note')) or None
+        return {
+            'user_id': user_id,
+            'work_date': work_date,
+            'shift_type_id': shift_type_id,
+            'is_rest_day': is_rest_day,
+            'note': note
+        }
+
+    def flush_chunk(self, chunk):
+        """写入一个块：单条批量UPSERT后提交
+
+        写入前查询一次已有排班，仅用于统计新增和更新条数。
+        """
+        if not chunk:
+            return
+        rows = list(chunk.values())
+        existing = existing_schedule_keys(
+            {row['user_id'] for row in rows},
+            min(row['work_date'] for row in rows),
+            max(row['work_date'] for row in rows)
+        )
+        now = datetime.utcnow()
+        for row in rows:
+            row['created_at'] = now
+            row['updated_at'] = now
+        upsert_schedules(rows)
+        db.session.commit()
+        updated = sum(1 for row in rows if (row['user_id'], row['work_date']) in existing)
+        self.inserted += len(rows) - updated
+        self.updated += updated
+
+    def run(self, rows):
+        """执行导入，rows 为逐行产出的可迭代对象（第一行为表头）"""
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            raise ScheduleImportError('文件为空')
+        columns = self.parse_header(header)
+        self.load_lookups()
+
+        # 同一块内同一用户同一天以最后一行为准，被覆盖的行计为重复
+        chunk = {}
+        for row_number, row in enumerate(rows, start=2):
+            if not any(_cell_text(value) for value in row):
+                continue
+            self.total += 1
+            try:
+                values = self.parse_row(row, columns)
+            except ValueError as e:
+                self.add_error(row_number, str(e))
+                continue
+            key = (values['user_id'], values['work_date'])
+            if key in chunk:
+                self.duplicates += 1
+            chunk[key] = values
+            if len(chunk) >= self.chunk_size:
+                self.flush_chunk(chunk)
+                chunk = {}
+        self.flush_chunk(chunk)
+        return self.report()
+
+    def report(self):
+        """导入结果报告，total = inserted + updated + duplicates + error_count"""
+        return {
+            'total': self.total,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'errors_truncated': self.error_count > len(self.errors)
+        }
+
+
+def import_schedule_file(stream, filename, chunk_size=CHUNK_SIZE):
+    """导入上传的排班文件，返回结果报告"""
+    importer = ScheduleImporter(chunk_size=chunk_size)
+    return importer.run(iter_file_rows(stream, filename))
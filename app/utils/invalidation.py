@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入后的缓存失效和派生数据刷新
+每次 flush 只遍历一次变更对象，汇总受影响的用户、日期和配置，
+所有缓存版本号合并为一次递增，再按固定顺序刷新提醒窗口、在岗人数、考勤记录和提醒任务；
+绕过ORM的批量写入通过 invalidate_schedule_range 走同一流程
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..models import db, Schedule, ShiftType, User, SystemConfig
+from .cache import bump_versions
+from .calendar import CALENDAR_NAMESPACE, month_version_name
+from .ics import ICS_NAMESPACE, user_version_name
+from .listing import SCHEDULES_VERSION
+from .lookups import USERS_VERSION, SHIFT_TYPES_VERSION, USER_CACHED_FIELDS
+from .coverage import refresh_coverage
+from .reminders import OVERTIME_KEY, refresh_reminder_windows
+from .attendance import materialize_attendance
+from .reminder_jobs import horizon_dates, sync_reminder_jobs
+
+# 影响日历、订阅、在岗人数、考勤记录或提醒任务的排班字段
+SCHEDULE_FIELDS = ('user_id', 'work_date', 'shift_type_id', 'is_rest_day', 'note')
+
+
+class ChangeSet:
+    """一次写入影响的数据范围"""
+
+    def __init__(self):
+        # 排班变更涉及的用户和日期（含修改前的值）
+        self.user_ids = set()
+        self.dates = set()
+        # 排班新增、删除或改变用户/日期（影响列表总数）
+        self.schedules_moved = False
+        # 用户名变更或用户删除（日历事件包含用户名）
+        self.usernames_changed = False
+        self.users_changed = False
+        self.shift_types_changed = False
+        self.overtime_changed = False
+        # 启用状态变更的用户（需要同步提醒任务）
+        self.activated_user_ids = set()
+
+    def add_schedules(self, user_ids, dates):
+        """记录绕过ORM写入的排班范围"""
+        self.user_ids.update(user_ids)
+        self.dates.update(dates)
+        self.schedules_moved = True
+
+    def __bool__(self):
+        return bool(self.user_ids or self.dates or self.users_changed or self.shift_types_changed
+                    or self.overtime_changed or self.activated_user_ids)
+
+
+def collect_changes(session):
+    """遍历一次本次 flush 的变更对象，汇总影响范围"""
+    changes = ChangeSet()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Schedule):
+            _collect_schedule(session, obj, changes)
+        elif isinstance(obj, ShiftType):
+            changes.shift_types_changed = True
+        elif isinstance(obj, SystemConfig):
+            if obj.key == OVERTIME_KEY:
+                changes.overtime_changed = True
+        elif isinstance(obj, User):
+            _collect_user(session, obj, changes)
+    return changes
+
+
+def _collect_schedule(session, obj, changes):
+    state = inspect(obj)
+    if obj in session.new or obj in session.deleted:
+        changes.schedules_moved = True
+    elif not any(state.attrs[name].history.has_changes() for name in SCHEDULE_FIELDS):
+        return
+    elif state.attrs.user_id.history.has_changes() or state.attrs.work_date.history.has_changes():
+        changes.schedules_moved = True
+    changes.user_ids.update(value for value in [obj.user_id, *state.attrs.user_id.history.deleted]
+                            if value is not None)
+    changes.dates.update(value for value in [obj.work_date, *state.attrs.work_date.history.deleted]
+                         if value is not None)
+
+
+def _collect_user(session, obj, changes):
+    if obj in session.new:
+        changes.users_changed = True
+        return
+    if obj in session.deleted:
+        changes.users_changed = True
+        changes.usernames_changed = True
+        return
+    state = inspect(obj)
+    if any(state.attrs[field].history.has_changes() for field in USER_CACHED_FIELDS):
+        changes.users_changed = True
+    if state.attrs.username.history.has_changes():
+        changes.usernames_changed = True
+    if state.attrs.is_active.history.has_changes():
+        changes.activated_user_ids.add(obj.id)
+
+
+def version_names(changes):
+    """需要递增的缓存版本号"""
+    names = {month_version_name(work_date) for work_date in changes.dates}
+    names.update(user_version_name(user_id) for user_id in changes.user_ids)
+    if changes.schedules_moved:
+        names.add(SCHEDULES_VERSION)
+    if changes.usernames_changed or changes.shift_types_changed:
+        names.add(CALENDAR_NAMESPACE)
+    if changes.shift_types_changed:
+        names.update([ICS_NAMESPACE, SHIFT_TYPES_VERSION])
+    if changes.users_changed:
+        names.add(USERS_VERSION)
+    return names
+
+
+def apply_changes(changes, connection=None, today=None):
+    """按固定顺序使缓存失效并刷新派生数据（与数据修改在同一事务内，不提交）
+
+    1. 一次递增全部受影响的缓存版本号（按名称排序，多个事务加锁顺序一致）
+    2. 班次或加班时间变更时重建提醒窗口
+    3. 重新汇总受影响日期的在岗人数
+    4. 补齐预生成范围内的考勤记录
+    5. 同步物化范围内的提醒任务（依赖第2步的提醒窗口）
+    """
+    if not changes:
+        return
+    conn = connection if connection is not None else db.session.connection()
+    today = today or datetime.now().date()
+    bump_versions(version_names(changes), conn)
+    windows_changed = changes.shift_types_changed or changes.overtime_changed
+    if windows_changed:
+        refresh_reminder_windows(conn)
+    refresh_coverage(changes.dates, conn)
+    if changes.user_ids:
+        materialize_attendance(changes.dates, changes.user_ids, conn, today)
+    if windows_changed:
+        sync_reminder_jobs(horizon_dates(today), connection=conn, today=today)
+        return
+    if changes.user_ids:
+        sync_reminder_jobs(changes.dates, changes.user_ids, conn, today)
+    if changes.activated_user_ids:
+        sync_reminder_jobs(horizon_dates(today), changes.activated_user_ids, conn, today)
+
+
+def invalidate_schedule_range(user_ids, dates, connection=None):
+    """绕过ORM写入排班后（批量INSERT、INSERT ... SELECT 等），按用户集合和日期集合使缓存失效并刷新派生数据"""
+    changes = ChangeSet()
+    changes.add_schedules(user_ids, dates)
+    apply_changes(changes, connection)
+
+
+@event.listens_for(Session, 'after_flush')
+def _apply_changes_on_flush(session, flush_context):
+    """ORM写入的统一入口"""
+    changes = collect_changes(session)
+    if changes:
+        apply_changes(changes, session.connection())
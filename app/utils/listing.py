@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班列表查询
+按 (work_date, id) 倒序的游标分页，单条关联投影查询取回列表所需字段，
+总数按需统计并以版本号缓存
+确保中文字符编码正确处理
+"""
+
+import base64
+from datetime import datetime
+from sqlalchemy import func, and_, or_
+from ..models import db, Schedule
+from .cache import LocalCache, get_versions
+from .serializers import schedule_serializer
+
+# 排班总数缓存的版本号名称，排班新增、删除或变更用户/日期时递增
+SCHEDULES_VERSION = 'schedules'
+MAX_PER_PAGE = 100
+
+
+class CursorError(ValueError):
+    """游标格式错误"""
+
+
+def encode_cursor(work_date, schedule_id):
+    """将 (work_date, id) 编码为不透明的游标字符串"""
+    raw = f'{work_date.isoformat()},{schedule_id}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，返回 (work_date, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        work_date, schedule_id = raw.split(',')
+        return datetime.strptime(work_date, '%Y-%m-%d').date(), int(schedule_id)
+    except (ValueError, UnicodeDecodeError):
+        raise CursorError('分页游标无效')
+
+
+def apply_filters(query, user_id=None, start_date=None, end_date=None):
+    """应用用户和日期过滤条件"""
+    if user_id:
+        query = query.filter(Schedule.user_id == user_id)
+    if start_date:
+        query = query.filter(Schedule.work_date >= start_date)
+    if end_date:
+        query = query.filter(Schedule.work_date <= end_date)
+    return query
+
+
+def list_schedule_page(user_id=None, start_date=None, end_date=None, cursor=None, per_page=20):
+    """查询一页排班
+
+    按 work_date、id 倒序，cursor 为上一页最后一条的游标。
+    多取一条用于判断是否还有下一页，不执行 COUNT。
+    返回 (排班字典列表, 下一页游标或None)。
+    """
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    query = apply_filters(schedule_serializer.query(), user_id, start_date, end_date)
+
+    if cursor:
+        last_date, last_id = decode_cursor(cursor)
+        # work_date <= 游标日期 作为索引范围条件，其余在范围内过滤
+        query = query.filter(
+            Schedule.work_date <= last_date,
+            or_(Schedule.work_date < last_date, and_(Schedule.work_date == last_date, Schedule.id < last_id))
+        )
+
+    rows = query.order_by(Schedule.work_date.desc(), Schedule.id.desc()).limit(per_page + 1).all()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].work_date, rows[-1].id)
+    return schedule_serializer.dump_rows(rows), next_cursor
+
+
+class ScheduleCountCache:
+    """按过滤条件缓存排班总数，排班增删或改变用户/日期时失效"""
+
+    def __init__(self, max_entries=256):
+        self._cache = LocalCache(max_entries)
+
+    def count(self, user_id=None, start_date=None, end_date=None):
+        """返回满足过滤条件的排班总数"""
+        version = get_versions([SCHEDULES_VERSION])[SCHEDULES_VERSION]
+        key = (user_id, start_date, end_date)
+        total = self._cache.get(key, version)
+        if total is None:
+            total = apply_filters(db.session.query(func.count(Schedule.id)), user_id, start_date, end_date).scalar()
+            self._cache.set(key, version, total)
+        return total
+
+    def clear(self):
+        """清空进程内缓存"""
+        self._cache.clear()
+
+
+# 全局排班总数缓存实例
+schedule_count_cache = ScheduleCountCache()
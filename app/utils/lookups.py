@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户和班次类型查找缓存
+两张表数据量小且很少修改，按版本号缓存在进程内，供表单选项、列表接口和调度器共用；
+用户或班次类型写入时在同一事务内递增版本号，各worker下次读取时重新加载
+确保中文字符编码正确处理
+"""
+
+from ..models import User, ShiftType
+from .cache import LocalCache, get_versions, bump_versions
+from .serializers import user_serializer, shift_type_serializer
+
+USERS_VERSION = 'users'
+SHIFT_TYPES_VERSION = 'shift_types'
+# 影响缓存内容的用户字段，密码等变更不使缓存失效
+USER_CACHED_FIELDS = ('username', 'email', 'is_admin', 'is_active')
+
+
+class Record(dict):
+    """缓存记录：与 to_dict() 相同的字典，同时支持属性访问（如 user.username）"""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class Lookup:
+    """一张表的全部记录（按 order_by 排序）及按ID索引"""
+
+    def __init__(self, records):
+        self.records = records
+        self.active = [record for record in records if record['is_active']]
+        self.by_id = {record['id']: record for record in records}
+
+
+class LookupCache:
+    """用户和班次类型的版本化只读缓存
+
+    返回的记录在多个请求间共享，调用方不要修改。
+    """
+
+    def __init__(self):
+        self._cache = LocalCache(max_entries=8)
+
+    def _load(self, version_name, serializer, order_by):
+        version = get_versions([version_name])[version_name]
+        lookup = self._cache.get(version_name, version)
+        if lookup is None:
+            rows = serializer.query().order_by(order_by).all()
+            lookup = Lookup([Record(item) for item in serializer.dump_rows(rows)])
+            self._cache.set(version_name, version, lookup)
+        return lookup
+
+    def _users(self):
+        return self._load(USERS_VERSION, user_serializer, User.username)
+
+    def _shift_types(self):
+        return self._load(SHIFT_TYPES_VERSION, shift_type_serializer, ShiftType.name)
+
+    def active_users(self):
+        """启用的用户（按用户名排序）"""
+        return self._users().active
+
+    def user(self, user_id):
+        """按ID查找用户，不存在时返回None"""
+        return self._users().by_id.get(user_id)
+
+    def inactive_user_ids(self, user_ids):
+        """给定ID中不存在或已停用的用户（升序）"""
+        users = self._users().by_id
+        return sorted({user_id for user_id in user_ids
+                       if user_id not in users or not users[user_id]['is_active']})
+
+    def user_choices(self):
+        """启用用户的表单选项 [(id, 用户名)]"""
+        return [(user['id'], user['username']) for user in self.active_users()]
+
+    def active_shift_types(self):
+        """启用的班次类型（按名称排序）"""
+        return self._shift_types().active
+
+    def shift_type(self, shift_type_id):
+        """按ID查找班次类型，不存在时返回None"""
+        return self._shift_types().by_id.get(shift_type_id)
+
+    def shift_type_choices(self):
+        """启用班次类型的表单选项 [(id, '名称 (开始-结束)')]"""
+        return [(shift['id'], f"{shift['name']} ({shift['start_time']}-{shift['end_time']})")
+                for shift in self.active_shift_types()]
+
+    def clear(self):
+        """清空进程内缓存"""
+        self._cache.clear()
+
+
+def invalidate_lookups(names=(USERS_VERSION, SHIFT_TYPES_VERSION), connection=None):
+    """使查找缓存失效，绕过ORM写入用户或班次类型时需要显式调用"""
+    bump_versions(names, connection)
+
+
+# 全局查找缓存实例
+lookup_cache = LookupCache()
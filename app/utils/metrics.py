@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Prometheus 指标
+请求延迟、并发请求数、数据库连接池和SQL、调度器检查、打卡提醒、通知Webhook和系统日志写入，
+由 /metrics 以 Prometheus 文本格式导出
+确保中文字符编码正确处理
+
+gunicorn 多进程部署时需在导入应用前设置 PROMETHEUS_MULTIPROC_DIR（见 gunicorn.conf.py），
+各worker把指标写入该目录下的共享文件，/metrics 汇总所有worker的值。
+"""
+
+import os
+import time
+from flask import g, has_app_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from ..models import db, SystemLog
+
+MULTIPROC_ENV = 'PROMETHEUS_MULTIPROC_DIR'
+# 请求、SQL和Webhook耗时的分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+# 提醒延迟：到期到实际发送（秒）
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP请求数', ['method', 'endpoint', 'status'])
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP请求耗时', ['method', 'endpoint'], buckets=LATENCY_BUCKETS)
+HTTP_IN_PROGRESS = Gauge(
+    'http_requests_in_progress', '处理中的HTTP请求数', multiprocess_mode='livesum')
+HTTP_QUERIES = Histogram(
+    'http_request_db_queries', '单个HTTP请求执行的SQL条数', ['endpoint'], buckets=QUERY_COUNT_BUCKETS)
+
+DB_POOL_SIZE = Gauge(
+    'db_pool_size', '数据库连接池容量', multiprocess_mode='livesum')
+DB_POOL_CONNECTIONS = Gauge(
+    'db_pool_connections', '已建立的数据库连接数', multiprocess_mode='livesum')
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out', '正在使用的数据库连接数', multiprocess_mode='livesum')
+DB_QUERIES = Counter(
+    'db_queries_total', 'SQL语句数', ['operation'])
+DB_QUERY_LATENCY = Histogram(
+    'db_query_duration_seconds', 'SQL语句耗时', ['operation'], buckets=QUERY_BUCKETS)
+
+SCHEDULER_TICK = Histogram(
+    'scheduler_tick_duration_seconds', '调度器单次检查耗时', buckets=LATENCY_BUCKETS)
+SCHEDULER_LAST_TICK = Gauge(
+    'scheduler_last_tick_timestamp_seconds', '调度器最近一次检查完成时间（Unix时间戳）', multiprocess_mode='max')
+REMINDERS_DUE = Counter(
+    'reminders_due_total', '认领的到期提醒任务数', ['kind'])
+REMINDERS_FINISHED = Counter(
+    'reminders_finished_total', '处理完成的提醒任务数', ['kind', 'state'])
+REMINDER_LAG = Histogram(
+    'reminder_lag_seconds', '提醒从到期到处理完成的延迟', ['kind'], buckets=LAG_BUCKETS)
+NOTIFICATIONS = Counter(
+    'notifications_total', '提醒通知结果', ['kind', 'result'])
+
+WEBHOOK_REQUESTS = Counter(
+    'webhook_requests_total', '通知Webhook请求数（含重试）', ['channel', 'status'])
+WEBHOOK_LATENCY = Histogram(
+    'webhook_request_duration_seconds', '通知Webhook请求耗时', ['channel'], buckets=LATENCY_BUCKETS)
+
+# 系统日志在请求/调度器自身的事务内同步写入 system_logs，没有后台写入队列，队列深度恒为0，
+# 因此以写入计数代替队列深度；日志写入改为异步队列时应在此补充队列深度 Gauge
+LOG_WRITES = Counter(
+    'system_log_writes_total', '写入的系统日志数', ['level'])
+
+
+def statement_operation(statement):
+    """SQL语句类型（SELECT/INSERT/UPDATE/DELETE/OTHER）"""
+    verb = statement.lstrip()[:6].upper()
+    return verb if verb in ('SELECT', 'INSERT', 'UPDATE', 'DELETE') else 'OTHER'
+
+
+def exposition():
+    """导出指标文本，多进程模式下汇总所有worker"""
+    if os.environ.get(MULTIPROC_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class Metrics:
+    """请求和数据库指标采集扩展"""
+
+    def init_app(self, app):
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_execute)
+        event.listen(engine, 'handle_error', self._on_error)
+        event.listen(engine.pool, 'connect', self._on_connect)
+        event.listen(engine.pool, 'close', self._on_close)
+        event.listen(engine.pool, 'checkout', self._on_checkout)
+        event.listen(engine.pool, 'checkin', self._on_checkin)
+        size = getattr(engine.pool, 'size', None)
+        if callable(size):
+            DB_POOL_SIZE.inc(size())
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_metrics_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('_metrics_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        operation = statement_operation(statement)
+        DB_QUERIES.labels(operation).inc()
+        DB_QUERY_LATENCY.labels(operation).observe(elapsed)
+        if has_app_context() and '_metrics_queries' in g:
+            g._metrics_queries += 1
+
+    def _on_error(self, context):
+        # 语句失败时不会触发 after_cursor_execute，清理开始时间，避免在连接上累积
+        if context.connection is not None:
+            context.connection.info.pop('_metrics_started', None)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.inc()
+
+    def _on_close(self, dbapi_connection, connection_record):
+        DB_POOL_CONNECTIONS.dec()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKED_OUT.inc()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        # 连接失效后归还时 dbapi_connection 为 None，checkout 时已计数，仍需减回
+        DB_POOL_CHECKED_OUT.dec()
+
+    def _start_request(self):
+        if '_metrics_started' in g:
+            return
+        g._metrics_started = time.perf_counter()
+        g._metrics_queries = 0
+        HTTP_IN_PROGRESS.inc()
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+        HTTP_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+        HTTP_QUERIES.labels(endpoint).observe(g.pop('_metrics_queries', 0))
+        HTTP_IN_PROGRESS.dec()
+        return response
+
+    def _teardown_request(self, exc):
+        # 未处理的异常不会经过 after_request，这里补记为500
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return
+        endpoint = request.endpoint or 'unmatched'
+        HTTP_REQUESTS.labels(request.method, endpoint, '500').inc()
+        HTTP_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - started)
+        HTTP_IN_PROGRESS.dec()
+
+
+@event.listens_for(SystemLog, 'after_insert')
+def _count_log_write(mapper, connection, target):
+    LOG_WRITES.labels(target.log_level or 'INFO').inc()
+
+
+# 全局实例
+metrics = Metrics()
@@ -8,9 +8,21 @@
 
 import requests
 import json
+import time
 from datetime import datetime
 from flask import current_app
 from ..models import db, SystemLog, SystemConfig
+from .metrics import NOTIFICATIONS, WEBHOOK_REQUESTS, WEBHOOK_LATENCY
+
+# 请求超时（秒）
+REQUEST_TIMEOUT = 10
+# 未配置 NOTIFICATION_RETRIES / NOTIFICATION_RETRY_BACKOFF 时的默认值：不重试，首次重试等待（秒）之后每次翻倍
+MAX_RETRIES = 0
+RETRY_BACKOFF = 0.5
+# 可重试的HTTP状态码
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# 钉钉机器人限流错误码（HTTP 200 返回）
+DINGTALK_RATE_LIMITED = 130101
 
 class NotificationService:
     """通知服务类"""
@@ -20,6 +32,17 @@ class NotificationService:
         self.check_url = self._get_config('check_url', '')
         self.working_url = self._get_config('working_url', '')
         self.no_work_url = self._get_config('no_work_url', '')
+        self.max_retries, self.retry_backoff = self._retry_settings()
+        # 每个实例独立的连接池，不在线程间共享；调度器每批提醒共用一个实例以复用连接
+        self.http = requests.Session()
+    
+    def _retry_settings(self):
+        """钉钉Webhook重试次数和首次重试等待，取自应用配置；重试会阻塞发送线程，默认关闭"""
+        try:
+            return (int(current_app.config.get('NOTIFICATION_RETRIES', MAX_RETRIES)),
+                    float(current_app.config.get('NOTIFICATION_RETRY_BACKOFF', RETRY_BACKOFF)))
+        except RuntimeError:
+            return MAX_RETRIES, RETRY_BACKOFF
     
     def _get_config(self, key, default=None):
         """获取系统配置"""
@@ -38,16 +61,19 @@ class NotificationService:
                 
                 if status == '未打卡':
                     # 发送钉钉通知
-                    self._send_dingtalk_notification(user, message, notification_type)
+                    sent = self._send_dingtalk_notification(user, message, notification_type)
+                    NOTIFICATIONS.labels(notification_type, {True: 'sent', False: 'failed'}.get(sent, 'unconfigured')).inc()
                     
                     # 发送飞书通知
                     self._send_feishu_notification(user, message, notification_type)
                     
                     self._log('notification_sent', f'向用户 {user.username} 发送{notification_type}通知成功')
                 else:
+                    NOTIFICATIONS.labels(notification_type, 'skipped').inc()
                     self._log('notification_skipped', f'用户 {user.username} 已打卡，跳过通知')
             
         except Exception as e:
+            NOTIFICATIONS.labels(notification_type, 'failed').inc()
             self._log('notification_error', f'发送通知失败: {str(e)}', 'ERROR')
     
     def _check_attendance_status(self, user, check_type):
@@ -69,12 +95,8 @@ class NotificationService:
                 'AirScript-Token': self.api_token
             }
             
-            response = requests.post(
-                self.check_url,
-                headers=headers,
-                json=payload,
-                timeout=10
-            )
+            # 打卡检测只是发送前的判断，失败时按未打卡处理，不重试
+            response = self._post(self.check_url, payload, headers, 'attendance_check', retries=0)
             
             if response.status_code == 200:
                 result_data = response.json()
@@ -95,12 +117,12 @@ class NotificationService:
             return '未打卡'  # 出错时默认认为未打卡
     
     def _send_dingtalk_notification(self, user, message, notification_type):
-        """发送钉钉通知"""
+        """发送钉钉通知，返回是否成功，未配置Webhook时返回None"""
         try:
             url = self.working_url if notification_type == 'check_in' else self.no_work_url
             
             if not url:
-                return
+                return None
             
             # 构建钉钉消息
             dingtalk_message = {
@@ -110,20 +132,51 @@ class NotificationService:
                 }
             }
             
-            response = requests.post(
-                url,
-                json=dingtalk_message,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
-            )
+            response = self._post(url, dingtalk_message, {'Content-Type': 'application/json'}, 'dingtalk',
+                                  retries=self.max_retries)
             
-            if response.status_code == 200:
+            if response.status_code == 200 and self._dingtalk_errcode(response) == 0:
                 self._log('dingtalk_sent', f'钉钉通知发送成功: {user.username}')
-            else:
-                self._log('dingtalk_error', f'钉钉通知发送失败: HTTP {response.status_code}', 'ERROR')
+                return True
+            
+            self._log('dingtalk_error', f'钉钉通知发送失败: HTTP {response.status_code} '
+                                        f'errcode {self._dingtalk_errcode(response)}', 'ERROR')
+            return False
                 
         except Exception as e:
             self._log('dingtalk_error', f'钉钉通知发送异常: {str(e)}', 'ERROR')
+            return False
+    
+    def _post(self, url, payload, headers, channel, retries=0):
+        """POST请求，连接错误、429/5xx 和钉钉限流时按指数退避最多重试 retries 次，仍失败时返回最后一次响应
+
+        每次尝试按 channel 记录Webhook耗时和状态指标。
+        """
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            started = time.perf_counter()
+            try:
+                response = self.http.post(url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException:
+                WEBHOOK_LATENCY.labels(channel).observe(time.perf_counter() - started)
+                WEBHOOK_REQUESTS.labels(channel, 'error').inc()
+                if attempt == retries:
+                    raise
+                continue
+            WEBHOOK_LATENCY.labels(channel).observe(time.perf_counter() - started)
+            WEBHOOK_REQUESTS.labels(channel, str(response.status_code)).inc()
+            if response.status_code not in RETRY_STATUS and self._dingtalk_errcode(response) != DINGTALK_RATE_LIMITED:
+                return response
+        return response
+    
+    def _dingtalk_errcode(self, response):
+        """钉钉接口返回的 errcode，响应不是JSON时视为0"""
+        try:
+            data = response.json()
+        except ValueError:
+            return 0
+        return data.get('errcode', 0) if isinstance(data, dict) else 0
     
     def _send_feishu_notification(self, user, message, notification_type):
         """发送飞书通知"""
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQL性能分析
+按请求（或调度器等后台任务）统计SQL条数、数据库总耗时和慢语句，
+同一请求内相同形状的语句重复多次时标记为疑似 N+1 查询；
+按端点汇总供管理页面查看，并通过响应头返回本次请求的统计
+确保中文字符编码正确处理
+
+开启方式：配置 SQL_PROFILING = True 对所有请求生效；
+或由管理员在请求中携带 X-SQL-Profile: 1 请求头，只分析该请求。
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import current_app, g, has_app_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from ..models import db
+
+PROFILE_HEADER = 'X-SQL-Profile'
+# 每个端点保留的慢语句和重复语句条数
+MAX_SLOW_STATEMENTS = 20
+MAX_REPEATED_SHAPES = 20
+
+# IN (?, ?, ?) 等参数列表归一为 IN (?)，使参数个数不同的语句视为同一形状
+_PARAM = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_PARAM_LIST = re.compile(r'\(\s*' + _PARAM + r'(?:\s*,\s*' + _PARAM + r')+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """语句形状：参数列表和空白归一化后的SQL"""
+    return _WHITESPACE.sub(' ', _PARAM_LIST.sub('(?)', statement)).strip()
+
+
+class QueryProfile:
+    """一次请求或任务内的SQL统计"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.db_ms = 0.0
+        self.shapes = Counter()
+        self.slow = []
+
+    def record(self, statement, elapsed_ms, slow_ms):
+        shape = statement_shape(statement)
+        self.count += 1
+        self.db_ms += elapsed_ms
+        self.shapes[shape] += 1
+        if elapsed_ms >= slow_ms:
+            self.slow.append((elapsed_ms, shape))
+
+    def repeated(self, threshold):
+        """重复次数达到阈值的语句形状 [(形状, 次数)]，即疑似 N+1 查询"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+class SQLProfiler:
+    """SQL性能分析扩展"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._stats = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SQL_PROFILING', False)
+        app.config.setdefault('SQL_SLOW_QUERY_MS', 50)
+        app.config.setdefault('SQL_REPEAT_THRESHOLD', 5)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_execute)
+            event.listen(db.engine, 'handle_error', self._on_error)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_app_context() and g.get('_sql_profile') is not None:
+            conn.info.setdefault('_sql_profile_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('_sql_profile_started')
+        if not started:
+            return
+        elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+        profile = g.get('_sql_profile') if has_app_context() else None
+        if profile is not None:
+            profile.record(statement, elapsed_ms, current_app.config['SQL_SLOW_QUERY_MS'])
+
+    def _on_error(self, context):
+        # 失败的语句没有对应的 after_cursor_execute，丢弃未配对的开始时间
+        if context.connection is not None:
+            context.connection.info.pop('_sql_profile_started', None)
+
+    def _requested(self):
+        """本次请求是否需要分析：全局开启，或管理员携带了分析请求头"""
+        if current_app.config['SQL_PROFILING']:
+            return True
+        if request.headers.get(PROFILE_HEADER) not in ('1', 'true'):
+            return False
+        return current_user.is_authenticated and getattr(current_user, 'is_admin', False)
+
+    def _start_request(self):
+        if g.get('_sql_profile') is None and self._requested():
+            g._sql_profile = QueryProfile(request.endpoint or request.path)
+
+    def _finish_request(self, response):
+        profile = g.pop('_sql_profile', None)
+        if profile is None:
+            return response
+        repeated = self._aggregate(profile)
+        response.headers['X-SQL-Query-Count'] = str(profile.count)
+        response.headers['X-SQL-Time-Ms'] = f'{profile.db_ms:.1f}'
+        response.headers['X-SQL-Repeated'] = str(len(repeated))
+        response.headers.add('Server-Timing', f'db;dur={profile.db_ms:.1f};desc="{profile.count} queries"')
+        return response
+
+    @contextmanager
+    def profile(self, name):
+        """分析请求之外的代码块（如调度器检查），仅在 SQL_PROFILING 开启时生效"""
+        if not has_app_context() or g.get('_sql_profile') is not None \
+                or not current_app.config.get('SQL_PROFILING'):
+            yield None
+            return
+        g._sql_profile = profile = QueryProfile(name)
+        try:
+            yield profile
+        finally:
+            g.pop('_sql_profile', None)
+            self._aggregate(profile)
+
+    def _aggregate(self, profile):
+        """将一次分析结果计入端点汇总，返回疑似 N+1 的语句形状"""
+        repeated = profile.repeated(current_app.config['SQL_REPEAT_THRESHOLD'])
+        with self._lock:
+            stats = self._stats.setdefault(profile.name, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'db_ms': 0.0, 'max_db_ms': 0.0,
+                'repeated_requests': 0, 'repeated': Counter(), 'slow': []
+            })
+            stats['requests'] += 1
+            stats['queries'] += profile.count
+            stats['max_queries'] = max(stats['max_queries'], profile.count)
+            stats['db_ms'] += profile.db_ms
+            stats['max_db_ms'] = max(stats['max_db_ms'], profile.db_ms)
+            if repeated:
+                stats['repeated_requests'] += 1
+                for shape, count in repeated:
+                    stats['repeated'][shape] = max(stats['repeated'][shape], count)
+            if profile.slow:
+                stats['slow'] = sorted(stats['slow'] + profile.slow, reverse=True)[:MAX_SLOW_STATEMENTS]
+        return repeated
+
+    def snapshot(self):
+        """各端点汇总，按数据库总耗时降序"""
+        with self._lock:
+            items = [(name, dict(stats, repeated=stats['repeated'].most_common(MAX_REPEATED_SHAPES),
+                                 slow=list(stats['slow'])))
+                     for name, stats in self._stats.items()]
+        result = []
+        for name, stats in items:
+            result.append({
+                'endpoint': name,
+                'requests': stats['requests'],
+                'avg_queries': round(stats['queries'] / stats['requests'], 1),
+                'max_queries': stats['max_queries'],
+                'avg_db_ms': round(stats['db_ms'] / stats['requests'], 2),
+                'max_db_ms': round(stats['max_db_ms'], 2),
+                'total_db_ms': round(stats['db_ms'], 2),
+                'repeated_requests': stats['repeated_requests'],
+                'repeated': [{'statement': shape, 'max_count': count} for shape, count in stats['repeated']],
+                'slow': [{'statement': shape, 'ms': round(ms, 2)} for ms, shape in stats['slow']]
+            })
+        return sorted(result, key=lambda item: item['total_db_ms'], reverse=True)
+
+    def reset(self):
+        """清空汇总"""
+        with self._lock:
+            self._stats.clear()
+
+
+# 全局实例
+sql_profiler = SQLProfiler()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打卡提醒任务队列
+将 前一天/当天/次日 的排班按提醒窗口物化为 reminder_jobs 行，排班变更时同步受影响的用户和日期，
+调度器按 (state, due_at) 索引取到期任务并以条件更新原子认领，每分钟的开销只与到期提醒数有关
+确保中文字符编码正确处理
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, bindparam, delete, or_, select, update
+from ..models import db, Schedule, User, ShiftReminderWindow, ReminderJob
+from .sql import insert_ignore
+
+PENDING = 'pending'
+CLAIMED = 'claimed'
+SENT = 'sent'
+SKIPPED = 'skipped'
+EXPIRED = 'expired'
+CANCELLED = 'cancelled'
+# 物化范围：今天前后各1天（跨零点班次的提醒可能落在前一天或次日）
+HORIZON_DAYS = 1
+# 每次认领的最大任务数
+CLAIM_BATCH_SIZE = 200
+# 认领后超过该时间仍未完成（如worker退出）的任务可被重新认领
+CLAIM_TIMEOUT = timedelta(minutes=5)
+# 已结束任务的保留天数
+RETENTION_DAYS = 7
+USER_CHUNK_SIZE = 500
+
+
+def horizon_dates(today):
+    """需要物化提醒任务的排班日期"""
+    return [today + timedelta(days=offset) for offset in range(-HORIZON_DAYS, HORIZON_DAYS + 1)]
+
+
+def desired_jobs(connection, dates, user_ids=None):
+    """按排班和提醒窗口计算应有的提醒任务 {(user_id, work_date, kind): 行}"""
+    schedules = Schedule.__table__
+    windows = ShiftReminderWindow.__table__
+    users = User.__table__
+    stmt = select(
+        schedules.c.user_id, schedules.c.work_date, schedules.c.shift_type_id,
+        windows.c.check_in_from, windows.c.check_in_to, windows.c.check_out_from, windows.c.check_out_to
+    ).select_from(schedules.join(
+        windows, windows.c.shift_type_id == schedules.c.shift_type_id
+    ).join(
+        users, and_(users.c.id == schedules.c.user_id, users.c.is_active == True)
+    )).where(schedules.c.work_date.in_(dates), schedules.c.is_rest_day == False)
+    if user_ids is not None:
+        stmt = stmt.where(schedules.c.user_id.in_(user_ids))
+
+    jobs = {}
+    for user_id, work_date, shift_type_id, in_from, in_to, out_from, out_to in connection.execute(stmt):
+        midnight = datetime.combine(work_date, datetime.min.time())
+        # 下班提醒窗口包含结束分钟，过期时间顺延1分钟
+        for kind, due, expire in (('check_in', in_from, in_to), ('check_out', out_from, out_to + 1)):
+            jobs[(user_id, work_date, kind)] = {
+                'user_id': user_id,
+                'work_date': work_date,
+                'shift_type_id': shift_type_id,
+                'kind': kind,
+                'due_at': midnight + timedelta(minutes=due),
+                'expire_at': midnight + timedelta(minutes=expire)
+            }
+    return jobs
+
+
+def sync_reminder_jobs(dates, user_ids=None, connection=None, today=None):
+    """同步给定日期（仅物化范围内）和用户的提醒任务，user_ids 为 None 时同步全部用户
+
+    待发送任务与排班不一致时删除后重建；已发送、已跳过等结束状态的任务保留，不会重复提醒。
+    """
+    conn = connection if connection is not None else db.session.connection()
+    today = today or datetime.now().date()
+    dates = sorted(set(dates) & set(horizon_dates(today)))
+    if not dates:
+        return 0
+    if user_ids is None:
+        chunks = [None]
+    else:
+        user_ids = sorted(set(user_ids))
+        chunks = [user_ids[i:i + USER_CHUNK_SIZE] for i in range(0, len(user_ids), USER_CHUNK_SIZE)]
+    if not chunks:
+        return 0
+
+    table = ReminderJob.__table__
+    now = datetime.utcnow()
+    written = 0
+    for chunk in chunks:
+        desired = desired_jobs(conn, dates, chunk)
+        stmt = select(
+            table.c.id, table.c.user_id, table.c.work_date, table.c.kind, table.c.shift_type_id,
+            table.c.due_at, table.c.expire_at
+        ).where(table.c.work_date.in_(dates), table.c.state == PENDING)
+        if chunk is not None:
+            stmt = stmt.where(table.c.user_id.in_(chunk))
+        stale = []
+        for job_id, user_id, work_date, kind, shift_type_id, due_at, expire_at in conn.execute(stmt):
+            job = desired.get((user_id, work_date, kind))
+            if job is None or (job['shift_type_id'], job['due_at'], job['expire_at']) != (shift_type_id, due_at, expire_at):
+                stale.append({'_id': job_id})
+        if stale:
+            conn.execute(delete(table).where(table.c.id == bindparam('_id')), stale)
+        if desired:
+            rows = [dict(job, state=PENDING, created_at=now, updated_at=now) for job in desired.values()]
+            conn.execute(insert_ignore(table, conn, ['user_id', 'work_date', 'kind']), rows)
+            written += len(rows)
+    return written
+
+
+def materialize_reminder_jobs(now=None):
+    """日期切换时物化新一天的提醒任务，并将过期任务标记为 expired、清理旧任务（提交事务）"""
+    now = now or datetime.now()
+    table = ReminderJob.__table__
+    conn = db.session.connection()
+    written = sync_reminder_jobs(horizon_dates(now.date()), connection=conn, today=now.date())
+    conn.execute(update(table).where(
+        table.c.state == PENDING, table.c.expire_at <= now
+    ).values(state=EXPIRED, updated_at=datetime.utcnow()))
+    conn.execute(delete(table).where(table.c.work_date < now.date() - timedelta(days=RETENTION_DAYS)))
+    db.session.commit()
+    return written
+
+
+def claim_due_jobs(now=None, limit=CLAIM_BATCH_SIZE):
+    """认领到期任务（提交事务），返回 [(任务ID, 用户ID, 班次ID, 排班日期, 类型, 到期时间)]
+
+    先按 (state, due_at) 索引取候选ID，再以 state 条件更新为 claimed 并写入本次认领标识；
+    多个worker并发认领同一任务时只有一个更新成功。
+    """
+    now = now or datetime.now()
+    table = ReminderJob.__table__
+    conn = db.session.connection()
+    claimable = or_(
+        table.c.state == PENDING,
+        and_(table.c.state == CLAIMED, table.c.claimed_at < now - CLAIM_TIMEOUT)
+    )
+    candidates = [job_id for job_id, in conn.execute(select(table.c.id).where(
+        table.c.state.in_([PENDING, CLAIMED]),
+        table.c.due_at <= now,
+        table.c.expire_at > now,
+        claimable
+    ).order_by(table.c.due_at).limit(limit))]
+    if not candidates:
+        db.session.commit()
+        return []
+
+    token = uuid.uuid4().hex
+    conn.execute(update(table).where(table.c.id.in_(candidates), claimable).values(
+        state=CLAIMED, claim_token=token, claimed_at=now, updated_at=datetime.utcnow()
+    ))
+    jobs = conn.execute(select(
+        table.c.id, table.c.user_id, table.c.shift_type_id, table.c.work_date, table.c.kind, table.c.due_at
+    ).where(table.c.claim_token == token).order_by(table.c.due_at, table.c.id)).all()
+    db.session.commit()
+    return jobs
+
+
+def finish_job(job_id, state=SENT):
+    """将已认领任务标记为结束状态（不提交事务）"""
+    table = ReminderJob.__table__
+    db.session.connection().execute(update(table).where(table.c.id == job_id).values(
+        state=state, updated_at=datetime.utcnow()
+    ))
+
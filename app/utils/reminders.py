@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打卡提醒时间窗口
+按班次预先计算 上班前15分钟 和 下班（含加班时间）后30分钟 的提醒窗口，
+窗口以相对排班日期 00:00 的分钟数保存，跨零点的班次按次日分钟数处理，
+提醒任务（reminder_jobs）据此物化
+确保中文字符编码正确处理
+"""
+
+from sqlalchemy import delete, insert, select
+from ..models import db, ShiftType, ShiftReminderWindow, SystemConfig, time_to_minute
+
+CHECK_IN_LEAD_MINUTES = 15
+CHECK_OUT_GRACE_MINUTES = 30
+MINUTES_PER_DAY = 24 * 60
+OVERTIME_KEY = 'work_overtime'
+
+
+def parse_overtime(value):
+    """解析加班时间配置（分钟），无效时按0处理"""
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def compute_window(start_minute, end_minute, overtime=0):
+    """计算提醒窗口，返回 (上班开始, 上班结束, 下班开始, 下班结束)
+
+    结束时间早于开始时间视为跨零点，下班时间按次日计算。
+    """
+    if end_minute < start_minute:
+        end_minute += MINUTES_PER_DAY
+    check_out_from = end_minute + overtime
+    return (start_minute - CHECK_IN_LEAD_MINUTES, start_minute,
+            check_out_from, check_out_from + CHECK_OUT_GRACE_MINUTES)
+
+
+def refresh_reminder_windows(connection=None):
+    """按当前班次和加班时间配置重建提醒窗口表（班次数量很少，整表替换）"""
+    conn = connection if connection is not None else db.session.connection()
+    overtime = parse_overtime(conn.execute(
+        select(SystemConfig.value).where(SystemConfig.key == OVERTIME_KEY)
+    ).scalar())
+    rows = []
+    for shift_id, start_minute, end_minute, start_time, end_time in conn.execute(select(
+        ShiftType.id, ShiftType.start_minute, ShiftType.end_minute, ShiftType.start_time, ShiftType.end_time
+    )):
+        # 分钟列未回填时（如 Core 批量写入的班次）按字符串解析
+        if start_minute is None:
+            start_minute = time_to_minute(start_time)
+        if end_minute is None:
+            end_minute = time_to_minute(end_time)
+        if start_minute is None or end_minute is None:
+            continue
+        check_in_from, check_in_to, check_out_from, check_out_to = compute_window(start_minute, end_minute, overtime)
+        rows.append({
+            'shift_type_id': shift_id,
+            'check_in_from': check_in_from,
+            'check_in_to': check_in_to,
+            'check_out_from': check_out_from,
+            'check_out_to': check_out_to
+        })
+    table = ShiftReminderWindow.__table__
+    conn.execute(delete(table))
+    if rows:
+        conn.execute(insert(table), rows)
+    return len(rows)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量排班引擎
+一次查询取回已有排班，在内存中计算缺失日期，并以单条批量语句写入
+写入依赖 (user_id, work_date) 唯一索引，使用数据库原生的冲突处理
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime, timedelta
+from ..models import db, Schedule
+from .invalidation import invalidate_schedule_range
+from .sql import insert_ignore, upsert
+
+# IN 列表分块大小，兼容SQLite的参数个数限制
+IN_CHUNK_SIZE = 500
+# 多行VALUES语句每条的行数
+VALUES_CHUNK_SIZE = 1000
+
+
+def iter_dates(start_date, end_date):
+    """遍历闭区间内的每一天"""
+    for offset in range((end_date - start_date).days + 1):
+        yield start_date + timedelta(days=offset)
+
+
+def existing_schedule_ids(user_ids, start_date, end_date):
+    """查询日期范围内已有排班，返回 (user_id, work_date) -> 排班ID"""
+    user_ids = list(user_ids)
+    ids = {}
+    for i in range(0, len(user_ids), IN_CHUNK_SIZE):
+        rows = db.session.query(Schedule.id, Schedule.user_id, Schedule.work_date).filter(
+            Schedule.user_id.in_(user_ids[i:i + IN_CHUNK_SIZE]),
+            Schedule.work_date >= start_date,
+            Schedule.work_date <= end_date
+        ).all()
+        ids.update(((user_id, work_date), schedule_id) for schedule_id, user_id, work_date in rows)
+    return ids
+
+
+def existing_schedule_keys(user_ids, start_date, end_date):
+    """查询日期范围内已有排班的 (user_id, work_date) 集合"""
+    return set(existing_schedule_ids(user_ids, start_date, end_date))
+
+
+def plan_batch_schedules(user_ids, start_date, end_date, shift_type_id, skip_weekends=True):
+    """计算需要新建的排班行（已有排班的日期跳过）
+
+    周一到周五为工作日；周末在 skip_weekends 时跳过，否则记为休息日。
+    """
+    existing = existing_schedule_keys(user_ids, start_date, end_date)
+    now = datetime.utcnow()
+    rows = []
+    for work_date in iter_dates(start_date, end_date):
+        is_work_day = work_date.weekday() < 5
+        if not is_work_day and skip_weekends:
+            continue
+        for user_id in user_ids:
+            if (user_id, work_date) in existing:
+                continue
+            rows.append({
+                'user_id': user_id,
+                'work_date': work_date,
+                'shift_type_id': shift_type_id if is_work_day else None,
+                'is_rest_day': not is_work_day,
+                'note': None,
+                'created_at': now,
+                'updated_at': now
+            })
+    return rows
+
+
+SCHEDULE_KEY = ['user_id', 'work_date']
+SCHEDULE_UPDATE_COLUMNS = ['shift_type_id', 'is_rest_day', 'note', 'updated_at']
+
+
+def execute_counted(statement, rows, connection=None):
+    """批量执行写入语句，返回实际影响行数
+
+    驱动能汇总 executemany 的影响行数时一次执行全部行；
+    否则（supports_sane_multi_rowcount 为假）分块改为多行VALUES语句，按块累加 rowcount。
+    """
+    connection = connection if connection is not None else db.session.connection()
+    if connection.dialect.supports_sane_multi_rowcount:
+        return connection.execute(statement, rows).rowcount
+    written = 0
+    for i in range(0, len(rows), VALUES_CHUNK_SIZE):
+        written += connection.execute(statement.values(rows[i:i + VALUES_CHUNK_SIZE])).rowcount
+    return written
+
+
+def bulk_insert_schedules(rows):
+    """批量INSERT写入排班行，已存在的 (user_id, work_date) 忽略，返回实际新建条数
+
+    不提交事务，由调用方统一提交。
+    """
+    if not rows:
+        return 0
+    connection = db.session.connection()
+    written = execute_counted(insert_ignore(Schedule.__table__, connection, SCHEDULE_KEY), rows, connection)
+    if written:
+        invalidate_schedule_caches(rows)
+    return written
+
+
+def upsert_schedules(rows):
+    """以单条批量UPSERT写入排班行，已存在时更新班次、休息日和备注
+
+    不提交事务，由调用方统一提交。
+    """
+    if not rows:
+        return 0
+    connection = db.session.connection()
+    connection.execute(upsert(Schedule.__table__, connection, SCHEDULE_KEY, SCHEDULE_UPDATE_COLUMNS), rows)
+    invalidate_schedule_caches(rows)
+    return len(rows)
+
+
+def create_schedule(user_id, work_date, shift_type_id=None, is_rest_day=False, note=None):
+    """单条语句创建排班，同一用户同一天已有排班时返回False（不提交事务）"""
+    now = datetime.utcnow()
+    row = {
+        'user_id': user_id,
+        'work_date': work_date,
+        'shift_type_id': shift_type_id,
+        'is_rest_day': is_rest_day,
+        'note': note,
+        'created_at': now,
+        'updated_at': now
+    }
+    connection = db.session.connection()
+    result = connection.execute(insert_ignore(Schedule.__table__, connection, SCHEDULE_KEY), row)
+    if not result.rowcount:
+        return False
+    invalidate_schedule_caches([row])
+    return True
+
+
+def invalidate_schedule_caches(rows):
+    """绕过ORM写入后，按写入行涉及的用户和日期使缓存失效并刷新派生数据"""
+    invalidate_schedule_range({row['user_id'] for row in rows}, {row['work_date'] for row in rows})
+
+
+def batch_create_schedules(user_ids, start_date, end_date, shift_type_id, skip_weekends=True):
+    """为多个用户批量创建排班，返回新建条数（不提交事务）"""
+    rows = plan_batch_schedules(user_ids, start_date, end_date, shift_type_id, skip_weekends)
+    return bulk_insert_schedules(rows)
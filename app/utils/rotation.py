@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轮班排班引擎
+按轮班模式（如 A-A-B-B-休-休）和每个用户的相位偏移批量生成排班
+使用向量化的日期运算展开 用户 × 日期 矩阵，并以批量语句写入
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+from ..models import db, ShiftType
+from .roster import bulk_insert_schedules, upsert_schedules, existing_schedule_keys
+
+# 矩阵中表示休息日的编码
+REST_CODE = 0
+REST_SHIFT_NAMES = {'休', '休息'}
+# 预览时最多返回的明细行数
+PREVIEW_LIMIT = 200
+
+
+class RotationError(ValueError):
+    """轮班参数错误"""
+
+
+def resolve_pattern(pattern):
+    """将轮班模式解析为班次ID编码数组
+
+    模式元素可以是班次ID、班次名称，或 0/None/'休' 表示休息。
+    名称为“休”的班次同样视为休息日。
+    """
+    if not pattern:
+        raise RotationError('轮班模式不能为空')
+    shifts = db.session.query(ShiftType.id, ShiftType.name).filter(ShiftType.is_active == True).all()
+    by_id = {shift_id: name for shift_id, name in shifts}
+    by_name = {name: shift_id for shift_id, name in shifts}
+
+    codes = []
+    for item in pattern:
+        # True/False 是 int 的子类，且 False == 0，需先排除
+        if isinstance(item, bool):
+            raise RotationError(f'班次不存在或已停用: {item}')
+        if item in (None, 0, '') or item in REST_SHIFT_NAMES:
+            codes.append(REST_CODE)
+        elif isinstance(item, int):
+            if item not in by_id:
+                raise RotationError(f'班次不存在或已停用: {item}')
+            codes.append(REST_CODE if by_id[item] in REST_SHIFT_NAMES else item)
+        elif isinstance(item, str) and item in by_name:
+            codes.append(by_name[item])
+        else:
+            raise RotationError(f'班次不存在或已停用: {item}')
+    return np.asarray(codes, dtype=np.int64)
+
+
+def expand_rotation(codes, offsets, start_date, end_date, anchor_date=None):
+    """展开轮班矩阵
+
+    第 u 个用户在第 d 天的班次为 codes[(d + anchor偏移 + offsets[u]) % len(codes)]，
+    anchor_date 固定轮班起点，使不同日期范围生成的结果前后衔接。
+    返回形状为 (用户数, 天数) 的编码矩阵。
+    """
+    if end_date < start_date:
+        raise RotationError('结束日期不能早于开始日期')
+    anchor_date = anchor_date or start_date
+    days = np.arange((end_date - start_date).days + 1, dtype=np.int64) + (start_date - anchor_date).days
+    offsets = np.asarray(offsets, dtype=np.int64)
+    return codes[(days[np.newaxis, :] + offsets[:, np.newaxis]) % len(codes)]
+
+
+def matrix_to_rows(user_ids, start_date, matrix, note=None):
+    """将编码矩阵转换为排班写入行"""
+    now = datetime.utcnow()
+    dates = [start_date + timedelta(days=d) for d in range(matrix.shape[1])]
+    rows = []
+    append = rows.append
+    for user_id, codes in zip(user_ids, matrix.tolist()):
+        for work_date, code in zip(dates, codes):
+            append({
+                'user_id': user_id,
+                'work_date': work_date,
+                'shift_type_id': code or None,
+                'is_rest_day': code == REST_CODE,
+                'note': note,
+                'created_at': now,
+                'updated_at': now
+            })
+    return rows
+
+
+def summarize_matrix(matrix, start_date):
+    """统计每个班次的总数以及每天的在岗人数"""
+    values, counts = np.unique(matrix, return_counts=True)
+    per_shift = {('rest' if code == REST_CODE else str(int(code))): int(count) for code, count in zip(values, counts)}
+    on_duty = (matrix != REST_CODE).sum(axis=0)
+    return {
+        'per_shift': per_shift,
+        'on_duty': [
+            {'date': (start_date + timedelta(days=d)).isoformat(), 'count': int(count)}
+            for d, count in enumerate(on_duty.tolist())
+        ]
+    }
+
+
+def generate_rotation(pattern, user_offsets, start_date, end_date, anchor_date=None,
+                      dry_run=True, overwrite=False, note=None):
+    """生成轮班排班
+
+    user_offsets 为 [(user_id, 相位偏移)]。dry_run 时只返回预览不写入；
+    overwrite 时覆盖已有排班，否则保留已有排班。写入时不提交事务。
+    """
+    if not user_offsets:
+        raise RotationError('请选择用户')
+    codes = resolve_pattern(pattern)
+    user_ids = [user_id for user_id, _ in user_offsets]
+    matrix = expand_rotation(codes, [offset for _, offset in user_offsets], start_date, end_date, anchor_date)
+
+    report = {
+        'users': len(user_ids),
+        'days': int(matrix.shape[1]),
+        'rows': int(matrix.size),
+        'dry_run': dry_run,
+        **summarize_matrix(matrix, start_date)
+    }
+
+    if dry_run:
+        preview_users = max(1, PREVIEW_LIMIT // matrix.shape[1])
+        preview = matrix_to_rows(user_ids[:preview_users], start_date, matrix[:preview_users], note)
+        report['preview'] = [{
+            'user_id': row['user_id'],
+            'work_date': row['work_date'].isoformat(),
+            'shift_type_id': row['shift_type_id'],
+            'is_rest_day': row['is_rest_day']
+        } for row in preview[:PREVIEW_LIMIT]]
+        return report
+
+    rows = matrix_to_rows(user_ids, start_date, matrix, note)
+    if overwrite:
+        report['written'] = upsert_schedules(rows)
+    else:
+        existing = existing_schedule_keys(user_ids, start_date, end_date)
+        if existing:
+            rows = [row for row in rows if (row['user_id'], row['work_date']) not in existing]
+        report['written'] = bulk_insert_schedules(rows)
+    report['skipped'] = report['rows'] - report['written']
+    return report
@@ -7,10 +7,15 @@
 
 import threading
 import time
-from datetime import datetime, timedelta, date
-from flask import current_app
-from ..models import db, Schedule, ShiftType, AttendanceRecord, SystemLog, SystemConfig, User
+from datetime import datetime
+from ..models import db, AttendanceRecord, SystemLog, SystemConfig
 from ..utils.notification import NotificationService
+from .sql import insert_ignore
+from .reminder_jobs import materialize_reminder_jobs, claim_due_jobs, finish_job, SENT, SKIPPED, CLAIM_BATCH_SIZE
+from .lookups import lookup_cache
+from .attendance import materialize_attendance, materialize_dates, mark_reminded
+from .profiler import sql_profiler
+from .metrics import SCHEDULER_TICK, SCHEDULER_LAST_TICK, REMINDERS_DUE, REMINDERS_FINISHED, REMINDER_LAG
 
 class SchedulerService:
     """定时任务调度服务"""
@@ -19,6 +24,9 @@ class SchedulerService:
     _running = False
     _thread = None
     _lock = threading.Lock()
+    _materialized_on = None
+    # 通知服务工厂，模拟运行时替换为进程内的模拟后端
+    notification_factory = NotificationService
     
     def __new__(cls):
         if cls._instance is None:
@@ -63,92 +71,104 @@ class SchedulerService:
                 self._log('scheduler_error', f'调度器运行错误: {str(e)}', 'ERROR')
                 time.sleep(60)  # 出错后等待1分钟再试
     
-    def _check_schedules(self):
-        """检查排班并执行相应操作"""
+    def _check_schedules(self, now=None):
+        """处理到期的打卡提醒任务
+
+        日期切换（及启动后首次检查）时批量预生成考勤记录并物化新一天的提醒任务；
+        之后每次只认领 due_at 已到的任务，开销与到期提醒数成正比。
+        每批先提交认领和提醒标记，再在事务外发送通知，最后提交任务状态。
+        """
+        started = time.perf_counter()
         try:
-            now = datetime.now()
-            today = now.date()
-            current_time = now.time()
-            
-            # 获取今日所有排班
-            today_schedules = Schedule.query.filter_by(work_date=today).all()
-            
-            for schedule in today_schedules:
-                if schedule.is_rest_day:
-                    continue
-                
-                if not schedule.shift_type:
-                    continue
-                
-                shift = schedule.shift_type
-                user = schedule.user
+            with sql_profiler.profile('scheduler.check_schedules'):
+                now = now or datetime.now()
                 
-                if not user or not user.is_active:
-                    continue
+                if self._materialized_on != now.date():
+                    materialize_attendance(materialize_dates(now.date()), today=now.date())
+                    materialize_reminder_jobs(now)
+                    self._materialized_on = now.date()
                 
-                # 获取系统配置
-                overtime_minutes = self._get_system_config('work_overtime', 0)
                 reminder_enabled = self._get_system_config('reminder_enabled', 'true') == 'true'
-                
                 if not reminder_enabled:
-                    continue
-                
-                # 计算时间
-                start_time = datetime.strptime(shift.start_time, '%H:%M').time()
-                end_time = datetime.strptime(shift.end_time, '%H:%M').time()
-                
-                # 上班前15分钟
-                start_datetime = datetime.combine(today, start_time)
-                check_in_start = (start_datetime - timedelta(minutes=15)).time()
-                
-                # 下班后30分钟（包含加班时间）
-                end_datetime = datetime.combine(today, end_time)
-                end_datetime += timedelta(minutes=int(overtime_minutes))
-                check_out_end = (end_datetime + timedelta(minutes=30)).time()
+                    return
                 
-                # 获取或创建考勤记录
-                attendance = AttendanceRecord.query.filter_by(
-                    user_id=user.id,
-                    work_date=today
-                ).first()
-                
-                if not attendance:
-                    attendance = AttendanceRecord(
-                        user_id=user.id,
-                        work_date=today,
-                        shift_type_id=shift.id
-                    )
-                    db.session.add(attendance)
+                # 按批认领，直到取不满一批，同一时刻到期的大量提醒在本次检查内全部发出
+                while True:
+                    jobs = claim_due_jobs(now)
+                    to_send = []
+                    for job_id, user_id, shift_type_id, work_date, kind, due_at in jobs:
+                        REMINDERS_DUE.labels(kind).inc()
+                        user = lookup_cache.user(user_id)
+                        shift = lookup_cache.shift_type(shift_type_id)
+                        marked = False
+                        if user is not None and shift is not None:
+                            # 考勤记录已预生成，这里只做条件更新；缺失时（如预生成之前的排班）再补建
+                            marked = mark_reminded(user_id, work_date, kind)
+                            if not marked and self._create_attendance(user_id, work_date, shift_type_id):
+                                marked = mark_reminded(user_id, work_date, kind)
+                        if marked:
+                            to_send.append((job_id, user, shift, work_date, kind, due_at))
+                        else:
+                            self._finish(job_id, kind, SKIPPED, now, due_at, started)
+                    # 先提交提醒标记再发送通知，发送期间不持有写锁；
+                    # 提交后、任务结束前进程退出时，任务超时后被重新认领，因已标记而跳过，不会重复发送
                     db.session.commit()
-                
-                # 检查上班打卡提醒
-                if (check_in_start <= current_time < start_time and 
-                    attendance.clock_in_status == '未打卡' and 
-                    not attendance.clock_in_reminded):
                     
-                    self._send_check_in_reminder(user, shift, schedule)
-                    attendance.clock_in_reminded = True
+                    # 同一批提醒共用一个通知服务实例，复用其HTTP连接
+                    notification_service = self.notification_factory() if to_send else None
+                    for job_id, user, shift, work_date, kind, due_at in to_send:
+                        if kind == 'check_in':
+                            self._send_check_in_reminder(notification_service, user, shift, work_date)
+                        else:
+                            self._send_check_out_reminder(notification_service, user, shift, work_date)
+                    for job_id, user, shift, work_date, kind, due_at in to_send:
+                        self._finish(job_id, kind, SENT, now, due_at, started)
                     db.session.commit()
-                
-                # 检查下班打卡提醒
-                elif (end_datetime.time() <= current_time <= check_out_end and 
-                      attendance.clock_out_status == '未打卡' and 
-                      not attendance.clock_out_reminded):
+                    if len(jobs) < CLAIM_BATCH_SIZE:
+                        break
                     
-                    self._send_check_out_reminder(user, shift, schedule)
-                    attendance.clock_out_reminded = True
-                    db.session.commit()
-                
         except Exception as e:
             self._log('check_schedules_error', f'检查排班时发生错误: {str(e)}', 'ERROR')
             db.session.rollback()
+        finally:
+            SCHEDULER_TICK.observe(time.perf_counter() - started)
+            SCHEDULER_LAST_TICK.set_to_current_time()
+    
+    def _finish(self, job_id, kind, state, now, due_at, started):
+        """标记任务结束（不提交事务）并记录指标"""
+        finish_job(job_id, state)
+        REMINDERS_FINISHED.labels(kind, state).inc()
+        # 按本次检查的时钟计算延迟，虚拟时钟模拟时同样有效
+        REMINDER_LAG.labels(kind).observe((now - due_at).total_seconds() + time.perf_counter() - started)
+    
+    def _create_attendance(self, user_id, work_date, shift_type_id):
+        """以 INSERT ... ON CONFLICT DO NOTHING 补建考勤记录（预生成遗漏时的补救，不提交事务）
+
+        返回是否新建；记录已存在时不做任何查询，依赖 (user_id, work_date) 唯一索引防止并发重复。
+        """
+        now = datetime.utcnow()
+        connection = db.session.connection()
+        result = connection.execute(
+            insert_ignore(AttendanceRecord.__table__, connection, ['user_id', 'work_date']),
+            {
+                'user_id': user_id,
+                'work_date': work_date,
+                'shift_type_id': shift_type_id,
+                'clock_in_status': '未打卡',
+                'clock_out_status': '未打卡',
+                'clock_in_reminded': False,
+                'clock_out_reminded': False,
+                'created_at': now,
+                'updated_at': now
+            }
+        )
+        return result.rowcount == 1
     
-    def _send_check_in_reminder(self, user, shift, schedule):
+    def _send_check_in_reminder(self, notification_service, user, shift, work_date):
         """发送上班打卡提醒"""
         try:
             message = f"【上班提醒】{user.username}，您好！您今天{shift.name}的上班时间是{shift.start_time}，请记得按时打卡。"
             
-            notification_service = NotificationService()
             notification_service.send_notification(user, message, 'check_in')
             
             self._log('check_in_reminder_sent', f'向用户 {user.username} 发送上班打卡提醒')
@@ -156,12 +176,11 @@ class SchedulerService:
         except Exception as e:
             self._log('check_in_reminder_error', f'发送上班提醒失败: {str(e)}', 'ERROR')
     
-    def _send_check_out_reminder(self, user, shift, schedule):
+    def _send_check_out_reminder(self, notification_service, user, shift, work_date):
         """发送下班打卡提醒"""
         try:
             message = f"【下班提醒】{user.username}，您好！您今天{shift.name}的下班时间是{shift.end_time}，请记得按时打卡。"
             
-            notification_service = NotificationService()
             notification_service.send_notification(user, message, 'check_out')
             
             self._log('check_out_reminder_sent', f'向用户 {user.username} 发送下班打卡提醒')
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库结构维护
+为已有数据库补齐 db.create_all() 不会修改的索引和列，必要时先清理重复数据，
+并回填新增的汇总表和派生列
+确保中文字符编码正确处理
+"""
+
+from sqlalchemy import inspect, func, or_, text
+from ..models import db, Schedule, ShiftType, ShiftCoverage, ShiftReminderWindow, AttendanceRecord, time_to_minute
+from .coverage import rebuild_coverage
+from .reminders import refresh_reminder_windows
+
+CLOCKED_IN = '已打卡'
+
+
+def _duplicate_groups(model):
+    """查询 (user_id, work_date) 重复的分组"""
+    return db.session.query(model.user_id, model.work_date).group_by(
+        model.user_id, model.work_date
+    ).having(func.count(model.id) > 1).all()
+
+
+def dedupe_schedules():
+    """清理重复排班：每个用户每天保留最近更新的一条"""
+    removed = 0
+    for user_id, work_date in _duplicate_groups(Schedule):
+        rows = Schedule.query.filter_by(user_id=user_id, work_date=work_date).order_by(
+            Schedule.updated_at.desc(), Schedule.id.desc()
+        ).all()
+        for row in rows[1:]:
+            db.session.delete(row)
+            removed += 1
+    db.session.commit()
+    return removed
+
+
+def dedupe_attendance():
+    """清理重复考勤记录：保留最新一条，并合并打卡状态和提醒标记"""
+    removed = 0
+    for user_id, work_date in _duplicate_groups(AttendanceRecord):
+        rows = AttendanceRecord.query.filter_by(user_id=user_id, work_date=work_date).order_by(
+            AttendanceRecord.updated_at.desc(), AttendanceRecord.id.desc()
+        ).all()
+        keep = rows[0]
+        for row in rows[1:]:
+            if row.clock_in_status == CLOCKED_IN:
+                keep.clock_in_status = CLOCKED_IN
+            if row.clock_out_status == CLOCKED_IN:
+                keep.clock_out_status = CLOCKED_IN
+            keep.clock_in_reminded = keep.clock_in_reminded or row.clock_in_reminded
+            keep.clock_out_reminded = keep.clock_out_reminded or row.clock_out_reminded
+            keep.shift_type_id = keep.shift_type_id or row.shift_type_id
+            db.session.delete(row)
+            removed += 1
+    db.session.commit()
+    return removed
+
+
+# 需要补齐的唯一索引及其建立前的去重函数
+UNIQUE_INDEXES = [
+    (Schedule, 'uq_schedules_user_date', dedupe_schedules),
+    (AttendanceRecord, 'uq_attendance_user_date', dedupe_attendance),
+]
+
+
+# 已有表上后续新增的可空列
+ADDED_COLUMNS = [
+    (ShiftType, 'min_staff'),
+    (ShiftType, 'max_staff'),
+    (ShiftType, 'start_minute'),
+    (ShiftType, 'end_minute'),
+]
+
+
+def add_missing_columns(inspector):
+    """以 ALTER TABLE ADD COLUMN 补齐缺失的可空列"""
+    added = []
+    preparer = db.engine.dialect.identifier_preparer
+    for model, column_name in ADDED_COLUMNS:
+        table = model.__table__
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        if column_name in existing:
+            continue
+        column = table.c[column_name]
+        column_type = column.type.compile(dialect=db.engine.dialect)
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}'
+            ))
+        added.append(f'{table.name}.{column_name}')
+    return added
+
+
+def backfill_coverage():
+    """在岗人数汇总表为空而已有排班时全量重建"""
+    has_coverage = db.session.query(ShiftCoverage.work_date).first() is not None
+    has_schedules = db.session.query(Schedule.id).first() is not None
+    if has_coverage or not has_schedules:
+        return False
+    rebuild_coverage()
+    return True
+
+
+def backfill_shift_minutes():
+    """回填班次的分钟数列，并在提醒窗口表为空时重建"""
+    shifts = ShiftType.query.filter(or_(ShiftType.start_minute.is_(None), ShiftType.end_minute.is_(None))).all()
+    for shift in shifts:
+        shift.start_minute = time_to_minute(shift.start_time)
+        shift.end_minute = time_to_minute(shift.end_time)
+    if not shifts and db.session.query(ShiftReminderWindow.shift_type_id).first() is None:
+        refresh_reminder_windows()
+    db.session.commit()
+    return bool(shifts)
+
+
+def ensure_schema():
+    """补齐缺失的索引和列并回填汇总表，返回本次处理的对象名称列表"""
+    inspector = inspect(db.engine)
+    created = add_missing_columns(inspector)
+    for model, index_name, dedupe in UNIQUE_INDEXES:
+        table = model.__table__
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        if index_name in existing:
+            continue
+        dedupe()
+        index = next(index for index in table.indexes if index.name == index_name)
+        index.create(db.engine)
+        created.append(index_name)
+    if backfill_coverage():
+        created.append(ShiftCoverage.__tablename__)
+    if backfill_shift_minutes():
+        created.append(ShiftReminderWindow.__tablename__)
+    return created
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压测数据生成
+批量生成用户、班次、轮班排班、带真实打卡分布的历史考勤记录和系统日志，
+全部以批量语句写入，用于在接近生产规模的数据上做性能测试
+确保中文字符编码正确处理
+"""
+
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from ..models import db, User, ShiftType, AttendanceRecord, SystemLog
+from .attendance import NOT_CLOCKED
+from .lookups import invalidate_lookups
+from .rotation import resolve_pattern, expand_rotation, matrix_to_rows, REST_CODE
+from .roster import bulk_insert_schedules
+from .schema import CLOCKED_IN
+from .sql import insert_ignore
+
+# 生成数据使用的班次，已存在的同名班次保持不变
+SEED_SHIFTS = [
+    {'name': '早班', 'start_time': '07:00', 'end_time': '15:00', 'color': '#27ae60', 'description': '早班 (7:00-15:00)'},
+    {'name': '中班', 'start_time': '15:00', 'end_time': '23:00', 'color': '#f39c12', 'description': '中班 (15:00-23:00)'},
+    {'name': '夜班', 'start_time': '23:00', 'end_time': '07:00', 'color': '#8e44ad', 'description': '夜班 (23:00-次日7:00)'},
+]
+# 四班三倒：早-早-中-中-夜-夜-休-休，用户按序号错开相位
+SEED_PATTERN = ['早班', '早班', '中班', '中班', '夜班', '夜班', '休', '休']
+# 每批写入的天数和行数
+CHUNK_DAYS = 30
+INSERT_BATCH_SIZE = 20000
+# 每个用户的打卡率服从 Beta 分布：大多数人很少漏打卡，少数人经常漏打卡
+CLOCK_IN_BETA = (19.0, 1.0)
+CLOCK_OUT_BETA = (14.0, 1.0)
+# 已打卡的记录中，打卡前已收到过提醒的比例
+REMINDED_BEFORE_CLOCK_RATE = 0.3
+# 日志类型: (日志类型, 级别, 内容模板, 权重, 是否关联用户)
+LOG_TEMPLATES = [
+    ('auth', 'INFO', '用户 {username} 登录系统', 30, True),
+    ('schedule', 'INFO', '更新用户 {username} 的排班', 15, True),
+    ('check_in_reminder_sent', 'INFO', '向用户 {username} 发送上班打卡提醒', 25, False),
+    ('check_out_reminder_sent', 'INFO', '向用户 {username} 发送下班打卡提醒', 20, False),
+    ('notification_skipped', 'INFO', '用户 {username} 已打卡，跳过通知', 8, False),
+    ('dingtalk_error', 'ERROR', '钉钉通知发送失败: HTTP 502', 2, False),
+]
+
+
+def _insert_batches(table, rows, statement=None):
+    statement = statement if statement is not None else insert(table)
+    connection = db.session.connection()
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        connection.execute(statement, rows[i:i + INSERT_BATCH_SIZE])
+
+
+def seed_users(user_count, prefix='user', password='123456'):
+    """批量创建用户（用户名已存在时跳过），返回按序号排列的 [(用户ID, 用户名)]
+
+    所有用户共用同一个密码哈希，避免逐个计算哈希。
+    """
+    now = datetime.utcnow()
+    width = max(5, len(str(user_count - 1)))
+    names = [f'{prefix}{i:0{width}d}' for i in range(user_count)]
+    password_hash = generate_password_hash(password)
+    connection = db.session.connection()
+    _insert_batches(User.__table__, [{
+        'username': name,
+        'password_hash': password_hash,
+        'email': None,
+        'is_admin': False,
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now
+    } for name in names], insert_ignore(User.__table__, connection, ['username']))
+    # 批量写入不经过 ORM flush，需手动使用户缓存失效
+    invalidate_lookups()
+
+    wanted = set(names)
+    ids = {username: user_id for user_id, username in db.session.query(User.id, User.username).filter(
+        User.username.like(f'{prefix}%')
+    ) if username in wanted}
+    return [(ids[name], name) for name in names if name in ids]
+
+
+def seed_shift_types():
+    """补齐生成数据使用的班次，返回新建数量"""
+    existing = {name for name, in db.session.query(ShiftType.name)}
+    created = [ShiftType(**data) for data in SEED_SHIFTS if data['name'] not in existing]
+    db.session.add_all(created)
+    db.session.flush()
+    return len(created)
+
+
+def attendance_rows(user_ids, start_date, matrix, clock_in_rates, clock_out_rates, rng):
+    """按排班矩阵生成考勤记录行，打卡状态按每个用户的打卡率随机生成"""
+    worked = matrix != REST_CODE
+    clocked_in = rng.random(matrix.shape) < clock_in_rates[:, np.newaxis]
+    clocked_out = rng.random(matrix.shape) < clock_out_rates[:, np.newaxis]
+    # 未打卡的一定已被提醒过，已打卡的部分在提醒后才打卡
+    in_reminded = ~clocked_in | (rng.random(matrix.shape) < REMINDED_BEFORE_CLOCK_RATE)
+    out_reminded = ~clocked_out | (rng.random(matrix.shape) < REMINDED_BEFORE_CLOCK_RATE)
+
+    now = datetime.utcnow()
+    rows = []
+    append = rows.append
+    for u, d in zip(*np.nonzero(worked)):
+        append({
+            'user_id': user_ids[u],
+            'work_date': start_date + timedelta(days=int(d)),
+            'shift_type_id': int(matrix[u, d]),
+            'clock_in_status': CLOCKED_IN if clocked_in[u, d] else NOT_CLOCKED,
+            'clock_out_status': CLOCKED_IN if clocked_out[u, d] else NOT_CLOCKED,
+            'clock_in_reminded': bool(in_reminded[u, d]),
+            'clock_out_reminded': bool(out_reminded[u, d]),
+            'created_at': now,
+            'updated_at': now
+        })
+    return rows
+
+
+def seed_schedules(user_ids, start_date, days, rng, today=None, progress=None):
+    """按轮班模式分批生成排班，并为今天之前的排班生成考勤记录
+
+    已存在的排班和考勤记录保持不变。返回 (排班行数, 考勤行数)。
+    """
+    today = today or datetime.now().date()
+    codes = resolve_pattern(SEED_PATTERN)
+    offsets = np.arange(len(user_ids)) % len(codes)
+    clock_in_rates = rng.beta(*CLOCK_IN_BETA, size=len(user_ids))
+    clock_out_rates = rng.beta(*CLOCK_OUT_BETA, size=len(user_ids))
+    connection = db.session.connection()
+    attendance_statement = insert_ignore(AttendanceRecord.__table__, connection, ['user_id', 'work_date'])
+
+    schedule_count = 0
+    attendance_count = 0
+    for chunk_offset in range(0, days, CHUNK_DAYS):
+        chunk_start = start_date + timedelta(days=chunk_offset)
+        chunk_end = start_date + timedelta(days=min(days, chunk_offset + CHUNK_DAYS) - 1)
+        matrix = expand_rotation(codes, offsets, chunk_start, chunk_end, anchor_date=start_date)
+        schedule_count += bulk_insert_schedules(matrix_to_rows(user_ids, chunk_start, matrix, note=None))
+
+        past_days = max(0, min((today - chunk_start).days, matrix.shape[1]))
+        if past_days:
+            rows = attendance_rows(user_ids, chunk_start, matrix[:, :past_days],
+                                   clock_in_rates, clock_out_rates, rng)
+            _insert_batches(AttendanceRecord.__table__, rows, attendance_statement)
+            attendance_count += len(rows)
+        if progress:
+            progress(f'排班 {chunk_start} ~ {chunk_end}: 累计 {schedule_count} 条排班，{attendance_count} 条考勤记录')
+    return schedule_count, attendance_count
+
+
+def seed_logs(log_count, users, start, end, rng):
+    """在 [start, end) 内均匀生成 log_count 条系统日志，返回写入条数"""
+    if log_count <= 0 or not users:
+        return 0
+    weights = np.array([template[3] for template in LOG_TEMPLATES], dtype=float)
+    kinds = rng.choice(len(LOG_TEMPLATES), size=log_count, p=weights / weights.sum())
+    picked = rng.integers(0, len(users), size=log_count)
+    seconds = np.sort(rng.uniform(0, (end - start).total_seconds(), size=log_count))
+
+    rows = []
+    for kind, index, offset in zip(kinds.tolist(), picked.tolist(), seconds.tolist()):
+        log_type, level, template, _, with_user = LOG_TEMPLATES[kind]
+        user_id, username = users[index]
+        rows.append({
+            'user_id': user_id if with_user else None,
+            'log_type': log_type,
+            'log_level': level,
+            'message': template.format(username=username),
+            'ip_address': f'10.0.{index // 256 % 256}.{index % 256}' if with_user else '127.0.0.1',
+            'user_agent': 'Mozilla/5.0' if with_user else 'SchedulerService/1.0',
+            'created_at': start + timedelta(seconds=offset)
+        })
+    _insert_batches(SystemLog.__table__, rows)
+    return len(rows)
+
+
+def seed_dataset(user_count, days, start_date=None, log_count=0, prefix='user', password='123456',
+                 seed=None, progress=None):
+    """生成一套压测数据并提交，返回各类数据的写入数量和耗时
+
+    start_date 默认为今天往前 days 的一半，使数据同时覆盖历史和未来；
+    seed 固定随机数种子，使生成结果可复现。progress(message) 用于输出进度。
+    """
+    started = time.perf_counter()
+    today = datetime.now().date()
+    start_date = start_date or today - timedelta(days=days // 2)
+    rng = np.random.default_rng(seed)
+
+    shift_count = seed_shift_types()
+    users = seed_users(user_count, prefix, password)
+    if progress:
+        progress(f'用户 {len(users)} 个，新建班次 {shift_count} 个')
+    schedule_count, attendance_count = seed_schedules(
+        [user_id for user_id, _ in users], start_date, days, rng, today, progress
+    )
+    # 日志只生成在已经过去的时段内
+    start = datetime.combine(start_date, datetime.min.time())
+    end = min(start + timedelta(days=days), datetime.now())
+    log_total = seed_logs(log_count, users, start, end if end > start else start + timedelta(days=days), rng)
+    db.session.commit()
+
+    return {
+        'users': len(users),
+        'shift_types': shift_count,
+        'schedules': schedule_count,
+        'attendance_records': attendance_count,
+        'logs': log_total,
+        'start_date': start_date.isoformat(),
+        'end_date': (start_date + timedelta(days=days - 1)).isoformat(),
+        'seconds': round(time.perf_counter() - started, 1)
+    }
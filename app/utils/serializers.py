@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量序列化
+按字段定义一次生成投影查询，并将列元组（或已预加载关联的ORM对象）批量转换为字典，
+日期时间使用 isoformat，JSON 编码在安装了 orjson 时使用 orjson
+确保中文字符编码正确处理
+"""
+
+import json
+from flask import current_app
+from sqlalchemy import select
+from ..models import db, User, ShiftType, Schedule, SystemLog, AttendanceRecord
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+def format_datetime(value):
+    """datetime -> 'YYYY-MM-DD HH:MM:SS'（与原 to_dict 输出一致）"""
+    return value.isoformat(sep=' ', timespec='seconds')
+
+
+def format_date(value):
+    """date -> 'YYYY-MM-DD'"""
+    return value.isoformat()
+
+
+class Field:
+    """序列化字段：输出键、投影列、ORM属性路径和可选的转换函数"""
+
+    def __init__(self, key, column, path=None, convert=None):
+        self.key = key
+        self.column = column
+        self.path = (path or key).split('.')
+        self.convert = convert
+
+    def get(self, obj):
+        """从ORM对象按属性路径取值，中间关联为空时返回None"""
+        for name in self.path:
+            if obj is None:
+                return None
+            obj = getattr(obj, name)
+        return obj
+
+
+class BulkSerializer:
+    """批量序列化器
+
+    fields 定义输出字段，joins 为投影查询需要的外连接 [(目标, 连接条件)]。
+    """
+
+    def __init__(self, model, fields, joins=()):
+        self.model = model
+        self.fields = fields
+        self.joins = joins
+        self.keys = [field.key for field in fields]
+        self.converters = [(index, field.convert) for index, field in enumerate(fields) if field.convert]
+
+    def select(self):
+        """生成投影查询（含关联表外连接）"""
+        stmt = select(*[field.column.label(field.key) for field in self.fields]).select_from(self.model)
+        for target, onclause in self.joins:
+            stmt = stmt.outerjoin(target, onclause)
+        return stmt
+
+    def query(self):
+        """生成可链式过滤和分页的投影 Query"""
+        query = db.session.query(*[field.column.label(field.key) for field in self.fields]).select_from(self.model)
+        for target, onclause in self.joins:
+            query = query.outerjoin(target, onclause)
+        return query
+
+    def shape(self, item):
+        """对单条结果做结构调整，子类可覆盖"""
+        return item
+
+    def dump_rows(self, rows):
+        """序列化投影查询返回的列元组"""
+        keys = self.keys
+        converters = self.converters
+        shape = self.shape
+        result = []
+        append = result.append
+        for row in rows:
+            values = list(row)
+            for index, convert in converters:
+                value = values[index]
+                if value is not None:
+                    values[index] = convert(value)
+            append(shape(dict(zip(keys, values))))
+        return result
+
+    def dump_objects(self, objects):
+        """序列化ORM对象（关联需已预加载，否则会逐条懒加载）"""
+        fields = self.fields
+        return self.dump_rows([tuple(field.get(obj) for field in fields) for obj in objects])
+
+
+class ScheduleSerializer(BulkSerializer):
+    """排班序列化：班次字段合并为 shift_info"""
+
+    SHIFT_KEYS = ('shift_name', 'start_time', 'end_time', 'color')
+
+    def shape(self, item):
+        shift_name, start_time, end_time, color = (item.pop(key) for key in self.SHIFT_KEYS)
+        item['shift_info'] = None if shift_name is None else {
+            'id': item['shift_type_id'],
+            'name': shift_name,
+            'start_time': start_time,
+            'end_time': end_time,
+            'color': color
+        }
+        return item
+
+
+user_serializer = BulkSerializer(User, [
+    Field('id', User.id),
+    Field('username', User.username),
+    Field('email', User.email),
+    Field('is_admin', User.is_admin),
+    Field('is_active', User.is_active),
+    Field('created_at', User.created_at, convert=format_datetime),
+    Field('updated_at', User.updated_at, convert=format_datetime),
+])
+
+shift_type_serializer = BulkSerializer(ShiftType, [
+    Field('id', ShiftType.id),
+    Field('name', ShiftType.name),
+    Field('start_time', ShiftType.start_time),
+    Field('end_time', ShiftType.end_time),
+    Field('color', ShiftType.color),
+    Field('description', ShiftType.description),
+    Field('min_staff', ShiftType.min_staff),
+    Field('max_staff', ShiftType.max_staff),
+    Field('is_active', ShiftType.is_active),
+    Field('created_at', ShiftType.created_at, convert=format_datetime),
+    Field('updated_at', ShiftType.updated_at, convert=format_datetime),
+])
+
+schedule_serializer = ScheduleSerializer(Schedule, [
+    Field('id', Schedule.id),
+    Field('user_id', Schedule.user_id),
+    Field('user_name', User.username, 'user.username'),
+    Field('shift_type_id', Schedule.shift_type_id),
+    Field('shift_name', ShiftType.name, 'shift_type.name'),
+    Field('start_time', ShiftType.start_time, 'shift_type.start_time'),
+    Field('end_time', ShiftType.end_time, 'shift_type.end_time'),
+    Field('color', ShiftType.color, 'shift_type.color'),
+    Field('work_date', Schedule.work_date, convert=format_date),
+    Field('is_rest_day', Schedule.is_rest_day),
+    Field('note', Schedule.note),
+    Field('created_at', Schedule.created_at, convert=format_datetime),
+    Field('updated_at', Schedule.updated_at, convert=format_datetime),
+], joins=[(User, User.id == Schedule.user_id), (ShiftType, ShiftType.id == Schedule.shift_type_id)])
+
+system_log_serializer = BulkSerializer(SystemLog, [
+    Field('id', SystemLog.id),
+    Field('user_id', SystemLog.user_id),
+    Field('username', User.username, 'user.username'),
+    Field('log_type', SystemLog.log_type),
+    Field('log_level', SystemLog.log_level),
+    Field('message', SystemLog.message),
+    Field('ip_address', SystemLog.ip_address),
+    Field('user_agent', SystemLog.user_agent),
+    Field('created_at', SystemLog.created_at, convert=format_datetime),
+], joins=[(User, User.id == SystemLog.user_id)])
+
+attendance_serializer = BulkSerializer(AttendanceRecord, [
+    Field('id', AttendanceRecord.id),
+    Field('user_id', AttendanceRecord.user_id),
+    Field('username', User.username, 'user.username'),
+    Field('work_date', AttendanceRecord.work_date, convert=format_date),
+    Field('shift_type_id', AttendanceRecord.shift_type_id),
+    Field('shift_name', ShiftType.name, 'shift_type.name'),
+    Field('clock_in_status', AttendanceRecord.clock_in_status),
+    Field('clock_out_status', AttendanceRecord.clock_out_status),
+    Field('clock_in_reminded', AttendanceRecord.clock_in_reminded),
+    Field('clock_out_reminded', AttendanceRecord.clock_out_reminded),
+    Field('created_at', AttendanceRecord.created_at, convert=format_datetime),
+    Field('updated_at', AttendanceRecord.updated_at, convert=format_datetime),
+], joins=[(User, User.id == AttendanceRecord.user_id), (ShiftType, ShiftType.id == AttendanceRecord.shift_type_id)])
+
+
+def dumps(payload):
+    """编码为UTF-8 JSON字节串，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    """使用批量序列化的JSON响应，替代 jsonify"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
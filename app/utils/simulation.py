@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调度器模拟运行
+用虚拟时钟逐分钟驱动 SchedulerService._check_schedules，通知发送到进程内的模拟后端，
+统计提醒发送数、重复发送、错过的提醒窗口、发送延迟分位数、每次检查的SQL数和耗时，
+供 flask simulate-scheduler 命令和 pytest 使用
+确保中文字符编码正确处理
+"""
+
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import event, insert, select
+from ..models import db, User, ShiftType, Schedule, ShiftReminderWindow
+from .reminders import refresh_reminder_windows
+from .scheduler import scheduler as default_scheduler
+
+# 模拟数据使用的跨零点班次
+NIGHT_SHIFT = {'name': '模拟夜班', 'start_time': '22:00', 'end_time': '06:00', 'color': '#8e44ad'}
+
+
+class VirtualClock:
+    """可注入的虚拟时钟"""
+
+    def __init__(self, start):
+        self.current = start
+
+    def now(self):
+        return self.current
+
+    def advance(self, delta):
+        self.current += delta
+
+
+class MockNotificationBackend:
+    """进程内模拟通知后端，记录每次发送的 (用户ID, 类型, 虚拟时间)"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.sent = []
+
+    def __call__(self):
+        # 作为调度器的 notification_factory 使用
+        return self
+
+    def send_notification(self, user, message, notification_type='reminder'):
+        self.sent.append((user.id, notification_type, self.clock.now()))
+
+
+def percentile(values, fraction):
+    """最近秩法分位数，空列表返回None"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def seed_synthetic_roster(user_count, start_date, days):
+    """写入 user_count 个模拟用户及其在 days 天内的排班（不提交事务）
+
+    在已启用班次之外增加一个跨零点的夜班，按用户和日期轮换班次，周末休息。
+    """
+    if db.session.query(ShiftType.id).filter(ShiftType.name == NIGHT_SHIFT['name']).first() is None:
+        db.session.add(ShiftType(**NIGHT_SHIFT))
+        db.session.flush()
+    shift_ids = [row[0] for row in db.session.query(ShiftType.id).join(
+        ShiftReminderWindow, ShiftReminderWindow.shift_type_id == ShiftType.id
+    ).filter(ShiftType.is_active == True, ShiftType.name != '休').order_by(ShiftType.id)]
+
+    now = datetime.utcnow()
+    prefix = f'sim{int(time.time())}_'
+    db.session.execute(insert(User.__table__), [{
+        'username': f'{prefix}{i:05d}',
+        'password_hash': '-',
+        'email': None,
+        'is_admin': False,
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now
+    } for i in range(user_count)])
+    user_ids = [row[0] for row in db.session.query(User.id).filter(User.username.like(f'{prefix}%')).order_by(User.id)]
+
+    rows = []
+    for offset in range(days):
+        work_date = start_date + timedelta(days=offset)
+        is_rest = work_date.weekday() >= 5
+        for index, user_id in enumerate(user_ids):
+            rows.append({
+                'user_id': user_id,
+                'shift_type_id': None if is_rest else shift_ids[(index + offset) % len(shift_ids)],
+                'work_date': work_date,
+                'is_rest_day': is_rest,
+                'note': None,
+                'created_at': now,
+                'updated_at': now
+            })
+    for i in range(0, len(rows), 20000):
+        db.session.execute(insert(Schedule.__table__), rows[i:i + 20000])
+    refresh_reminder_windows()
+    return user_ids
+
+
+def expected_reminders(start, end, user_ids=None):
+    """按排班和提醒窗口计算模拟时段内应发送的提醒 {(用户ID, 类型): [(提醒时间, 过期时间)]}"""
+    schedules = Schedule.__table__
+    windows = ShiftReminderWindow.__table__
+    users = User.__table__
+    stmt = select(
+        schedules.c.user_id, schedules.c.work_date,
+        windows.c.check_in_from, windows.c.check_in_to, windows.c.check_out_from, windows.c.check_out_to
+    ).select_from(schedules.join(
+        windows, windows.c.shift_type_id == schedules.c.shift_type_id
+    ).join(users, users.c.id == schedules.c.user_id)).where(
+        schedules.c.work_date >= (start - timedelta(days=1)).date(),
+        schedules.c.work_date <= (end + timedelta(days=1)).date(),
+        schedules.c.is_rest_day == False,
+        users.c.is_active == True
+    )
+    if user_ids is not None:
+        stmt = stmt.where(schedules.c.user_id.in_(user_ids))
+    expected = {}
+    for user_id, work_date, in_from, in_to, out_from, out_to in db.session.execute(stmt):
+        midnight = datetime.combine(work_date, datetime.min.time())
+        for kind, due, expire in (('check_in', in_from, in_to), ('check_out', out_from, out_to + 1)):
+            due_at = midnight + timedelta(minutes=due)
+            expire_at = midnight + timedelta(minutes=expire)
+            # 只统计窗口完整落在模拟时段内的提醒
+            if due_at >= start and expire_at <= end:
+                expected.setdefault((user_id, kind), []).append((due_at, expire_at))
+    return expected
+
+
+def run_simulation(start, end, step=timedelta(minutes=1), scheduler=None, user_ids=None, on_tick=None):
+    """从 start 到 end（不含）按 step 驱动调度器，返回统计报告
+
+    需在应用上下文中调用。通知只记录在模拟后端中，不会真正发送；
+    user_ids 限定统计范围（如只统计模拟用户）。on_tick(now) 在每次检查前调用，可用于注入打卡等事件。
+    """
+    scheduler = scheduler or default_scheduler
+    clock = VirtualClock(start)
+    backend = MockNotificationBackend(clock)
+    query_count = {'count': 0}
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        query_count['count'] += 1
+
+    previous_factory = scheduler.__dict__.get('notification_factory')
+    scheduler.notification_factory = backend
+    scheduler._materialized_on = None
+    event.listen(db.engine, 'before_cursor_execute', _on_execute)
+    ticks = []
+    durations = []
+    queries = []
+    try:
+        while clock.now() < end:
+            if on_tick is not None:
+                on_tick(clock.now())
+            ticks.append(clock.now())
+            query_count['count'] = 0
+            started = time.perf_counter()
+            scheduler._check_schedules(clock.now())
+            durations.append((time.perf_counter() - started) * 1000)
+            queries.append(query_count['count'])
+            clock.advance(step)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _on_execute)
+        if previous_factory is None:
+            del scheduler.notification_factory
+        else:
+            scheduler.notification_factory = previous_factory
+        scheduler._materialized_on = None
+
+    return build_report(start, end, backend.sent, expected_reminders(start, end, user_ids),
+                        ticks, durations, queries, user_ids)
+
+
+def build_report(start, end, sent, expected, ticks, durations, queries, user_ids=None):
+    """将发送记录与应发送的提醒比对，汇总统计"""
+    if user_ids is not None:
+        user_ids = set(user_ids)
+        sent = [item for item in sent if item[0] in user_ids]
+    matched = {}
+    lags = []
+    duplicates = 0
+    outside = 0
+    for user_id, kind, sent_at in sent:
+        window = next(((due_at, expire_at) for due_at, expire_at in expected.get((user_id, kind), ())
+                       if due_at <= sent_at < expire_at), None)
+        if window is None:
+            outside += 1
+            continue
+        key = (user_id, kind, window[0])
+        if key in matched:
+            duplicates += 1
+            continue
+        matched[key] = sent_at
+        lags.append((sent_at - window[0]).total_seconds())
+
+    expected_total = sum(len(windows) for windows in expected.values())
+    busiest = max(range(len(durations)), key=durations.__getitem__) if durations else None
+    return {
+        'start': start.strftime('%Y-%m-%d %H:%M'),
+        'end': end.strftime('%Y-%m-%d %H:%M'),
+        'ticks': len(durations),
+        'expected': expected_total,
+        'sent': len(sent),
+        'duplicates': duplicates,
+        'outside_window': outside,
+        'missed': expected_total - len(matched),
+        'lag_seconds': {
+            'p50': percentile(lags, 0.5),
+            'p99': percentile(lags, 0.99),
+            'max': max(lags) if lags else None
+        },
+        'tick_ms': {
+            'p50': percentile(durations, 0.5),
+            'p99': percentile(durations, 0.99),
+            'max': max(durations) if durations else None
+        },
+        'queries_per_tick': {
+            'mean': sum(queries) / len(queries) if queries else 0,
+            'max': max(queries) if queries else 0
+        },
+        'busiest_tick': None if busiest is None else {
+            'at': ticks[busiest].strftime('%Y-%m-%d %H:%M'),
+            'ms': durations[busiest],
+            'queries': queries[busiest]
+        }
+    }
+
+
+def format_report(report):
+    """将统计报告格式化为多行文本"""
+    def fmt(value, unit=''):
+        return '-' if value is None else f'{value:.1f}{unit}'
+
+    lines = [
+        f'模拟时段: {report["start"]} ~ {report["end"]}，共 {report["ticks"]} 次检查',
+        f'应发送提醒: {report["expected"]}，实际发送: {report["sent"]}',
+        f'重复发送: {report["duplicates"]}，窗口外发送: {report["outside_window"]}，错过: {report["missed"]}',
+        f'发送延迟: p50 {fmt(report["lag_seconds"]["p50"], "s")}，p99 {fmt(report["lag_seconds"]["p99"], "s")}，'
+        f'最大 {fmt(report["lag_seconds"]["max"], "s")}',
+        f'每次检查耗时: p50 {fmt(report["tick_ms"]["p50"], "ms")}，p99 {fmt(report["tick_ms"]["p99"], "ms")}，'
+        f'最大 {fmt(report["tick_ms"]["max"], "ms")}',
+        f'每次检查SQL数: 平均 {report["queries_per_tick"]["mean"]:.1f}，最大 {report["queries_per_tick"]["max"]}',
+    ]
+    if report['busiest_tick']:
+        busiest = report['busiest_tick']
+        lines.append(f'最慢的一次检查: {busiest["at"]}，{busiest["ms"]:.1f}ms，{busiest["queries"]} 条SQL')
+    return '\n'.join(lines)
+
+
+def simulate(user_count, start, days=1, step_minutes=1, database_uri='sqlite://'):
+    """在独立数据库中生成模拟数据并运行模拟，返回统计报告
+
+    默认使用内存数据库，不影响正在使用的数据库。
+    """
+    from config import TestingConfig
+    from .. import create_app
+
+    config_class = type('SimulationConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': database_uri})
+    app = create_app(config_class)
+    with app.app_context():
+        user_ids = seed_synthetic_roster(user_count, start.date() - timedelta(days=1), days + 2)
+        db.session.commit()
+        try:
+            return run_simulation(start, start + timedelta(days=days), timedelta(minutes=step_minutes),
+                                  user_ids=user_ids)
+        finally:
+            db.session.remove()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动排班求解器
+在满足每班最少人数、最长连续上班天数、跨天最短休息时间和请假等约束下，
+先贪心生成排班，再在时间预算内以局部搜索（同日交换）改善夜班和上班天数的公平性
+确保中文字符编码正确处理
+"""
+
+import random
+import time
+from datetime import datetime, timedelta
+from ..models import db, User, ShiftType, Schedule
+from .importer import REST_SHIFT_NAMES
+from .roster import IN_CHUNK_SIZE, bulk_insert_schedules
+
+REST = -1
+DEFAULT_MAX_CONSECUTIVE = 6
+DEFAULT_MIN_REST_HOURS = 11
+DEFAULT_TIME_BUDGET = 2.0
+MAX_TIME_BUDGET = 30.0
+PREVIEW_LIMIT = 200
+LEAVE_NOTE = '请假'
+
+# 目标函数权重：缺员远重于公平性
+SHORTAGE_WEIGHT = 10000
+NIGHT_WEIGHT = 4
+WORK_WEIGHT = 1
+
+
+class SolverError(ValueError):
+    """自动排班参数错误"""
+
+
+def _minutes(value):
+    """'HH:MM' 转为当天分钟数"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class RosterSolver:
+    """自动排班求解器
+
+    assign[u][d] 为第 u 个用户第 d 天的班次序号，REST 表示休息；
+    前置的 max_consecutive 天和末尾 1 天为已有排班的上下文，只参与约束判断。
+    """
+
+    def __init__(self, user_ids, start_date, end_date, demand=None, max_consecutive=DEFAULT_MAX_CONSECUTIVE,
+                 min_rest_hours=DEFAULT_MIN_REST_HOURS, night_shift_ids=None, leave=None,
+                 time_budget=DEFAULT_TIME_BUDGET, seed=None):
+        if not user_ids:
+            raise SolverError('请选择用户')
+        if end_date < start_date:
+            raise SolverError('结束日期不能早于开始日期')
+        if max_consecutive < 1:
+            raise SolverError('最长连续上班天数至少为1')
+        self.user_ids = list(user_ids)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days = (end_date - start_date).days + 1
+        self.max_consecutive = max_consecutive
+        self.min_rest_minutes = int(min_rest_hours * 60)
+        self.time_budget = min(max(float(time_budget), 0.0), MAX_TIME_BUDGET)
+        self.random = random.Random(seed)
+        self.demand_override = {int(k): int(v) for k, v in (demand or {}).items()}
+        self.night_shift_ids = set(night_shift_ids) if night_shift_ids is not None else None
+        self.leave = set(leave or [])
+        # 上下文天数：范围前 max_consecutive 天用于连续天数判断，范围后 1 天用于休息时间判断
+        self.offset = max_consecutive
+        self.iterations = 0
+
+    def load(self):
+        """加载班次、已有排班和请假，初始化矩阵"""
+        shifts = db.session.query(
+            ShiftType.id, ShiftType.name, ShiftType.start_time, ShiftType.end_time, ShiftType.min_staff
+        ).filter(ShiftType.is_active == True).order_by(ShiftType.id).all()
+        shifts = [shift for shift in shifts if shift.name not in REST_SHIFT_NAMES]
+        self.shift_ids = [shift.id for shift in shifts]
+        self.shift_names = [shift.name for shift in shifts]
+        self.shift_index = {shift_id: index for index, shift_id in enumerate(self.shift_ids)}
+        self.demand = [self.demand_override.get(shift.id, shift.min_staff or 0) for shift in shifts]
+        if not any(self.demand):
+            raise SolverError('请为班次配置最少人数或在请求中指定每班需求人数')
+
+        starts = [_minutes(shift.start_time) for shift in shifts]
+        ends = [_minutes(shift.end_time) for shift in shifts]
+        # 跨零点的班次结束时间计入次日
+        ends = [end + 1440 if end <= start else end for start, end in zip(starts, ends)]
+        if self.night_shift_ids is None:
+            self.night = [end > 1440 or start >= 18 * 60 for start, end in zip(starts, ends)]
+        else:
+            self.night = [shift.id in self.night_shift_ids for shift in shifts]
+        # forbid[a][b]：前一天 a 班、后一天 b 班之间的休息时间不足
+        self.forbid = [[1440 + starts[b] - ends[a] < self.min_rest_minutes for b in range(len(shifts))]
+                       for a in range(len(shifts))]
+
+        width = self.offset + self.days + 1
+        users = len(self.user_ids)
+        self.assign = [[REST] * width for _ in range(users)]
+        self.locked = [[False] * width for _ in range(users)]
+        for u in range(users):
+            for d in list(range(self.offset)) + [width - 1]:
+                self.locked[u][d] = True
+
+        row_of = {user_id: u for u, user_id in enumerate(self.user_ids)}
+        context_start = self.start_date - timedelta(days=self.offset)
+        context_end = self.end_date + timedelta(days=1)
+        for i in range(0, users, IN_CHUNK_SIZE):
+            rows = db.session.query(
+                Schedule.user_id, Schedule.work_date, Schedule.shift_type_id, Schedule.is_rest_day
+            ).filter(
+                Schedule.user_id.in_(self.user_ids[i:i + IN_CHUNK_SIZE]),
+                Schedule.work_date >= context_start,
+                Schedule.work_date <= context_end
+            ).all()
+            for user_id, work_date, shift_type_id, is_rest_day in rows:
+                u = row_of[user_id]
+                d = (work_date - context_start).days
+                self.locked[u][d] = True
+                if not is_rest_day and shift_type_id in self.shift_index:
+                    self.assign[u][d] = self.shift_index[shift_type_id]
+
+        self.leave_cells = set()
+        for user_id, leave_date in self.leave:
+            if user_id in row_of and self.start_date <= leave_date <= self.end_date:
+                u, d = row_of[user_id], (leave_date - context_start).days
+                if not self.locked[u][d]:
+                    self.locked[u][d] = True
+                    self.leave_cells.add((u, d))
+
+        self.work_count = [sum(1 for d in self.solve_days() if self.assign[u][d] != REST) for u in range(users)]
+        self.night_count = [sum(1 for d in self.solve_days() if self.assign[u][d] != REST and self.night[self.assign[u][d]])
+                            for u in range(users)]
+        self.coverage = [[0] * len(self.shift_ids) for _ in range(width)]
+        for u in range(users):
+            for d in self.solve_days():
+                if self.assign[u][d] != REST:
+                    self.coverage[d][self.assign[u][d]] += 1
+
+    def solve_days(self):
+        """求解范围内的列序号"""
+        return range(self.offset, self.offset + self.days)
+
+    def feasible(self, u, d, value):
+        """判断第 u 个用户第 d 天改为 value 是否满足硬约束"""
+        if value == REST:
+            return True
+        row = self.assign[u]
+        previous, following = row[d - 1], row[d + 1]
+        if previous != REST and self.forbid[previous][value]:
+            return False
+        if following != REST and self.forbid[value][following]:
+            return False
+        run = 1
+        left = d - 1
+        while left >= 0 and row[left] != REST:
+            run += 1
+            left -= 1
+        right = d + 1
+        while right < len(row) and row[right] != REST:
+            run += 1
+            right += 1
+        return run <= self.max_consecutive
+
+    def set_cell(self, u, d, value):
+        """修改单元格并同步计数"""
+        old = self.assign[u][d]
+        if old != REST:
+            self.coverage[d][old] -= 1
+            self.work_count[u] -= 1
+            self.night_count[u] -= self.night[old]
+        if value != REST:
+            self.coverage[d][value] += 1
+            self.work_count[u] += 1
+            self.night_count[u] += self.night[value]
+        self.assign[u][d] = value
+
+    def greedy(self):
+        """逐日贪心：夜班优先，优先安排夜班数和上班天数较少的用户"""
+        order = sorted(range(len(self.shift_ids)), key=lambda s: (not self.night[s], s))
+        users = list(range(len(self.user_ids)))
+        for d in self.solve_days():
+            self.random.shuffle(users)
+            for s in order:
+                need = self.demand[s] - self.coverage[d][s]
+                if need <= 0:
+                    continue
+                candidates = sorted(
+                    (u for u in users if not self.locked[u][d] and self.assign[u][d] == REST),
+                    key=lambda u: (self.night_count[u] if self.night[s] else 0, self.work_count[u])
+                )
+                for u in candidates:
+                    if need <= 0:
+                        break
+                    if self.feasible(u, d, s):
+                        self.set_cell(u, d, s)
+                        need -= 1
+
+    def shortage(self):
+        """缺员总人次"""
+        return sum(max(0, self.demand[s] - self.coverage[d][s])
+                   for d in self.solve_days() for s in range(len(self.shift_ids)))
+
+    def objective(self):
+        """目标值：缺员惩罚 + 夜班数和上班天数的平方和（总量固定时等价于方差）"""
+        return (SHORTAGE_WEIGHT * self.shortage()
+                + NIGHT_WEIGHT * sum(count * count for count in self.night_count)
+                + WORK_WEIGHT * sum(count * count for count in self.work_count))
+
+    def swap_delta(self, u1, u2, d):
+        """交换两个用户同一天的班次后目标值的变化（同日交换不改变覆盖人数）"""
+        a, b = self.assign[u1][d], self.assign[u2][d]
+        work_a, work_b = a != REST, b != REST
+        night_a = work_a and self.night[a]
+        night_b = work_b and self.night[b]
+        delta = 0
+        dw = work_b - work_a
+        if dw:
+            w1, w2 = self.work_count[u1], self.work_count[u2]
+            delta += WORK_WEIGHT * ((w1 + dw) ** 2 + (w2 - dw) ** 2 - w1 ** 2 - w2 ** 2)
+        dn = night_b - night_a
+        if dn:
+            n1, n2 = self.night_count[u1], self.night_count[u2]
+            delta += NIGHT_WEIGHT * ((n1 + dn) ** 2 + (n2 - dn) ** 2 - n1 ** 2 - n2 ** 2)
+        return delta
+
+    def try_swap(self, u1, u2, d):
+        """在满足硬约束且不使目标变差时交换，返回是否交换"""
+        a, b = self.assign[u1][d], self.assign[u2][d]
+        if a == b or self.locked[u1][d] or self.locked[u2][d]:
+            return False
+        delta = self.swap_delta(u1, u2, d)
+        if delta > 0:
+            return False
+        # 先置为休息再判断，避免连续天数计入自身
+        self.set_cell(u1, d, REST)
+        self.set_cell(u2, d, REST)
+        if self.feasible(u1, d, b) and self.feasible(u2, d, a):
+            self.set_cell(u1, d, b)
+            self.set_cell(u2, d, a)
+            return True
+        self.set_cell(u1, d, a)
+        self.set_cell(u2, d, b)
+        return False
+
+    def repair(self):
+        """尝试为仍缺员的班次补人"""
+        users = range(len(self.user_ids))
+        for d in self.solve_days():
+            for s in range(len(self.shift_ids)):
+                while self.coverage[d][s] < self.demand[s]:
+                    candidate = next((u for u in sorted(users, key=lambda u: self.work_count[u])
+                                      if not self.locked[u][d] and self.assign[u][d] == REST
+                                      and self.feasible(u, d, s)), None)
+                    if candidate is None:
+                        break
+                    self.set_cell(candidate, d, s)
+
+    def local_search(self, deadline):
+        """随机同日交换，直到时间用完或长时间无改进"""
+        users = len(self.user_ids)
+        if users < 2:
+            return
+        days = list(self.solve_days())
+        stale = 0
+        while time.perf_counter() < deadline and stale < 20 * users * len(days):
+            self.iterations += 1
+            d = self.random.choice(days)
+            u1 = self.random.randrange(users)
+            u2 = self.random.randrange(users)
+            if u1 == u2:
+                continue
+            before = self.swap_delta(u1, u2, d)
+            if self.try_swap(u1, u2, d) and before < 0:
+                stale = 0
+            else:
+                stale += 1
+            # 交换可能释放出连续天数余量，定期补缺员
+            if self.iterations % 5000 == 0 and self.shortage():
+                self.repair()
+
+    def solve(self):
+        """执行求解，返回统计信息"""
+        started = time.perf_counter()
+        self.load()
+        self.greedy()
+        self.repair()
+        greedy_objective = self.objective()
+        self.local_search(started + self.time_budget)
+        self.repair()
+        return {
+            'greedy_objective': greedy_objective,
+            'objective': self.objective(),
+            'iterations': self.iterations,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def rows(self, note=None):
+        """求解结果中需要写入的排班行（已有排班不重复写入）"""
+        now = datetime.utcnow()
+        context_start = self.start_date - timedelta(days=self.offset)
+        rows = []
+        for u, user_id in enumerate(self.user_ids):
+            for d in self.solve_days():
+                if self.locked[u][d] and (u, d) not in self.leave_cells:
+                    continue
+                value = self.assign[u][d]
+                rows.append({
+                    'user_id': user_id,
+                    'work_date': context_start + timedelta(days=d),
+                    'shift_type_id': None if value == REST else self.shift_ids[value],
+                    'is_rest_day': value == REST,
+                    'note': LEAVE_NOTE if (u, d) in self.leave_cells else note,
+                    'created_at': now,
+                    'updated_at': now
+                })
+        return rows
+
+    def summary(self):
+        """缺员明细及公平性统计"""
+        context_start = self.start_date - timedelta(days=self.offset)
+        gaps = [{
+            'date': (context_start + timedelta(days=d)).isoformat(),
+            'shift_type_id': self.shift_ids[s],
+            'shift_name': self.shift_names[s],
+            'missing': self.demand[s] - self.coverage[d][s]
+        } for d in self.solve_days() for s in range(len(self.shift_ids)) if self.coverage[d][s] < self.demand[s]]
+        return {
+            'users': len(self.user_ids),
+            'days': self.days,
+            'demand': {str(shift_id): need for shift_id, need in zip(self.shift_ids, self.demand)},
+            'shortage': sum(gap['missing'] for gap in gaps),
+            'gaps': gaps,
+            'work_days': {'min': min(self.work_count), 'max': max(self.work_count)},
+            'night_shifts': {'min': min(self.night_count), 'max': max(self.night_count)}
+        }
+
+
+def solve_roster(user_ids, start_date, end_date, dry_run=True, note=None, **options):
+    """自动排班：求解并在非 dry_run 时批量写入（不提交事务）"""
+    solver = RosterSolver(user_ids, start_date, end_date, **options)
+    stats = solver.solve()
+    report = dict(solver.summary(), dry_run=dry_run, **stats)
+    rows = solver.rows(note)
+    report['rows'] = len(rows)
+    if dry_run:
+        report['preview'] = [{
+            'user_id': row['user_id'],
+            'work_date': row['work_date'].isoformat(),
+            'shift_type_id': row['shift_type_id'],
+            'is_rest_day': row['is_rest_day']
+        } for row in rows[:PREVIEW_LIMIT]]
+        return report
+    report['written'] = bulk_insert_schedules(rows)
+    return report
+
+
+def active_user_ids():
+    """默认参与排班的用户：全部启用的非管理员用户"""
+    return [user_id for user_id, in db.session.query(User.id).filter(
+        User.is_active == True, User.is_admin == False
+    ).order_by(User.id)]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库方言辅助工具
+按当前数据库方言生成原生的冲突处理语句
+确保中文字符编码正确处理
+"""
+
+from sqlalchemy import insert, func, text
+
+
+def dialect_name(bind):
+    """获取连接或引擎的方言名称"""
+    return bind.dialect.name
+
+
+def insert_ignore(table, bind, index_elements):
+    """生成忽略唯一键冲突的INSERT语句
+
+    sqlite/postgresql 使用 ON CONFLICT DO NOTHING，mysql 使用 INSERT IGNORE。
+    """
+    name = dialect_name(bind)
+    if name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    if name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing(index_elements=index_elements)
+    if name == 'mysql':
+        return insert(table).prefix_with('IGNORE')
+    raise NotImplementedError(f'不支持的数据库方言: {name}')
+
+
+def upsert(table, bind, index_elements, update_columns):
+    """生成冲突时更新指定列的INSERT语句
+
+    sqlite/postgresql 使用 ON CONFLICT DO UPDATE，mysql 使用 ON DUPLICATE KEY UPDATE。
+    """
+    name = dialect_name(bind)
+    if name in ('sqlite', 'postgresql'):
+        if name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+    if name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(table)
+        return stmt.on_duplicate_key_update(
+            {column: stmt.inserted[column] for column in update_columns}
+        )
+    raise NotImplementedError(f'不支持的数据库方言: {name}')
+
+
+def date_add_days(column, days, bind):
+    """生成 日期列 + days 天 的SQL表达式"""
+    days = int(days)
+    name = dialect_name(bind)
+    if name == 'sqlite':
+        return func.date(column, f'{days:+d} days')
+    if name == 'postgresql':
+        return column + days
+    if name == 'mysql':
+        return func.date_add(column, text(f'INTERVAL {days} DAY'))
+    raise NotImplementedError(f'不支持的数据库方言: {name}')
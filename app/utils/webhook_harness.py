@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提醒发送端到端压测
+在本地启动模拟的 AirScript 打卡检测接口和钉钉机器人（可配置延迟、错误率和限流），
+将 check_url/working_url/no_work_url 指向它，用虚拟时钟驱动调度器真实发送HTTP请求，
+统计从提醒窗口打开到钉钉收到消息的延迟分布、吞吐量、重试和丢弃的消息
+确保中文字符编码正确处理
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from ..models import db, User, SystemConfig
+from .notification import DINGTALK_RATE_LIMITED
+from .scheduler import scheduler as default_scheduler
+from .simulation import VirtualClock, expected_reminders, percentile, seed_synthetic_roster
+
+HARNESS_TOKEN = 'harness-token'
+# 模拟接口路径 -> 提醒类型
+ROBOT_PATHS = {'/dingtalk/working': 'check_in', '/dingtalk/no_work': 'check_out'}
+CHECK_PATH = '/airscript'
+# 从提醒内容中取出用户名：【上班提醒】用户名，您好！...
+USERNAME_PATTERN = re.compile(r'】(.+?)，')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        status, payload = self.server.mock.handle(self.path, body, self.headers)
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockWebhookServer:
+    """本地模拟的打卡检测接口和钉钉机器人
+
+    latency/jitter 为每个请求的处理延迟（秒）；error_rate 为返回HTTP 500的比例；
+    rate_limit 为每个机器人每分钟允许的消息数（0 不限流，钉钉机器人为20），超出时返回 errcode 130101；
+    clocked_in_rate 为打卡检测返回“已打卡”的比例。
+    """
+
+    def __init__(self, latency=0.01, jitter=0.005, error_rate=0.0, rate_limit=0, clocked_in_rate=0.0,
+                 token=HARNESS_TOKEN, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.clocked_in_rate = clocked_in_rate
+        self.token = token
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._windows = {path: deque() for path in ROBOT_PATHS}
+        self._httpd = None
+        self._thread = None
+        # 钉钉请求记录 [(提醒类型, 用户名, 收到时间, 结果)]，结果为 delivered/error/rate_limited
+        self.attempts = []
+        self.checks = {'total': 0, 'clocked_in': 0, 'error': 0}
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.mock = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _roll(self):
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            return delay, self._random.random()
+
+    def handle(self, path, body, headers):
+        """处理一次请求，返回 (HTTP状态码, 响应JSON)"""
+        delay, roll = self._roll()
+        if delay:
+            time.sleep(delay)
+        if path == CHECK_PATH:
+            return self._handle_check(body, headers, roll)
+        if path in ROBOT_PATHS:
+            return self._handle_robot(path, body, roll)
+        return 404, {'errcode': 404, 'errmsg': 'not found'}
+
+    def _handle_check(self, body, headers, roll):
+        with self._lock:
+            self.checks['total'] += 1
+            if headers.get('AirScript-Token') != self.token:
+                self.checks['error'] += 1
+                return 401, {'error': 'invalid token'}
+            if roll < self.error_rate:
+                self.checks['error'] += 1
+                return 500, {'error': 'injected'}
+            argv = json.loads(body or b'{}').get('Context', {}).get('argv', {})
+            clocked = self._random.random() < self.clocked_in_rate
+            if clocked:
+                self.checks['clocked_in'] += 1
+        prefix = '上班' if argv.get('message') == 'A1' else '下班'
+        return 200, {'data': {'result': {'打卡检测': f'{prefix}已打卡' if clocked else f'{prefix}未打卡'}}}
+
+    def _handle_robot(self, path, body, roll):
+        content = json.loads(body or b'{}').get('text', {}).get('content', '')
+        match = USERNAME_PATTERN.search(content)
+        username = match.group(1) if match else None
+        received = time.time()
+        with self._lock:
+            if roll < self.error_rate:
+                self.attempts.append((ROBOT_PATHS[path], username, received, 'error'))
+                return 500, {'errcode': -1, 'errmsg': 'injected'}
+            if self.rate_limit:
+                window = self._windows[path]
+                while window and window[0] <= received - 60:
+                    window.popleft()
+                if len(window) >= self.rate_limit:
+                    self.attempts.append((ROBOT_PATHS[path], username, received, 'rate_limited'))
+                    return 200, {'errcode': DINGTALK_RATE_LIMITED, 'errmsg': 'send too fast'}
+                window.append(received)
+            self.attempts.append((ROBOT_PATHS[path], username, received, 'delivered'))
+        return 200, {'errcode': 0, 'errmsg': 'ok'}
+
+
+def configure_endpoints(server):
+    """将提醒相关的接口配置指向模拟服务器（不提交事务），返回原配置用于恢复"""
+    values = {
+        'api_token': server.token,
+        'check_url': f'{server.url}{CHECK_PATH}',
+        'working_url': f'{server.url}/dingtalk/working',
+        'no_work_url': f'{server.url}/dingtalk/no_work',
+    }
+    return set_configs(values)
+
+
+def set_configs(values):
+    """批量写入系统配置（不提交事务），返回原配置"""
+    configs = {config.key: config for config in SystemConfig.query.filter(SystemConfig.key.in_(list(values)))}
+    previous = {key: configs[key].value if key in configs else None for key in values}
+    for key, value in values.items():
+        if key in configs:
+            configs[key].value = value
+        else:
+            db.session.add(SystemConfig(key=key, value=value))
+    return previous
+
+
+def run_load(start, end, server, step=timedelta(minutes=1), scheduler=None, user_ids=None):
+    """从 start 到 end 按 step 驱动调度器，通知经 NotificationService 真实发送到模拟服务器
+
+    需在应用上下文中调用，结束后恢复接口配置。返回统计报告。
+    """
+    scheduler = scheduler or default_scheduler
+    clock = VirtualClock(start)
+    previous = configure_endpoints(server)
+    db.session.commit()
+    scheduler._materialized_on = None
+    ticks = []
+    started = time.time()
+    try:
+        while clock.now() < end:
+            tick_started = time.time()
+            scheduler._check_schedules(clock.now())
+            ticks.append((clock.now(), tick_started, time.time()))
+            clock.advance(step)
+    finally:
+        scheduler._materialized_on = None
+        set_configs({key: value or '' for key, value in previous.items()})
+        db.session.commit()
+
+    expected = expected_reminders(start, end, user_ids)
+    usernames = dict(db.session.query(User.username, User.id).filter(
+        User.id.in_({user_id for user_id, _ in expected})
+    )) if expected else {}
+    return build_load_report(expected, ticks, server, usernames, time.time() - started)
+
+
+def build_load_report(expected, ticks, server, usernames, wall_seconds):
+    """按钉钉收到消息的时间计算投递延迟：所在检查的虚拟时间 + 检查开始后经过的真实时间 - 窗口打开时间"""
+    starts = [tick_started for _, tick_started, _ in ticks]
+    attempts = {}
+    latencies = []
+    delivered = set()
+    for kind, username, received, outcome in server.attempts:
+        if not starts:
+            break
+        index = max(0, bisect_right(starts, received) - 1)
+        virtual_now, tick_started, _ = ticks[index]
+        user_id = usernames.get(username)
+        due = next((due for due, expire in expected.get((user_id, kind), ()) if due <= virtual_now < expire), None)
+        if due is None:
+            continue
+        # 同一用户同一类型一天内可能有多个窗口（如跨零点班次），按窗口统计
+        key = (user_id, kind, due)
+        attempts[key] = attempts.get(key, 0) + 1
+        if outcome == 'delivered' and key not in delivered:
+            delivered.add(key)
+            sent_at = virtual_now + timedelta(seconds=received - tick_started)
+            latencies.append((sent_at - due).total_seconds())
+
+    expected_total = sum(len(windows) for windows in expected.values())
+    attempted = set(attempts)
+    # 有钉钉请求的检查视为发送中，吞吐量按这些检查的总耗时计算
+    busy_ticks = {max(0, bisect_right(starts, received) - 1) for _, _, received, _ in server.attempts}
+    busy = sum(ticks[index][2] - ticks[index][1] for index in busy_ticks) if starts else 0
+    outcomes = [outcome for _, _, _, outcome in server.attempts]
+    return {
+        'ticks': len(ticks),
+        'expected': expected_total,
+        'delivered': len(delivered),
+        'skipped_clocked_in': server.checks['clocked_in'],
+        'dropped': len(attempted - delivered),
+        'missed': max(0, expected_total - len(attempted) - server.checks['clocked_in']),
+        'retries': sum(attempts[key] - 1 for key in attempted),
+        'requests': {
+            'check': server.checks['total'],
+            'robot': len(outcomes),
+            'errors': outcomes.count('error') + server.checks['error'],
+            'rate_limited': outcomes.count('rate_limited')
+        },
+        'latency_seconds': {
+            'p50': percentile(latencies, 0.5),
+            'p90': percentile(latencies, 0.9),
+            'p99': percentile(latencies, 0.99),
+            'max': max(latencies) if latencies else None
+        },
+        'throughput_per_second': len(delivered) / busy if busy else 0,
+        'longest_tick_seconds': max((tick_ended - tick_started for _, tick_started, tick_ended in ticks), default=0),
+        'wall_seconds': wall_seconds
+    }
+
+
+def format_load_report(report):
+    """将压测报告格式化为多行文本"""
+    def fmt(value, unit=''):
+        return '-' if value is None else f'{value:.2f}{unit}'
+
+    latency = report['latency_seconds']
+    requests = report['requests']
+    return '\n'.join([
+        f'检查 {report["ticks"]} 次，总耗时 {report["wall_seconds"]:.1f}s，最长一次检查 {report["longest_tick_seconds"]:.2f}s',
+        f'应发送提醒: {report["expected"]}，已送达: {report["delivered"]}，已打卡跳过: {report["skipped_clocked_in"]}',
+        f'重试: {report["retries"]}，丢弃: {report["dropped"]}，未发送: {report["missed"]}',
+        f'请求: 打卡检测 {requests["check"]}，钉钉 {requests["robot"]}，'
+        f'错误 {requests["errors"]}，限流 {requests["rate_limited"]}',
+        f'送达延迟: p50 {fmt(latency["p50"], "s")}，p90 {fmt(latency["p90"], "s")}，'
+        f'p99 {fmt(latency["p99"], "s")}，最大 {fmt(latency["max"], "s")}',
+        f'发送吞吐量: {report["throughput_per_second"]:.1f} 条/秒',
+    ])
+
+
+def run_harness(user_count, start, hours=24, step_minutes=1, database_uri='sqlite://', retries=2, **server_options):
+    """在独立数据库中生成排班、启动模拟服务器并运行压测，返回报告
+
+    生产默认不重试；压测默认开启 retries 次重试，以便观察限流和错误注入下的重试表现。
+    """
+    from config import TestingConfig
+    from .. import create_app
+
+    config_class = type('HarnessConfig', (TestingConfig,), {'SQLALCHEMY_DATABASE_URI': database_uri,
+                                                             'NOTIFICATION_RETRIES': retries})
+    app = create_app(config_class)
+    end = start + timedelta(hours=hours)
+    with app.app_context(), MockWebhookServer(**server_options) as server:
+        user_ids = seed_synthetic_roster(user_count, start.date() - timedelta(days=1), (end - start).days + 3)
+        db.session.commit()
+        try:
+            return run_load(start, end, server, timedelta(minutes=step_minutes), user_ids=user_ids)
+        finally:
+            db.session.remove()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/calendar-events 基准测试
+对比逐条懒加载与关联投影查询在 100/1k/10k 用户月视图下的耗时，
+以及 JSON 与紧凑列式格式的响应体积和序列化耗时
+
+用法: python -m benchmarks.bench_calendar_events [--sizes 100,1000,10000] [--legacy-max 1000]
+"""
+
+import argparse
+import json
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, seed_month, count_queries, timed
+from app.models import db, Schedule
+from app.utils.calendar import (
+    get_calendar_events, query_calendar_rows, build_calendar_events, encode_compact_events
+)
+
+
+def legacy_calendar_events(start_date, end_date):
+    """原实现：加载完整ORM对象并逐条懒加载用户和班次"""
+    schedules = Schedule.query.filter(
+        Schedule.work_date >= start_date,
+        Schedule.work_date <= end_date
+    ).all()
+    events = []
+    for schedule in schedules:
+        if schedule.is_rest_day:
+            events.append({
+                'id': schedule.id,
+                'title': '休息',
+                'start': schedule.work_date.strftime('%Y-%m-%d'),
+                'color': '#95a5a6',
+                'allDay': True,
+                'extendedProps': {
+                    'type': 'rest',
+                    'user': schedule.user.username if schedule.user else '未知',
+                    'note': schedule.note or ''
+                }
+            })
+        elif schedule.shift_type:
+            events.append({
+                'id': schedule.id,
+                'title': f'{schedule.shift_type.name} ({schedule.user.username})',
+                'start': schedule.work_date.strftime('%Y-%m-%d'),
+                'color': schedule.shift_type.color,
+                'allDay': True,
+                'extendedProps': {
+                    'type': 'work',
+                    'shift_name': schedule.shift_type.name,
+                    'start_time': schedule.shift_type.start_time,
+                    'end_time': schedule.shift_type.end_time,
+                    'user': schedule.user.username if schedule.user else '未知',
+                    'note': schedule.note or ''
+                }
+            })
+    return events
+
+
+def run(size, legacy_max):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        month_start = date(2024, 1, 1)
+        month_end = month_start + timedelta(days=30)
+        rows = seed_month(size, month_start, days=31)
+
+        results = []
+        with count_queries(db.engine) as counter:
+            elapsed, events = timed(lambda: get_calendar_events(month_start, month_end))
+        results.append(('projected', elapsed, counter['count'] // 3, len(events)))
+
+        if size <= legacy_max:
+            with count_queries(db.engine) as counter:
+                elapsed, events = timed(lambda: legacy_calendar_events(month_start, month_end), repeat=1)
+            results.append(('legacy', elapsed, counter['count'], len(events)))
+
+        for name, elapsed, queries, count in results:
+            print(f'{size:>6} users  {rows:>7} rows  {name:<10} {elapsed:>10.1f} ms  '
+                  f'{queries:>6} queries  {count:>7} events')
+
+        # 序列化对比：同一批投影行分别编码，不含数据库查询
+        projected = [tuple(row) for row in query_calendar_rows(month_start, month_end)]
+        encoders = {
+            'json': lambda: json.dumps(build_calendar_events(projected), ensure_ascii=False,
+                                       separators=(',', ':')).encode('utf-8'),
+            'compact': lambda: json.dumps(encode_compact_events(projected, month_start), ensure_ascii=False,
+                                          separators=(',', ':')).encode('utf-8')
+        }
+        for fmt, encode in encoders.items():
+            elapsed, body = timed(encode)
+            print(f'{size:>6} users  {rows:>7} rows  {fmt:<10} {elapsed:>10.1f} ms  '
+                  f'{len(body) / 1024:>10.1f} KiB')
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/calendar-events 基准测试')
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--legacy-max', type=int, default=1000,
+                        help='超过该用户数时跳过原实现')
+    args = parser.parse_args()
+    for size in [int(s) for s in args.sizes.split(',')]:
+        run(size, args.legacy_max)
+
+
+if __name__ == '__main__':
+    main()
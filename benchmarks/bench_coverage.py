@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班覆盖率基准测试
+统计全量重建在岗人数汇总、单条排班修改后的增量刷新，以及按月/按年分析的耗时
+
+用法: python -m benchmarks.bench_coverage [--users 2000] [--days 365]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, seed_month, count_queries, timed
+from app.models import db, Schedule, ShiftType
+from app.utils.coverage import rebuild_coverage, analyze_coverage
+
+
+def run(user_count, days):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        start_date = date(2024, 1, 1)
+        end_date = start_date + timedelta(days=days - 1)
+        rows = seed_month(user_count, start_date, days=days)
+        print(f'{user_count} users x {days} days = {rows} rows')
+
+        elapsed, _ = timed(rebuild_coverage, repeat=1)
+        print(f'rebuild            {elapsed:>9.1f} ms')
+
+        for shift in ShiftType.query:
+            shift.min_staff = user_count // 3
+            shift.max_staff = user_count // 3
+        db.session.commit()
+
+        def edit_one():
+            schedule = db.session.query(Schedule).filter(Schedule.is_rest_day == False).first()
+            schedule.shift_type_id = schedule.shift_type_id % 3 + 1
+            db.session.commit()
+
+        with count_queries(db.engine) as counter:
+            elapsed, _ = timed(edit_one)
+        print(f'single edit        {elapsed:>9.1f} ms  {counter["count"] // 3} queries (incl. select and cache bumps)')
+
+        for label, end in (('analyze month', start_date + timedelta(days=30)), ('analyze year', end_date)):
+            elapsed, report = timed(lambda: analyze_coverage(start_date, end))
+            print(f'{label:<18} {elapsed:>9.1f} ms  {len(report["gaps"])} gaps  {len(report["overloads"])} overloads')
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='排班覆盖率基准测试')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+    run(args.users, args.days)
+
+
+if __name__ == '__main__':
+    main()
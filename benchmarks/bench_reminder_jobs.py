@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提醒任务队列基准测试
+物化 前一天/当天/次日 的提醒任务、批量预生成考勤记录，并统计无到期任务和有到期任务时单次认领的耗时
+
+用法: python -m benchmarks.bench_reminder_jobs [--users 5000]
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, seed_month, count_queries, timed
+from app.models import db, ReminderJob
+from app.utils.reminders import refresh_reminder_windows
+from app.utils.attendance import materialize_attendance, materialize_dates
+from app.utils.reminder_jobs import materialize_reminder_jobs, claim_due_jobs, CLAIM_BATCH_SIZE
+
+
+def run(user_count):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        today = datetime.now().date()
+        seed_month(user_count, today - timedelta(days=1), days=3)
+        refresh_reminder_windows()
+        db.session.commit()
+        midnight = datetime.combine(today, datetime.min.time())
+
+        elapsed, written = timed(lambda: materialize_reminder_jobs(midnight), repeat=1)
+        print(f'{user_count} users, {ReminderJob.query.count()} jobs')
+        print(f'materialize {elapsed:>9.1f} ms  {written} rows')
+
+        with count_queries(db.engine) as counter:
+            elapsed, written = timed(lambda: materialize_attendance(materialize_dates(today), today=today), repeat=1)
+        db.session.commit()
+        print(f'attendance  {elapsed:>9.1f} ms  {written} rows  {counter["count"]} queries')
+
+        # 03:00 没有到期任务
+        with count_queries(db.engine) as counter:
+            idle, jobs = timed(lambda: claim_due_jobs(midnight + timedelta(hours=3)))
+        print(f'idle tick   {idle:>9.2f} ms  {len(jobs)} claimed  {counter["count"] // 3} queries')
+
+        # 08:45 A班上班提醒到期，每次认领一批
+        busy, jobs = timed(lambda: claim_due_jobs(midnight + timedelta(hours=8, minutes=45)), repeat=1)
+        print(f'busy tick   {busy:>9.2f} ms  {len(jobs)} claimed (batch {CLAIM_BATCH_SIZE})')
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='提醒任务队列基准测试')
+    parser.add_argument('--users', type=int, default=5000)
+    args = parser.parse_args()
+    run(args.users)
+
+
+if __name__ == '__main__':
+    main()
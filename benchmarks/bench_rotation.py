@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轮班排班引擎基准测试
+分别统计矩阵展开、写入行构造和批量写入的耗时，默认 1000 用户 × 365 天
+
+用法: python -m benchmarks.bench_rotation [--users 1000] [--days 365] [--skip-write]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, seed_month, count_queries, timed
+from app.models import db, User, ShiftType
+from app.utils.rotation import (
+    resolve_pattern, expand_rotation, summarize_matrix, matrix_to_rows, generate_rotation
+)
+
+
+def run(user_count, days, skip_write):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        seed_month(user_count, date(2024, 1, 1), days=0)
+        shift_ids = [row[0] for row in db.session.query(ShiftType.id).order_by(ShiftType.id)]
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+
+        # 4 上 2 休：A-A-B-B-休-休，各班组错开 2 天
+        pattern = [shift_ids[0], shift_ids[0], shift_ids[1], shift_ids[1], '休', '休']
+        offsets = [index * 2 for index in range(len(user_ids))]
+        start_date = date(2024, 1, 1)
+        end_date = start_date + timedelta(days=days - 1)
+        codes = resolve_pattern(pattern)
+
+        elapsed, matrix = timed(lambda: expand_rotation(codes, offsets, start_date, end_date))
+        print(f'expand      {user_count:>6} users x {days} days  {elapsed:>8.1f} ms  {matrix.size:>8} cells')
+        elapsed, _ = timed(lambda: summarize_matrix(matrix, start_date))
+        print(f'summarize   {user_count:>6} users x {days} days  {elapsed:>8.1f} ms')
+        elapsed, rows = timed(lambda: matrix_to_rows(user_ids, start_date, matrix))
+        print(f'build rows  {user_count:>6} users x {days} days  {elapsed:>8.1f} ms  {len(rows):>8} rows')
+
+        if not skip_write:
+            user_offsets = list(zip(user_ids, offsets))
+            with count_queries(db.engine) as counter:
+                elapsed, report = timed(lambda: generate_rotation(
+                    pattern, user_offsets, start_date, end_date, dry_run=False, overwrite=True
+                ), repeat=1)
+                db.session.commit()
+            print(f'write       {user_count:>6} users x {days} days  {elapsed:>8.1f} ms  '
+                  f'{report["written"]:>8} rows  {counter["count"]} queries')
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='轮班排班引擎基准测试')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--skip-write', action='store_true', help='只统计内存中的展开耗时')
+    args = parser.parse_args()
+    run(args.users, args.days, args.skip_write)
+
+
+if __name__ == '__main__':
+    main()
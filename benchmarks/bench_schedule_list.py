@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班列表分页基准测试
+对比原 OFFSET 分页（每页 COUNT + 逐条懒加载）与游标分页投影查询在首页、中间页和末页的耗时
+
+用法: python -m benchmarks.bench_schedule_list [--users 2000] [--days 365] [--per-page 20]
+"""
+
+import argparse
+from datetime import date
+
+from benchmarks.common import make_app, seed_month, count_queries, timed
+from app.models import db, Schedule
+from app.utils.listing import list_schedule_page, schedule_count_cache, encode_cursor
+
+
+def legacy_page(page, per_page, user_id=None):
+    """原实现：paginate() 带 COUNT，to_dict() 逐条懒加载用户和班次"""
+    query = Schedule.query
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    schedules = query.order_by(Schedule.work_date.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    return [schedule.to_dict() for schedule in schedules.items], schedules.total
+
+
+def keyset_walk(pages, per_page, user_id=None):
+    """沿游标翻到第 pages 页，返回每页游标以便单独计时"""
+    cursors = [None]
+    for _ in range(pages - 1):
+        _, cursor = list_schedule_page(user_id=user_id, cursor=cursors[-1], per_page=per_page)
+        if cursor is None:
+            break
+        cursors.append(cursor)
+    return cursors
+
+
+def cursor_before(page, per_page):
+    """定位第 page 页的游标，即第 page-1 页最后一条（仅用于构造测试起点）"""
+    if page <= 1:
+        return None
+    row = db.session.query(Schedule.work_date, Schedule.id).order_by(
+        Schedule.work_date.desc(), Schedule.id.desc()
+    ).offset((page - 1) * per_page - 1).limit(1).first()
+    return encode_cursor(row.work_date, row.id)
+
+
+def run(user_count, days, per_page):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        rows = seed_month(user_count, date(2024, 1, 1), days=days)
+        pages = rows // per_page
+        targets = {'first': 1, 'middle': pages // 2, 'last': pages}
+        print(f'{user_count} users x {days} days = {rows} rows, {pages} pages of {per_page}')
+
+        for name, page in targets.items():
+            with count_queries(db.engine) as counter:
+                elapsed, _ = timed(lambda: legacy_page(page, per_page), repeat=1)
+            print(f'legacy  {name:<7} page {page:>6}  {elapsed:>9.1f} ms  {counter["count"]:>4} queries')
+
+        # 游标分页：中间页和末页的起点游标直接定位，只计时翻到该页的单次查询
+        cursor_pages = {
+            'first': None,
+            'middle': cursor_before(targets['middle'], per_page),
+            'last': cursor_before(targets['last'], per_page)
+        }
+        for name, cursor in cursor_pages.items():
+            with count_queries(db.engine) as counter:
+                elapsed, _ = timed(lambda: list_schedule_page(cursor=cursor, per_page=per_page))
+            print(f'keyset  {name:<7}              {elapsed:>9.1f} ms  {counter["count"] // 3:>4} queries')
+
+        user_cursor = keyset_walk(5, per_page, user_id=1)[-1]
+        elapsed, _ = timed(lambda: list_schedule_page(user_id=1, cursor=user_cursor, per_page=per_page))
+        print(f'keyset  user=1 page 5          {elapsed:>9.1f} ms')
+
+        schedule_count_cache.clear()
+        elapsed, _ = timed(lambda: schedule_count_cache.count(), repeat=1)
+        print(f'total   cold                   {elapsed:>9.1f} ms')
+        elapsed, _ = timed(lambda: schedule_count_cache.count())
+        print(f'total   cached                 {elapsed:>9.1f} ms')
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='排班列表分页基准测试')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+    run(args.users, args.days, args.per_page)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量序列化基准测试
+对比 逐条 to_dict（懒加载 / 预加载关联）与 投影查询 + 批量序列化 在 1 万行响应上的单行开销，
+并校验两种方式输出一致
+
+用法: python -m benchmarks.bench_serializers [--rows 10000]
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from benchmarks.common import make_app, seed_month, count_queries, timed
+from app.models import db, User, Schedule, SystemLog, AttendanceRecord
+from app.utils import serializers
+from app.utils.serializers import schedule_serializer, system_log_serializer, attendance_serializer, dumps
+
+
+def seed_logs(user_ids, shift_ids, count):
+    """写入 count 条系统日志和考勤记录"""
+    now = datetime.utcnow()
+    db.session.execute(insert(SystemLog.__table__), [{
+        'user_id': user_ids[i % len(user_ids)] if i % 10 else None,
+        'log_type': 'schedule',
+        'log_level': 'INFO',
+        'message': f'修改排班 #{i}',
+        'ip_address': '127.0.0.1',
+        'user_agent': 'bench',
+        'created_at': now - timedelta(seconds=i)
+    } for i in range(count)])
+    db.session.execute(insert(AttendanceRecord.__table__), [{
+        'user_id': user_ids[i % len(user_ids)],
+        'work_date': date(2024, 1, 1) + timedelta(days=i // len(user_ids)),
+        'shift_type_id': shift_ids[i % len(shift_ids)],
+        'clock_in_status': '未打卡',
+        'clock_out_status': '未打卡',
+        'clock_in_reminded': False,
+        'clock_out_reminded': False,
+        'created_at': now,
+        'updated_at': now
+    } for i in range(count)])
+    db.session.commit()
+
+
+def compare(app, name, model, serializer, eager, limit):
+    """输出三种方式的耗时、SQL数与单行开销"""
+    def per_row_lazy():
+        db.session.expunge_all()
+        items = model.query.order_by(model.id).limit(limit).all()
+        return app.json.dumps([item.to_dict() for item in items])
+
+    def per_row_eager():
+        db.session.expunge_all()
+        items = model.query.options(*[joinedload(rel) for rel in eager]).order_by(model.id).limit(limit).all()
+        return app.json.dumps([item.to_dict() for item in items])
+
+    def bulk():
+        rows = serializer.query().order_by(model.id).limit(limit).all()
+        return dumps(serializer.dump_rows(rows))
+
+    db.session.expunge_all()
+    expected = [item.to_dict() for item in model.query.order_by(model.id).limit(limit)]
+    actual = serializer.dump_rows(serializer.query().order_by(model.id).limit(limit).all())
+    assert expected == actual, f'{name}: 批量序列化结果与 to_dict 不一致'
+
+    print(f'{name} ({len(actual)} rows)')
+    for label, func in (('to_dict lazy', per_row_lazy), ('to_dict eager', per_row_eager), ('bulk', bulk)):
+        with count_queries(db.engine) as counter:
+            func()
+        elapsed, _ = timed(func)
+        print(f'  {label:<14}{elapsed:>9.1f} ms  {elapsed * 1000 / len(actual):>7.2f} us/row  '
+              f'{counter["count"]} queries')
+
+
+def run(row_count):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        user_count = 400
+        seed_month(user_count, date(2024, 3, 1), days=(row_count + user_count - 1) // user_count)
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+        seed_logs(user_ids, [1, 2, 3], row_count)
+
+        print(f'json backend: {"orjson" if serializers.orjson is not None else "json"}')
+        compare(app, 'schedules', Schedule, schedule_serializer, [Schedule.user, Schedule.shift_type], row_count)
+        compare(app, 'system_logs', SystemLog, system_log_serializer, [SystemLog.user], row_count)
+        compare(app, 'attendance', AttendanceRecord, attendance_serializer,
+                [AttendanceRecord.user, AttendanceRecord.shift_type], row_count)
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量序列化基准测试')
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+    run(args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自动排班求解器基准测试
+默认 200 人 × 31 天，A/B/C 三个班次，统计贪心与局部搜索后的缺员和公平性
+
+用法: python -m benchmarks.bench_solver [--users 200] [--days 31] [--budget 2] [--write]
+"""
+
+import argparse
+from datetime import date, timedelta
+
+from benchmarks.common import make_app, seed_month, count_queries
+from app.models import db, User, ShiftType
+from app.utils.solver import solve_roster
+
+
+def run(user_count, days, budget, write):
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        start_date = date(2024, 3, 1)
+        seed_month(user_count, start_date, days=0)
+        # 每天需求约占总人数的 60%，夜班（C班）占其中六分之一
+        for shift, share in zip(ShiftType.query.order_by(ShiftType.id), (0.3, 0.2, 0.1)):
+            shift.min_staff = int(user_count * share)
+        db.session.commit()
+        user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+        # 每人请假 2 天
+        leave = [(user_id, start_date + timedelta(days=(index * 7) % days)) for index, user_id in enumerate(user_ids)]
+        leave += [(user_id, start_date + timedelta(days=(index * 7 + 3) % days)) for index, user_id in enumerate(user_ids)]
+
+        with count_queries(db.engine) as counter:
+            report = solve_roster(user_ids, start_date, start_date + timedelta(days=days - 1),
+                                  dry_run=not write, leave=leave, time_budget=budget, seed=1)
+            if write:
+                db.session.commit()
+        print(f'{user_count} users x {days} days, budget {budget}s')
+        print(f'elapsed     {report["elapsed_ms"]:>9.1f} ms  {report["iterations"]} local-search iterations')
+        print(f'objective   greedy {report["greedy_objective"]} -> {report["objective"]}')
+        print(f'shortage    {report["shortage"]}')
+        print(f'work days   {report["work_days"]["min"]}-{report["work_days"]["max"]}')
+        print(f'night shifts {report["night_shifts"]["min"]}-{report["night_shifts"]["max"]}')
+        print(f'rows        {report["rows"]}  {counter["count"]} queries')
+        db.session.remove()
+        db.drop_all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='自动排班求解器基准测试')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--budget', type=float, default=2.0)
+    parser.add_argument('--write', action='store_true', help='同时批量写入结果')
+    args = parser.parse_args()
+    run(args.users, args.days, args.budget, args.write)
+
+
+if __name__ == '__main__':
+    main()
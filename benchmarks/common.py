@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试公共工具
+提供最小化应用、数据构造、计时和SQL计数
+确保中文字符编码正确处理
+"""
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import Flask
+from sqlalchemy import event, insert
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.models import db, User, ShiftType, Schedule  # noqa: E402
+
+
+def make_app(database_uri='sqlite:///:memory:'):
+    """创建只包含数据库的最小应用"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed_month(user_count, month_start, days=30):
+    """批量写入 user_count 个用户在 days 天内的排班"""
+    now = datetime.utcnow()
+    shifts = [
+        {'name': 'A班', 'start_time': '09:00', 'end_time': '18:00', 'color': '#3498db'},
+        {'name': 'B班', 'start_time': '13:00', 'end_time': '22:00', 'color': '#e74c3c'},
+        {'name': 'C班', 'start_time': '22:00', 'end_time': '06:00', 'color': '#8e44ad'},
+    ]
+    for shift in shifts:
+        shift.update(is_active=True, created_at=now, updated_at=now)
+    db.session.execute(insert(ShiftType.__table__), shifts)
+
+    users = [{
+        'username': f'user{i:05d}',
+        'password_hash': '-',
+        'email': None,
+        'is_admin': False,
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now
+    } for i in range(user_count)]
+    db.session.execute(insert(User.__table__), users)
+
+    shift_ids = [row[0] for row in db.session.query(ShiftType.id).order_by(ShiftType.id)]
+    user_ids = [row[0] for row in db.session.query(User.id).order_by(User.id)]
+
+    rows = []
+    for offset in range(days):
+        work_date = month_start + timedelta(days=offset)
+        is_rest = work_date.weekday() >= 5
+        for index, user_id in enumerate(user_ids):
+            rows.append({
+                'user_id': user_id,
+                'shift_type_id': None if is_rest else shift_ids[(index + offset) % len(shift_ids)],
+                'work_date': work_date,
+                'is_rest_day': is_rest,
+                'note': None,
+                'created_at': now,
+                'updated_at': now
+            })
+    for i in range(0, len(rows), 20000):
+        db.session.execute(insert(Schedule.__table__), rows[i:i + 20000])
+    db.session.commit()
+    return len(rows)
+
+
+@contextmanager
+def count_queries(engine):
+    """统计代码块内执行的SQL语句数"""
+    counter = {'count': 0}
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+
+    event.listen(engine, 'before_cursor_execute', _on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', _on_execute)
+
+
+def timed(func, repeat=3):
+    """执行 repeat 次，返回 (最优耗时毫秒, 最后一次结果)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
@@ -20,7 +20,22 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'data', 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_RECORD_QUERIES = True
+    SQLALCHEMY_RECORD_QUERIES = False
+    
+    # SQL性能分析（开启后每个请求统计SQL条数和耗时；关闭时管理员可用 X-SQL-Profile: 1 请求头分析单个请求）
+    SQL_PROFILING = (os.environ.get('SQL_PROFILING') or '').lower() in ('1', 'true', 'yes')
+    SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS') or 50)
+    SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD') or 5)
+    
+    # Prometheus 指标（/metrics），设置后抓取时需携带 Authorization: Bearer <token>
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # 未设置令牌时 /metrics 是否仍需认证（此时只允许已登录的管理员访问）
+    METRICS_REQUIRE_AUTH = False
+    
+    # 钉钉Webhook失败（连接错误、429/5xx、限流）后的重试次数和首次重试等待（秒），之后每次翻倍；
+    # 重试在调度线程内阻塞等待，默认不重试
+    NOTIFICATION_RETRIES = int(os.environ.get('NOTIFICATION_RETRIES') or 0)
+    NOTIFICATION_RETRY_BACKOFF = float(os.environ.get('NOTIFICATION_RETRY_BACKOFF') or 0.5)
     
     # 会话配置
     SESSION_COOKIE_HTTPONLY = True
@@ -38,6 +53,10 @@ class Config:
     # 时区配置
     TIMEZONE = os.environ.get('TIMEZONE') or 'Asia/Shanghai'
     
+    # 日历订阅配置（订阅内容包含的历史/未来天数）
+    ICS_PAST_DAYS = int(os.environ.get('ICS_PAST_DAYS') or 30)
+    ICS_FUTURE_DAYS = int(os.environ.get('ICS_FUTURE_DAYS') or 180)
+    
     # 应用配置
     APP_NAME = '钉钉打卡提醒系统'
     APP_VERSION = '1.0.0'
@@ -54,12 +73,15 @@ class DevelopmentConfig(Config):
     DEBUG = True
     TESTING = False
     SQLALCHEMY_ECHO = True
+    SQL_PROFILING = True
 
 class ProductionConfig(Config):
     """生产环境配置"""
     DEBUG = False
     TESTING = False
     SQLALCHEMY_ECHO = False
+    # 生产环境 /metrics 必须携带令牌或以管理员身份登录
+    METRICS_REQUIRE_AUTH = True
 
 class TestingConfig(Config):
     """测试环境配置"""
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+gunicorn 配置
+为 Prometheus 多进程模式准备指标目录，worker退出时清理其指标文件
+确保中文字符编码正确处理
+
+gunicorn 启动时自动加载当前目录下的本文件，命令行参数优先。
+"""
+
+import os
+import shutil
+import tempfile
+
+# 须在导入 prometheus_client 之前设置
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'prometheus_multiproc'))
+
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    """主进程启动时清空上次运行留下的指标文件"""
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """worker退出时清理其 live* 指标（并发请求数、连接池等）"""
+    multiprocess.mark_process_dead(worker.pid)
@@ -7,6 +7,7 @@
 
 import os
 import sys
+import click
 from app import create_app, db
 from app.models import User, ShiftType, SystemConfig
 from config import config
@@ -88,6 +89,69 @@ def test_notification():
     except Exception as e:
         print(f'测试通知发送失败: {str(e)}')
 
+@app.cli.command()
+@click.option('--users', default=1000, show_default=True, help='生成用户数')
+@click.option('--days', default=365, show_default=True, help='生成排班天数')
+@click.option('--start', default=None, help='排班开始日期 (YYYY-MM-DD)，默认使数据一半在过去一半在未来')
+@click.option('--logs', default=0, show_default=True, help='生成系统日志条数')
+@click.option('--prefix', default='user', show_default=True, help='用户名前缀')
+@click.option('--password', default='123456', show_default=True, help='生成用户的登录密码')
+@click.option('--seed', default=None, type=int, help='随机数种子，固定后生成结果可复现')
+def seed(users, days, start, logs, prefix, password, seed):
+    """批量生成压测数据（用户、班次、排班、考勤记录、系统日志）"""
+    from datetime import datetime
+    from app.utils.seeding import seed_dataset
+    
+    start_date = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+    report = seed_dataset(users, days, start_date, logs, prefix, password, seed, progress=print)
+    print(f"生成完成，耗时 {report['seconds']}s: 用户 {report['users']}，排班 {report['schedules']}，"
+          f"考勤记录 {report['attendance_records']}，系统日志 {report['logs']} "
+          f"({report['start_date']} ~ {report['end_date']})")
+
+@app.cli.command('simulate-scheduler')
+@click.option('--users', default=1000, show_default=True, help='模拟用户数')
+@click.option('--start', default=None, help='模拟开始时间 (YYYY-MM-DD HH:MM)，默认为今天 00:00')
+@click.option('--days', default=1, show_default=True, help='模拟天数')
+@click.option('--step', default=1, show_default=True, help='检查间隔(分钟)')
+@click.option('--database-uri', default='sqlite://', show_default=True, help='模拟使用的数据库，默认内存数据库')
+def simulate_scheduler(users, start, days, step, database_uri):
+    """用虚拟时钟模拟调度器运行并输出统计"""
+    from datetime import datetime
+    from app.utils.simulation import simulate, format_report
+    
+    if start:
+        start_time = datetime.strptime(start, '%Y-%m-%d %H:%M')
+    else:
+        start_time = datetime.combine(datetime.now().date(), datetime.min.time())
+    report = simulate(users, start_time, days, step, database_uri)
+    print(format_report(report))
+
+@app.cli.command('load-reminders')
+@click.option('--users', default=200, show_default=True, help='模拟用户数')
+@click.option('--start', default=None, help='开始时间 (YYYY-MM-DD HH:MM)，默认为今天 00:00')
+@click.option('--hours', default=24, show_default=True, help='运行的虚拟小时数')
+@click.option('--step', default=1, show_default=True, help='检查间隔(分钟)')
+@click.option('--latency', default=0.01, show_default=True, help='模拟接口平均延迟(秒)')
+@click.option('--jitter', default=0.005, show_default=True, help='模拟接口延迟标准差(秒)')
+@click.option('--error-rate', default=0.0, show_default=True, help='模拟接口返回500的比例')
+@click.option('--rate-limit', default=0, show_default=True, help='每个钉钉机器人每分钟允许的消息数，0 不限流')
+@click.option('--clocked-in-rate', default=0.0, show_default=True, help='打卡检测返回已打卡的比例')
+@click.option('--seed', default=None, type=int, help='随机数种子')
+@click.option('--database-uri', default='sqlite://', show_default=True, help='压测使用的数据库，默认内存数据库')
+def load_reminders(users, start, hours, step, latency, jitter, error_rate, rate_limit, clocked_in_rate, seed,
+                   database_uri):
+    """启动本地模拟钉钉/打卡检测接口，端到端压测提醒发送"""
+    from datetime import datetime
+    from app.utils.webhook_harness import run_harness, format_load_report
+    
+    if start:
+        start_time = datetime.strptime(start, '%Y-%m-%d %H:%M')
+    else:
+        start_time = datetime.combine(datetime.now().date(), datetime.min.time())
+    report = run_harness(users, start_time, hours, step, database_uri, latency=latency, jitter=jitter,
+                         error_rate=error_rate, rate_limit=rate_limit, clocked_in_rate=clocked_in_rate, seed=seed)
+    print(format_load_report(report))
+
 if __name__ == '__main__':
     # 启动应用
     app.run(
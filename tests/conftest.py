@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共夹具
+按规模生成一次种子SQLite数据库，每个用例复制一份独立使用；
+bench 夹具统计耗时和SQL数，并与 tests/baselines.json 中保存的基线比较
+（默认只检查SQL数；耗时与机器相关，需显式开启）；
+fresh_app 为只有默认数据的空数据库，供功能测试使用
+确保中文字符编码正确处理
+
+常用参数:
+    pytest --bench-scales small,medium     选择数据规模（默认 small）
+    pytest --bench-update                  用本次结果更新基线
+    pytest --bench-latency                 同时检查耗时（或设置 BENCH_LATENCY=1）
+    pytest --bench-threshold 0.5           耗时允许超出基线的比例
+"""
+
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import TestingConfig  # noqa: E402
+from app import create_app  # noqa: E402
+from app.models import db  # noqa: E402
+from app.utils.calendar import calendar_cache  # noqa: E402
+from app.utils.ics import ics_cache  # noqa: E402
+from app.utils.listing import schedule_count_cache  # noqa: E402
+from app.utils.lookups import lookup_cache  # noqa: E402
+from app.utils.seeding import seed_dataset  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+# 规模: (用户数, 排班天数, 系统日志条数)
+SCALES = {
+    'small': (100, 60, 5000),
+    'medium': (1000, 120, 50000),
+    'large': (5000, 365, 500000),
+}
+SEED_PASSWORD = '123456'
+ADMIN_PASSWORD = 'admin123'
+# 耗时很短的用例受抖动影响大，允许在比例之外再超出的固定毫秒数
+TIME_SLACK_MS = 5
+# 本次运行的结果 [(用例, 实测, 基线)]
+BENCH_RESULTS = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('bench', '性能基准')
+    group.addoption('--bench-scales', default=os.environ.get('BENCH_SCALES', 'small'),
+                    help='逗号分隔的数据规模: ' + ','.join(SCALES))
+    group.addoption('--bench-update', action='store_true', default=False,
+                    help='用本次结果覆盖基线，不做回归判断')
+    group.addoption('--bench-latency', action='store_true',
+                    default=os.environ.get('BENCH_LATENCY', '').lower() in ('1', 'true', 'yes'),
+                    help='同时检查耗时是否超出基线（基线与机器相关，默认只检查SQL数）')
+    group.addoption('--bench-threshold', type=float, default=float(os.environ.get('BENCH_THRESHOLD', 0.5)),
+                    help='耗时允许超出基线的比例（SQL数不允许增加）')
+
+
+def pytest_generate_tests(metafunc):
+    if 'scale' in metafunc.fixturenames:
+        scales = [name.strip() for name in metafunc.config.getoption('bench_scales').split(',') if name.strip()]
+        unknown = [name for name in scales if name not in SCALES]
+        if unknown:
+            raise pytest.UsageError(f'未知的数据规模: {", ".join(unknown)}')
+        metafunc.parametrize('scale', scales, scope='session')
+
+
+def make_config(database_uri):
+    """测试配置：独立数据库、关闭CSRF"""
+    return type('BenchConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_RECORD_QUERIES': False,
+        'SQLALCHEMY_ECHO': False
+    })
+
+
+def clear_process_caches():
+    """不同数据库的缓存版本号可能相同，切换数据库前清空进程内缓存"""
+    for cache in (calendar_cache, ics_cache, schedule_count_cache, lookup_cache):
+        cache.clear()
+
+
+@pytest.fixture(scope='session')
+def seeded_database(scale, tmp_path_factory):
+    """每种规模只生成一次的种子数据库文件"""
+    user_count, days, log_count = SCALES[scale]
+    path = tmp_path_factory.mktemp('seed') / f'{scale}.db'
+    clear_process_caches()
+    app = create_app(make_config(f'sqlite:///{path}'))
+    with app.app_context():
+        report = seed_dataset(user_count, days, log_count=log_count, password=SEED_PASSWORD, seed=0)
+        db.session.remove()
+        db.engine.dispose()
+    return path, report
+
+
+@pytest.fixture
+def app(seeded_database, tmp_path):
+    """基于种子数据库副本的应用，用例之间互不影响
+
+    不保持应用上下文：测试客户端的请求与 g 共用同一个上下文时，登录用户会在请求之间残留。
+    """
+    source, _ = seeded_database
+    path = tmp_path / 'app.db'
+    shutil.copyfile(source, path)
+    clear_process_caches()
+    app = create_app(make_config(f'sqlite:///{path}'))
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def fresh_app(tmp_path):
+    """只有默认管理员、班次和配置的空数据库应用"""
+    clear_process_caches()
+    app = create_app(make_config(f'sqlite:///{tmp_path / "fresh.db"}'))
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def fresh_client(fresh_app):
+    """已登录管理员的空数据库测试客户端"""
+    client = fresh_app.test_client()
+    response = client.post('/auth/login', data={'username': 'admin', 'password': ADMIN_PASSWORD})
+    assert response.status_code == 302, '管理员登录失败'
+    return client
+
+
+@pytest.fixture
+def dataset(seeded_database):
+    """种子数据的生成报告（用户数、日期范围等）"""
+    return seeded_database[1]
+
+
+@pytest.fixture
+def admin_client(app):
+    """已登录管理员的测试客户端"""
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': 'admin', 'password': ADMIN_PASSWORD})
+    assert response.status_code == 302, '管理员登录失败'
+    return client
+
+
+class QueryCounter:
+    """统计数据库引擎上执行的SQL语句数"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+def load_baselines():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baselines(baselines):
+    with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+class Bench:
+    """执行被测函数，记录最优耗时和SQL数，并与基线比较"""
+
+    def __init__(self, config, app, scale):
+        self.config = config
+        self.app = app
+        self.scale = scale
+
+    def __call__(self, name, func, repeat=5, setup=None):
+        """在独立的应用上下文中执行 repeat 次（每次前调用 setup），返回最后一次结果
+
+        耗时取最优值，SQL数取最后一次；SQL数增加时用例失败。
+        开启 --bench-latency 时，耗时超出基线 threshold 比例（至少 TIME_SLACK_MS）同样失败。
+        """
+        best = None
+        result = None
+        queries = 0
+        for _ in range(repeat):
+            with self.app.app_context():
+                if setup is not None:
+                    setup()
+                with QueryCounter(db.engine) as counter:
+                    started = time.perf_counter()
+                    result = func()
+                    elapsed = (time.perf_counter() - started) * 1000
+            queries = counter.count
+            best = elapsed if best is None else min(best, elapsed)
+
+        key = f'{self.scale}/{name}'
+        measured = {'ms': round(best, 2), 'queries': queries}
+        baseline = load_baselines().get(key)
+        BENCH_RESULTS.append((key, measured, baseline))
+        if self.config.getoption('bench_update') or baseline is None:
+            return result
+
+        assert queries <= baseline['queries'], \
+            f'{key}: SQL数 {queries} 超过基线 {baseline["queries"]}'
+        if not self.config.getoption('bench_latency'):
+            return result
+        threshold = self.config.getoption('bench_threshold')
+        limit_ms = max(baseline['ms'] * (1 + threshold), baseline['ms'] + TIME_SLACK_MS)
+        assert best <= limit_ms, \
+            f'{key}: 耗时 {best:.1f}ms 超过上限 {limit_ms:.1f}ms（基线 {baseline["ms"]:.1f}ms）'
+        return result
+
+
+@pytest.fixture
+def bench(request, app, scale):
+    return Bench(request.config, app, scale)
+
+
+@pytest.fixture
+def now_at():
+    """今天某个时刻"""
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    return lambda hours, minutes=0: today + timedelta(hours=hours, minutes=minutes)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if BENCH_RESULTS and session.config.getoption('bench_update'):
+        baselines = load_baselines()
+        baselines.update({key: measured for key, measured, _ in BENCH_RESULTS})
+        save_baselines(baselines)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not BENCH_RESULTS:
+        return
+    terminalreporter.section('性能基准')
+    terminalreporter.write_line(f'{"用例":<40}{"耗时(ms)":>12}{"基线(ms)":>12}{"SQL数":>8}{"基线SQL":>8}')
+    for key, measured, baseline in BENCH_RESULTS:
+        baseline = baseline or {}
+        terminalreporter.write_line(
+            f'{key:<40}{measured["ms"]:>12.1f}{baseline.get("ms", float("nan")):>12.1f}'
+            f'{measured["queries"]:>8}{baseline.get("queries", "-"):>8}'
+        )
+    if config.getoption('bench_update'):
+        terminalreporter.write_line(f'基线已更新: {BASELINE_PATH}')
+
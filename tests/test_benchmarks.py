@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+热点路径性能测试
+使用 Flask 测试客户端在进程内请求接口，统计耗时和SQL数并与基线比较
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime, timedelta
+
+from app.models import db, Schedule, SystemLog
+from app.utils.calendar import calendar_cache
+from app.utils.scheduler import scheduler
+from app.utils.simulation import VirtualClock, MockNotificationBackend
+from conftest import SEED_PASSWORD
+
+
+def month_range(day):
+    start = day.replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+
+def test_scheduler_idle_tick(app, bench, now_at, monkeypatch):
+    """没有到期提醒时的一次检查"""
+    clock = VirtualClock(now_at(0))
+    monkeypatch.setattr(scheduler, 'notification_factory', MockNotificationBackend(clock))
+    monkeypatch.setattr(scheduler, '_materialized_on', None)
+    with app.app_context():
+        scheduler._check_schedules(clock.now())
+    bench('scheduler_idle_tick', lambda: scheduler._check_schedules(now_at(3)))
+
+
+def test_scheduler_busy_tick(app, bench, now_at, monkeypatch):
+    """早班上班提醒集中到期的一次检查"""
+    clock = VirtualClock(now_at(6, 45))
+    backend = MockNotificationBackend(clock)
+    monkeypatch.setattr(scheduler, 'notification_factory', backend)
+    monkeypatch.setattr(scheduler, '_materialized_on', None)
+    with app.app_context():
+        scheduler._check_schedules(now_at(0))
+    bench('scheduler_busy_tick', lambda: scheduler._check_schedules(clock.now()), repeat=1)
+    assert backend.sent, '早班上班提醒未发送'
+
+
+def test_calendar_events_cold(app, admin_client, bench):
+    """本月日历事件（缓存未命中）"""
+    start, end = month_range(datetime.now().date())
+    url = f'/calendar-events?start={start}&end={end}'
+    response = bench('calendar_events_cold', lambda: admin_client.get(url), setup=calendar_cache.clear)
+    assert response.status_code == 200
+    assert response.get_json()
+
+
+def test_calendar_events_warm(app, admin_client, bench):
+    """本月日历事件（进程内缓存命中）"""
+    start, end = month_range(datetime.now().date())
+    url = f'/calendar-events?start={start}&end={end}'
+    admin_client.get(url)
+    response = bench('calendar_events_warm', lambda: admin_client.get(url))
+    assert response.status_code == 200
+
+
+def test_dashboard_stats(app, admin_client, bench):
+    """仪表板统计"""
+    response = bench('dashboard_stats', lambda: admin_client.get('/api/dashboard/stats'))
+    assert response.get_json()['success']
+
+
+def test_system_logs_deep_page(app, admin_client, bench):
+    """系统日志列表的深分页"""
+    per_page = 20
+    with app.app_context():
+        last_page = max(1, db.session.query(SystemLog.id).count() // per_page)
+    url = f'/logs/system/list?page={last_page}&per_page={per_page}'
+    response = bench('system_logs_deep_page', lambda: admin_client.get(url))
+    data = response.get_json()
+    assert data['success'] and data['data']['logs']
+
+
+def test_batch_create(app, admin_client, dataset, bench):
+    """为全部用户批量创建一个月的排班"""
+    start = datetime.strptime(dataset['end_date'], '%Y-%m-%d').date() + timedelta(days=1)
+    with app.app_context():
+        user_ids = [str(user_id) for user_id, in db.session.query(Schedule.user_id).distinct()]
+    form = {
+        'user_ids': user_ids,
+        'start_date': start.isoformat(),
+        'end_date': (start + timedelta(days=29)).isoformat(),
+        'shift_type_id': '1',
+        'skip_weekends': 'y'
+    }
+    response = bench('batch_create', lambda: admin_client.post('/schedule/batch-create', data=form), repeat=1)
+    assert response.status_code == 302
+    with app.app_context():
+        assert db.session.query(Schedule.id).filter(Schedule.work_date >= start).count() > 0
+
+
+def test_login(app, bench):
+    """登录（含密码哈希校验）"""
+    def login():
+        return app.test_client().post('/auth/login', data={'username': 'user00000', 'password': SEED_PASSWORD})
+
+    response = bench('login', login, repeat=3)
+    assert response.status_code == 302
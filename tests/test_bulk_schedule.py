@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量排班API的参数校验测试
+确保中文字符编码正确处理
+"""
+
+from datetime import date
+
+import pytest
+
+from app.models import Schedule, ShiftType, User
+from app.utils.importer import parse_date
+
+
+@pytest.mark.parametrize('value', ['2030-01-07', '2030/01/07', '20300107', date(2030, 1, 7)])
+def test_parse_date_formats(value):
+    assert parse_date(value) == date(2030, 1, 7)
+
+
+def test_parse_date_rejects_invalid():
+    with pytest.raises(ValueError):
+        parse_date('07.01.2030')
+
+
+def bulk_create(client, items):
+    return client.post('/api/schedules/bulk', json={'items': items, 'atomic': False}).get_json()['data']
+
+
+def test_bulk_create_rejects_boolean_ids(fresh_app, fresh_client):
+    with fresh_app.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+        shift_id = ShiftType.query.filter_by(name='A班').one().id
+    report = bulk_create(fresh_client, [
+        {'user_id': True, 'work_date': '2030-01-07', 'shift_type_id': shift_id},
+        {'user_id': admin_id, 'work_date': '2030-01-08', 'shift_type_id': True},
+        {'user_id': admin_id, 'work_date': '2030-01-09', 'shift_type_id': shift_id, 'is_rest_day': 'false'},
+        {'user_id': admin_id, 'work_date': '2030/01/10', 'shift_type_id': shift_id},
+    ])
+    assert [item['success'] for item in report['results']] == [False, False, False, True]
+    assert report['results'][0]['message'] == '用户不存在或已禁用: True'
+    assert report['results'][1]['message'] == '班次不存在或已停用: True'
+    with fresh_app.app_context():
+        assert [s.work_date for s in Schedule.query.all()] == [date(2030, 1, 10)]
+
+
+def test_bulk_atomic_string_false_writes_valid_items(fresh_app, fresh_client):
+    with fresh_app.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+        shift_id = ShiftType.query.filter_by(name='A班').one().id
+    response = fresh_client.post('/api/schedules/bulk', json={'atomic': 'false', 'items': [
+        {'user_id': admin_id, 'work_date': '2030-01-07', 'shift_type_id': shift_id},
+        {'user_id': 9999, 'work_date': '2030-01-08', 'shift_type_id': shift_id},
+    ]}).get_json()
+    assert [item['success'] for item in response['data']['results']] == [True, False]
+    with fresh_app.app_context():
+        assert [s.work_date for s in Schedule.query.all()] == [date(2030, 1, 7)]
+
+    response = fresh_client.post('/api/schedules/bulk', json={'atomic': 'no', 'items': []}).get_json()
+    assert response == {'success': False, 'message': 'atomic 必须为 true 或 false'}
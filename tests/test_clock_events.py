@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打卡事件 webhook 测试：签名校验、部分无效事件和待发送提醒的取消
+确保中文字符编码正确处理
+"""
+
+import json
+import time
+from datetime import datetime
+
+import pytest
+
+from app.models import db, AttendanceRecord, ReminderJob, Schedule, ShiftType, SystemConfig, User
+from app.utils.clock_events import MAX_CLOCK_SKEW, WebhookSignatureError, sign_payload, verify_signature
+from app.utils.reminder_jobs import CANCELLED, PENDING
+
+SECRET = 'test-secret'
+BODY = b'[{"username": "alice", "type": "clock_in"}]'
+NOW = 1800000000
+
+
+def test_verify_signature_accepts_valid_signature():
+    signature = sign_payload(SECRET, str(NOW), BODY)
+    verify_signature(BODY, str(NOW), signature, secret=SECRET, now=NOW)
+    verify_signature(BODY, str(NOW), f'sha256={signature}', secret=SECRET, now=NOW + MAX_CLOCK_SKEW)
+
+
+@pytest.mark.parametrize('timestamp, signature, secret, message', [
+    (str(NOW), sign_payload('other-secret', str(NOW), BODY), SECRET, '签名错误'),
+    (str(NOW), sign_payload(SECRET, str(NOW), BODY + b' '), SECRET, '签名错误'),
+    (str(NOW - MAX_CLOCK_SKEW - 1), sign_payload(SECRET, str(NOW - MAX_CLOCK_SKEW - 1), BODY), SECRET, '请求已过期'),
+    ('abc', 'deadbeef', SECRET, '时间戳格式无效'),
+    (str(NOW), '', SECRET, '缺少签名请求头'),
+    (str(NOW), sign_payload('', str(NOW), BODY), '', '未配置 webhook 签名密钥'),
+])
+def test_verify_signature_rejects(timestamp, signature, secret, message):
+    with pytest.raises(WebhookSignatureError, match=message):
+        verify_signature(BODY, timestamp, signature, secret=secret, now=NOW)
+
+
+def set_secret(app, secret):
+    with app.app_context():
+        SystemConfig.query.filter_by(key='webhook_secret').one().value = secret
+        db.session.commit()
+
+
+def post_events(client, events, secret=SECRET, timestamp=None):
+    body = json.dumps(events).encode('utf-8')
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    return client.post('/api/attendance/events', data=body, content_type='application/json', headers={
+        'X-Timestamp': timestamp,
+        'X-Signature': sign_payload(secret, timestamp, body)
+    })
+
+
+def test_endpoint_requires_configured_secret(fresh_app):
+    client = fresh_app.test_client()
+    response = post_events(client, [], secret='')
+    assert response.status_code == 401
+    assert response.get_json()['message'] == '未配置 webhook 签名密钥'
+
+
+def test_endpoint_rejects_bad_and_stale_signatures(fresh_app):
+    set_secret(fresh_app, SECRET)
+    client = fresh_app.test_client()
+    assert post_events(client, [], secret='wrong').status_code == 401
+    assert post_events(client, [], timestamp=int(time.time()) - MAX_CLOCK_SKEW - 60).status_code == 401
+    assert post_events(client, []).status_code == 200
+
+
+def test_partial_batch_cancels_pending_reminders(fresh_app):
+    set_secret(fresh_app, SECRET)
+    today = datetime.now().date()
+    with fresh_app.app_context():
+        user = User(username='alice', is_active=True)
+        user.set_password('123456')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        db.session.add(Schedule(user_id=user_id, work_date=today,
+                                shift_type_id=ShiftType.query.filter_by(name='A班').one().id))
+        db.session.commit()
+        assert ReminderJob.query.filter_by(user_id=user_id, state=PENDING).count() == 2
+
+    response = post_events(fresh_app.test_client(), {'events': [
+        {'username': 'alice', 'type': 'clock_in', 'time': f'{today} 08:55:00'},
+        {'username': 'nobody', 'type': 'clock_in', 'time': f'{today} 08:56:00'},
+        {'user_id': True, 'type': 'clock_in', 'time': f'{today} 08:57:00'},
+        {'username': 'alice', 'type': 'lunch', 'time': f'{today} 12:00:00'},
+    ]})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['success'] is False
+    report = result['data']
+    assert (report['received'], report['accepted'], report['rejected']) == (4, 1, 3)
+    assert report['cancelled_reminders'] == 1
+    assert [error['index'] for error in report['errors']] == [1, 2, 3]
+
+    with fresh_app.app_context():
+        record = AttendanceRecord.query.filter_by(user_id=user_id, work_date=today).one()
+        assert (record.clock_in_status, record.clock_out_status) == ('已打卡', '未打卡')
+        states = {job.kind: job.state for job in ReminderJob.query.filter_by(user_id=user_id)}
+        assert states == {'check_in': CANCELLED, 'check_out': PENDING}
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+iCalendar订阅的缓存校验测试
+确保中文字符编码正确处理
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import update
+
+from app.models import db, CacheVersion, Schedule, ShiftType, User
+from app.utils.cache import bump_versions
+from app.utils.ics import ICS_NAMESPACE, ics_cache, get_or_create_feed, user_version_name
+
+
+def set_version_time(name, updated_at):
+    bump_versions([name])
+    table = CacheVersion.__table__
+    db.session.execute(update(table).where(table.c.name == name).values(updated_at=updated_at))
+    db.session.commit()
+
+
+def test_last_modified_compares_in_utc(fresh_app):
+    """本地零点之后的修改（UTC仍为前一天）应作为最后修改时间"""
+    fresh_app.config['TIMEZONE'] = 'Asia/Shanghai'
+    with fresh_app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        # 2026-10-20 01:00 (+08:00)
+        changed_at = datetime(2026, 10, 19, 17, 0)
+        set_version_time(ICS_NAMESPACE, changed_at - timedelta(days=1))
+        set_version_time(user_version_name(admin.id), changed_at)
+
+        _, last_modified, _ = ics_cache.get_state(admin.id, date(2026, 10, 20))
+        assert last_modified == changed_at.replace(tzinfo=timezone.utc)
+
+
+def test_last_modified_not_before_local_midnight(fresh_app):
+    fresh_app.config['TIMEZONE'] = 'Asia/Shanghai'
+    with fresh_app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        set_version_time(ICS_NAMESPACE, datetime(2026, 10, 1))
+        set_version_time(user_version_name(admin.id), datetime(2026, 10, 1))
+
+        _, last_modified, _ = ics_cache.get_state(admin.id, date(2026, 10, 20))
+        assert last_modified == datetime(2026, 10, 19, 16, 0, tzinfo=timezone.utc)
+
+
+def test_feed_revalidates_after_schedule_change(fresh_app):
+    with fresh_app.app_context():
+        admin = User.query.filter_by(username='admin').one()
+        admin_id = admin.id
+        token = get_or_create_feed(admin).token
+        shift_id = ShiftType.query.filter_by(name='A班').one().id
+    client = fresh_app.test_client()
+    url = f'/calendar/feed/{token}.ics'
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+    assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    with fresh_app.app_context():
+        db.session.add(Schedule(user_id=admin_id, shift_type_id=shift_id, work_date=datetime.now().date()))
+        db.session.commit()
+    second = client.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert 'A班' in second.get_data(as_text=True)
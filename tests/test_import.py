@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+排班导入测试
+确保中文字符编码正确处理
+"""
+
+import io
+
+from datetime import date
+
+from app.models import Schedule, SystemLog, User
+
+
+def upload(client, text, filename='schedule.csv', **headers):
+    data = {'file': (io.BytesIO(text.encode('utf-8')), filename)}
+    return client.post('/schedule/import', data=data, content_type='multipart/form-data', headers=headers)
+
+
+def test_import_page_renders(fresh_client):
+    response = fresh_client.get('/schedule/import')
+    assert response.status_code == 200
+    assert '导入排班' in response.get_data(as_text=True)
+
+
+def test_import_form_shows_row_errors(fresh_app, fresh_client):
+    text = '用户名,日期,班次\nadmin,2030-01-07,A班\nnobody,2030-01-08,A班\nadmin,2030-13-01,A班\n'
+    response = upload(fresh_client, text)
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert '导入完成' in body
+    assert '用户不存在或已禁用: nobody' in body
+    with fresh_app.app_context():
+        admin_id = User.query.filter_by(username='admin').one().id
+        assert Schedule.query.filter_by(user_id=admin_id).count() == 1
+        assert SystemLog.query.filter_by(log_type='import_schedule_error').count() == 0
+
+
+def test_import_json_report(fresh_app, fresh_client):
+    text = '用户名,日期,班次\nadmin,2030-01-07,A班\nadmin,2030-01-07,B班\nadmin,2030-01-08,A班\n'
+    response = upload(fresh_client, text, **{'X-Requested-With': 'XMLHttpRequest'})
+    report = response.get_json()['data']
+    assert (report['total'], report['inserted'], report['updated']) == (3, 2, 0)
+    assert (report['duplicates'], report['error_count']) == (1, 0)
+    # 同一用户同一天以最后一行为准
+    with fresh_app.app_context():
+        assert Schedule.query.filter_by(work_date=date(2030, 1, 7)).one().shift_type.name == 'B班'
+
+
+def test_import_rejects_bad_header(fresh_client):
+    response = upload(fresh_client, '姓名,日期\nadmin,2030-01-07\n', **{'X-Requested-With': 'XMLHttpRequest'})
+    assert response.get_json() == {'success': False, 'message': '表头缺少必需列：用户名、日期、班次'}
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入后缓存失效和派生数据刷新测试
+确保中文字符编码正确处理
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event
+
+from app.models import db, Schedule, ShiftType, User, ShiftCoverage, ReminderJob
+from app.utils.cache import get_versions
+from app.utils.calendar import month_version_name
+from app.utils.ics import user_version_name
+from app.utils.listing import SCHEDULES_VERSION
+
+FUTURE = date(2030, 1, 7)
+
+
+def add_user(username):
+    user = User(username=username, is_active=True)
+    user.set_password('123456')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def shift_named(name):
+    return ShiftType.query.filter_by(name=name).one()
+
+
+class StatementLog:
+    """记录执行的SQL语句"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(db.engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(db.engine, 'before_cursor_execute', self)
+
+    def count(self, prefix):
+        return sum(1 for statement in self.statements if statement.lstrip().upper().startswith(prefix))
+
+
+def test_insert_bumps_all_versions_in_one_update(fresh_app):
+    with fresh_app.app_context():
+        user = add_user('alice')
+        names = [month_version_name(FUTURE), user_version_name(user.id), SCHEDULES_VERSION]
+        before = get_versions(names)
+        with StatementLog() as log:
+            db.session.add(Schedule(user_id=user.id, shift_type_id=shift_named('A班').id, work_date=FUTURE))
+            db.session.commit()
+        after = get_versions(names)
+        assert all(after[name] == before[name] + 1 for name in names)
+        assert log.count('UPDATE CACHE_VERSIONS') == 1
+        assert ShiftCoverage.query.filter_by(work_date=FUTURE).one().headcount == 1
+
+
+def test_moving_schedule_invalidates_old_and_new_keys(fresh_app):
+    with fresh_app.app_context():
+        alice, bob = add_user('alice'), add_user('bob')
+        later = FUTURE + timedelta(days=40)
+        schedule = Schedule(user_id=alice.id, shift_type_id=shift_named('A班').id, work_date=FUTURE)
+        db.session.add(schedule)
+        db.session.commit()
+        names = [month_version_name(FUTURE), month_version_name(later),
+                 user_version_name(alice.id), user_version_name(bob.id), SCHEDULES_VERSION]
+        before = get_versions(names)
+
+        schedule.user_id = bob.id
+        schedule.work_date = later
+        db.session.commit()
+        after = get_versions(names)
+        assert all(after[name] > before[name] for name in names)
+        assert ShiftCoverage.query.filter_by(work_date=FUTURE).count() == 0
+        assert ShiftCoverage.query.filter_by(work_date=later).one().headcount == 1
+
+
+def test_note_change_keeps_count_version(fresh_app):
+    with fresh_app.app_context():
+        user = add_user('alice')
+        schedule = Schedule(user_id=user.id, shift_type_id=shift_named('A班').id, work_date=FUTURE)
+        db.session.add(schedule)
+        db.session.commit()
+        names = [month_version_name(FUTURE), SCHEDULES_VERSION]
+        before = get_versions(names)
+
+        schedule.note = '调休'
+        db.session.commit()
+        after = get_versions(names)
+        assert after[month_version_name(FUTURE)] == before[month_version_name(FUTURE)] + 1
+        assert after[SCHEDULES_VERSION] == before[SCHEDULES_VERSION]
+
+
+def test_shift_change_refreshes_windows_before_jobs(fresh_app):
+    """修改班次时间后，同一次 flush 内同步的提醒任务使用新的提醒窗口"""
+    with fresh_app.app_context():
+        user = add_user('alice')
+        today = datetime.now().date()
+        shift = shift_named('A班')
+        db.session.add(Schedule(user_id=user.id, shift_type_id=shift.id, work_date=today))
+        db.session.commit()
+        job = ReminderJob.query.filter_by(user_id=user.id, work_date=today, kind='check_in').one()
+        assert job.due_at == datetime.combine(today, datetime.min.time()) + timedelta(hours=8, minutes=45)
+
+        shift.start_time = '10:00'
+        db.session.commit()
+        job = ReminderJob.query.filter_by(user_id=user.id, work_date=today, kind='check_in').one()
+        assert job.due_at == datetime.combine(today, datetime.min.time()) + timedelta(hours=9, minutes=45)
+
+
+def test_deactivating_user_cancels_pending_jobs(fresh_app):
+    with fresh_app.app_context():
+        user = add_user('alice')
+        today = datetime.now().date()
+        db.session.add(Schedule(user_id=user.id, shift_type_id=shift_named('A班').id, work_date=today))
+        db.session.commit()
+        assert ReminderJob.query.filter_by(user_id=user.id).count() == 2
+
+        user.is_active = False
+        db.session.commit()
+        assert ReminderJob.query.filter_by(user_id=user.id).count() == 0
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+/metrics 访问控制和SQL计时状态清理测试
+确保中文字符编码正确处理
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.models import db
+from conftest import ADMIN_PASSWORD
+
+
+def login_admin(client):
+    response = client.post('/auth/login', data={'username': 'admin', 'password': ADMIN_PASSWORD})
+    assert response.status_code == 302
+
+
+def test_metrics_public_without_token_outside_production(fresh_app):
+    response = fresh_app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert b'http_requests_total' in response.data
+
+
+def test_metrics_requires_auth_in_production(fresh_app):
+    fresh_app.config['METRICS_REQUIRE_AUTH'] = True
+    client = fresh_app.test_client()
+    assert client.get('/metrics').status_code == 401
+    login_admin(client)
+    assert client.get('/metrics').status_code == 200
+
+
+def test_metrics_token(fresh_app):
+    fresh_app.config['METRICS_TOKEN'] = 'scrape-token'
+    client = fresh_app.test_client()
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'}).status_code == 200
+
+
+def test_failed_statements_leave_no_timing_state(fresh_app):
+    fresh_app.config['SQL_PROFILING'] = True
+    with fresh_app.test_request_context():
+        fresh_app.preprocess_request()
+        connection = db.session.connection()
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text('SELECT * FROM missing_table'))
+            db.session.rollback()
+            connection = db.session.connection()
+        assert not connection.info.get('_metrics_started')
+        assert not connection.info.get('_sql_profile_started')
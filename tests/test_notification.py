@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通知发送重试测试：默认不重试，按配置重试钉钉Webhook，打卡检测从不重试
+确保中文字符编码正确处理
+"""
+
+import pytest
+
+from app.models import db, User
+from app.utils.notification import NotificationService
+from app.utils.webhook_harness import MockWebhookServer, configure_endpoints
+
+
+def send_failing_reminder(app):
+    """模拟服务器所有请求返回500，发送一条上班提醒，返回服务器记录的请求"""
+    with app.app_context(), MockWebhookServer(latency=0, jitter=0, error_rate=1.0) as server:
+        configure_endpoints(server)
+        user = User(username='alice', is_active=True)
+        user.set_password('123456')
+        db.session.add(user)
+        db.session.commit()
+        NotificationService().send_notification(user, '【上班提醒】alice，您好！', 'check_in')
+        return server.checks['total'], [result for _, _, _, result in server.attempts]
+
+
+def test_no_retries_by_default(fresh_app, monkeypatch):
+    monkeypatch.setattr('app.utils.notification.time.sleep',
+                        lambda seconds: pytest.fail(f'默认配置下不应等待重试: {seconds}s'))
+    assert send_failing_reminder(fresh_app) == (1, ['error'])
+
+
+def test_configured_retries_only_cover_dingtalk(fresh_app, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('app.utils.notification.time.sleep', sleeps.append)
+    fresh_app.config.update(NOTIFICATION_RETRIES=2, NOTIFICATION_RETRY_BACKOFF=0.25)
+    assert send_failing_reminder(fresh_app) == (1, ['error', 'error', 'error'])
+    assert sleeps == [0.25, 0.5]
+
+
+def test_each_service_has_its_own_session(fresh_app):
+    with fresh_app.app_context():
+        assert NotificationService().http is not NotificationService().http
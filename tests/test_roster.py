@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量排班写入、导入和去重迁移测试
+确保中文字符编码正确处理
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from app.models import db, AttendanceRecord, Schedule, ShiftType, User
+from app.utils.importer import ScheduleImporter
+from app.utils.roster import batch_create_schedules, bulk_insert_schedules, upsert_schedules
+from app.utils.schema import ensure_schema
+
+MONDAY = date(2030, 1, 7)
+
+
+def add_user(username):
+    user = User(username=username, is_active=True)
+    user.set_password('123456')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def shift_id(name):
+    return ShiftType.query.filter_by(name=name).one().id
+
+
+def schedule_row(user_id, work_date, shift_type_id, note=None):
+    now = datetime.utcnow()
+    return {'user_id': user_id, 'work_date': work_date, 'shift_type_id': shift_type_id,
+            'is_rest_day': False, 'note': note, 'created_at': now, 'updated_at': now}
+
+
+def test_bulk_insert_counts_only_new_rows(fresh_app):
+    with fresh_app.app_context():
+        user_id = add_user('alice')
+        a_shift = shift_id('A班')
+        db.session.add(Schedule(user_id=user_id, shift_type_id=a_shift, work_date=MONDAY))
+        db.session.commit()
+
+        rows = [schedule_row(user_id, MONDAY + timedelta(days=offset), a_shift) for offset in range(3)]
+        assert bulk_insert_schedules(rows) == 2
+        db.session.commit()
+        assert bulk_insert_schedules(rows) == 0
+        assert Schedule.query.filter_by(user_id=user_id).count() == 3
+
+
+def test_batch_create_reports_written_rows(fresh_app):
+    with fresh_app.app_context():
+        user_id = add_user('alice')
+        db.session.add(Schedule(user_id=user_id, shift_type_id=shift_id('B班'), work_date=MONDAY))
+        db.session.commit()
+
+        # 周一到周日，跳过周末，周一已有排班
+        created = batch_create_schedules([user_id], MONDAY, MONDAY + timedelta(days=6), shift_id('A班'))
+        db.session.commit()
+        assert created == 4
+        assert Schedule.query.filter_by(user_id=user_id, work_date=MONDAY).one().shift_type.name == 'B班'
+
+
+def test_upsert_updates_existing_rows(fresh_app):
+    with fresh_app.app_context():
+        user_id = add_user('alice')
+        db.session.add(Schedule(user_id=user_id, shift_type_id=shift_id('A班'), work_date=MONDAY))
+        db.session.commit()
+
+        upsert_schedules([schedule_row(user_id, MONDAY, shift_id('B班'), '调班'),
+                          schedule_row(user_id, MONDAY + timedelta(days=1), shift_id('B班'))])
+        db.session.commit()
+        schedules = Schedule.query.filter_by(user_id=user_id).order_by(Schedule.work_date).all()
+        assert [(s.shift_type.name, s.note) for s in schedules] == [('B班', '调班'), ('B班', None)]
+
+
+def test_importer_counts_inserted_and_updated(fresh_app):
+    header = ['用户名', '日期', '班次', '备注']
+    with fresh_app.app_context():
+        add_user('alice')
+        first = ScheduleImporter(chunk_size=2).run([
+            header,
+            ['alice', '2030-01-07', 'A班', ''],
+            ['alice', '2030/01/08', 'A班', ''],
+            ['alice', '20300109', '休', '年假'],
+        ])
+        assert (first['total'], first['inserted'], first['updated'], first['error_count']) == (3, 3, 0, 0)
+
+        second = ScheduleImporter().run([
+            header,
+            ['alice', '2030-01-07', 'B班', ''],
+            ['alice', '2030-01-10', 'A班', ''],
+            ['alice', '2030-01-11', '不存在的班次', ''],
+        ])
+        assert (second['inserted'], second['updated'], second['error_count']) == (1, 1, 1)
+        assert second['errors'][0]['row'] == 4
+
+        rest = Schedule.query.filter_by(work_date=date(2030, 1, 9)).one()
+        assert rest.is_rest_day and rest.shift_type_id is None and rest.note == '年假'
+        assert Schedule.query.filter_by(work_date=MONDAY).one().shift_type.name == 'B班'
+
+
+def test_ensure_schema_dedupes_before_unique_indexes(fresh_app):
+    """旧库没有唯一索引时，先去重再建索引"""
+    with fresh_app.app_context():
+        user_id = add_user('alice')
+        a_shift, b_shift = shift_id('A班'), shift_id('B班')
+        db.session.execute(text('DROP INDEX uq_schedules_user_date'))
+        db.session.execute(text('DROP INDEX uq_attendance_user_date'))
+        db.session.commit()
+
+        old, new = datetime(2030, 1, 1), datetime(2030, 1, 2)
+        db.session.add_all([
+            Schedule(user_id=user_id, shift_type_id=a_shift, work_date=MONDAY, created_at=old, updated_at=old),
+            Schedule(user_id=user_id, shift_type_id=b_shift, work_date=MONDAY, created_at=new, updated_at=new),
+            AttendanceRecord(user_id=user_id, work_date=MONDAY, shift_type_id=a_shift, clock_in_status='已打卡',
+                             clock_out_reminded=True, created_at=old, updated_at=old),
+            AttendanceRecord(user_id=user_id, work_date=MONDAY, shift_type_id=None, created_at=new, updated_at=new),
+        ])
+        db.session.commit()
+
+        created = ensure_schema()
+        assert {'uq_schedules_user_date', 'uq_attendance_user_date'} <= set(created)
+        assert Schedule.query.filter_by(user_id=user_id).one().shift_type_id == b_shift
+        record = AttendanceRecord.query.filter_by(user_id=user_id).one()
+        assert record.clock_in_status == '已打卡'
+        assert record.clock_out_reminded
+        assert record.shift_type_id == a_shift
+        # 索引已补齐，重复运行不再处理
+        assert bulk_insert_schedules([schedule_row(user_id, MONDAY, a_shift)]) == 0
+        assert ensure_schema() == []
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轮班、自动排班和复制排班接口测试
+确保中文字符编码正确处理
+"""
+
+from datetime import date, timedelta
+
+from app.models import db, Schedule, ShiftType, User
+
+START = date(2030, 1, 7)
+
+
+def add_users(app, *usernames, active=True):
+    """创建用户，返回ID列表"""
+    with app.app_context():
+        users = []
+        for username in usernames:
+            user = User(username=username, is_active=active)
+            user.set_password('123456')
+            users.append(user)
+        db.session.add_all(users)
+        db.session.commit()
+        return [user.id for user in users]
+
+
+def schedule_count(app, user_ids):
+    with app.app_context():
+        return Schedule.query.filter(Schedule.user_id.in_(user_ids)).count()
+
+
+def rotation(client, user_ids, **options):
+    body = dict({'pattern': ['A班', 'B班', '休'], 'user_ids': user_ids,
+                 'start_date': '2030-01-07', 'end_date': '2030-01-13'}, **options)
+    return client.post('/schedule/rotation', json=body).get_json()
+
+
+def test_rotation_dry_run_string_false_writes(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, 'alice', 'bob')
+    preview = rotation(fresh_client, user_ids, dry_run='true')
+    assert preview['success'] and preview['data']['dry_run']
+    assert schedule_count(fresh_app, user_ids) == 0
+
+    result = rotation(fresh_client, user_ids, dry_run='false')
+    assert result['success']
+    assert result['data']['written'] == 14
+    assert schedule_count(fresh_app, user_ids) == 14
+
+
+def test_rotation_rejects_non_boolean_flag(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, 'alice')
+    assert rotation(fresh_client, user_ids, dry_run='no') == {'success': False, 'message': '参数格式错误'}
+    assert rotation(fresh_client, user_ids, dry_run=0) == {'success': False, 'message': '参数格式错误'}
+    assert schedule_count(fresh_app, user_ids) == 0
+
+
+def test_rotation_rejects_unknown_and_inactive_users(fresh_app, fresh_client):
+    active = add_users(fresh_app, 'alice')
+    inactive = add_users(fresh_app, 'bob', active=False)
+    result = rotation(fresh_client, active + inactive + [9999], dry_run=False)
+    assert result == {'success': False, 'message': f'用户不存在或已停用: {inactive[0]}, 9999'}
+    assert schedule_count(fresh_app, active) == 0
+
+
+def test_rotation_rejects_boolean_pattern_items(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, 'alice')
+    a_shift = shift_ids(fresh_app)['A班']
+    assert rotation(fresh_client, user_ids, pattern=[a_shift, True], dry_run=False) == {
+        'success': False, 'message': '班次不存在或已停用: True'}
+    assert rotation(fresh_client, user_ids, pattern=[a_shift, False], dry_run=False) == {
+        'success': False, 'message': '班次不存在或已停用: False'}
+    assert schedule_count(fresh_app, user_ids) == 0
+
+
+def test_rotation_caps_date_range(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, 'alice')
+    result = rotation(fresh_client, user_ids, end_date='2031-01-08')
+    assert result == {'success': False, 'message': '日期范围不能超过一年'}
+
+
+def shift_ids(app):
+    with app.app_context():
+        return {shift.name: shift.id for shift in ShiftType.query.all()}
+
+
+def auto_roster(client, user_ids, **options):
+    body = dict({'user_ids': user_ids, 'start_date': '2030-01-07', 'end_date': '2030-01-20',
+                 'time_budget': 0.2, 'seed': 1}, **options)
+    return client.post('/schedule/auto-roster', json=body).get_json()
+
+
+def test_auto_roster_meets_constraints(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, *[f'user{i}' for i in range(6)])
+    shifts = shift_ids(fresh_app)
+    with fresh_app.app_context():
+        # 已有排班保持不变
+        db.session.add(Schedule(user_id=user_ids[0], work_date=START, shift_type_id=shifts['B班']))
+        db.session.commit()
+
+    result = auto_roster(fresh_client, user_ids, dry_run=False, max_consecutive=3, min_rest_hours=12,
+                         demand={str(shifts['A班']): 2, str(shifts['B班']): 1},
+                         leave=[{'user_id': user_ids[1], 'date': '2030-01-08'}])
+    assert result['success'], result
+    assert result['data']['shortage'] == 0
+    assert result['data']['written'] == 6 * 14 - 1
+
+    with fresh_app.app_context():
+        schedules = Schedule.query.filter(Schedule.user_id.in_(user_ids)).all()
+        assert len(schedules) == 6 * 14
+        grid = {(s.user_id, s.work_date): s for s in schedules}
+        for offset in range(14):
+            day = START + timedelta(days=offset)
+            on_day = [grid[(user_id, day)].shift_type_id for user_id in user_ids]
+            assert on_day.count(shifts['A班']) >= 2 and on_day.count(shifts['B班']) >= 1
+        for user_id in user_ids:
+            row = [grid[(user_id, START + timedelta(days=offset))] for offset in range(14)]
+            run = 0
+            for previous, current in zip([None] + row, row):
+                run = 0 if current.is_rest_day else run + 1
+                assert run <= 3
+                # B班 22:00 下班到 A班 09:00 上班只有11小时
+                assert not (previous and previous.shift_type_id == shifts['B班']
+                            and current.shift_type_id == shifts['A班'])
+        assert grid[(user_ids[0], START)].shift_type_id == shifts['B班']
+        leave = grid[(user_ids[1], date(2030, 1, 8))]
+        assert leave.is_rest_day and leave.note == '请假'
+
+
+def test_auto_roster_dry_run_does_not_write(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, 'alice', 'bob')
+    result = auto_roster(fresh_client, user_ids, demand={str(shift_ids(fresh_app)['A班']): 1})
+    assert result['success'] and result['data']['dry_run']
+    assert result['data']['rows'] == 28
+    assert schedule_count(fresh_app, user_ids) == 0
+
+
+def test_auto_roster_rejects_unknown_and_inactive_users(fresh_app, fresh_client):
+    active = add_users(fresh_app, 'alice')
+    inactive = add_users(fresh_app, 'bob', active=False)
+    result = auto_roster(fresh_client, active + inactive + [9999], dry_run=False,
+                         demand={str(shift_ids(fresh_app)['A班']): 1})
+    assert result == {'success': False, 'message': f'用户不存在或已停用: {inactive[0]}, 9999'}
+    assert schedule_count(fresh_app, active) == 0
+
+
+def clone(client, **options):
+    body = dict({'source_start': '2030-01-07', 'source_end': '2030-01-08', 'target_start': '2030-01-14'}, **options)
+    return client.post('/schedule/clone', json=body).get_json()
+
+
+def seed_clone_source(app, user_ids):
+    """源周：第一天A班、第二天休息；目标周第一天已有B班"""
+    shifts = shift_ids(app)
+    with app.app_context():
+        for user_id in user_ids:
+            db.session.add_all([
+                Schedule(user_id=user_id, work_date=START, shift_type_id=shifts['A班']),
+                Schedule(user_id=user_id, work_date=START + timedelta(days=1), is_rest_day=True),
+                Schedule(user_id=user_id, work_date=START + timedelta(days=7), shift_type_id=shifts['B班']),
+            ])
+        db.session.commit()
+    return shifts
+
+
+def target_shifts(app, user_id):
+    with app.app_context():
+        return [(s.shift_type.name if s.shift_type else None, s.is_rest_day) for s in Schedule.query.filter(
+            Schedule.user_id == user_id, Schedule.work_date >= START + timedelta(days=7)
+        ).order_by(Schedule.work_date)]
+
+
+def test_clone_skip_keeps_existing(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, 'alice')
+    seed_clone_source(fresh_app, user_ids)
+
+    preview = clone(fresh_client, user_ids=user_ids)['data']
+    assert (preview['new'], preview['conflicts'], preview['will_write']) == (1, 1, 1)
+    assert [item['action'] for item in preview['preview']] == ['skip', 'insert']
+    assert target_shifts(fresh_app, user_ids[0]) == [('B班', False)]
+
+    result = clone(fresh_client, user_ids=user_ids, dry_run=False)
+    assert result['success']
+    assert target_shifts(fresh_app, user_ids[0]) == [('B班', False), (None, True)]
+
+
+def test_clone_overwrite_replaces_conflicts(fresh_app, fresh_client):
+    user_ids = add_users(fresh_app, 'alice', 'bob')
+    seed_clone_source(fresh_app, user_ids)
+
+    result = clone(fresh_client, user_ids=user_ids[:1], conflict='overwrite', include_rest='false', dry_run=False)
+    assert result['success']
+    assert result['data']['will_write'] == 1
+    assert target_shifts(fresh_app, user_ids[0]) == [('A班', False)]
+    # 未选择的用户不受影响
+    assert target_shifts(fresh_app, user_ids[1]) == [('B班', False)]
+
+
+def test_clone_rejects_unknown_and_inactive_users(fresh_app, fresh_client):
+    active = add_users(fresh_app, 'alice')
+    inactive = add_users(fresh_app, 'bob', active=False)
+    seed_clone_source(fresh_app, active)
+    result = clone(fresh_client, user_ids=active + inactive + [9999], dry_run=False)
+    assert result == {'success': False, 'message': f'用户不存在或已停用: {inactive[0]}, 9999'}
+    assert target_shifts(fresh_app, active[0]) == [('B班', False)]
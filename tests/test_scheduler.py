@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调度器提醒发送测试
+确保中文字符编码正确处理
+"""
+
+from sqlalchemy import select, text
+
+from app.models import db, AttendanceRecord, ReminderJob, Schedule, ShiftType, User
+from app.utils.reminder_jobs import SENT
+from app.utils.scheduler import scheduler
+
+
+class TransactionProbe:
+    """发送通知时检查调度器会话是否仍持有事务，以及提醒标记是否已提交"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self):
+        return self
+
+    def send_notification(self, user, message, notification_type='reminder'):
+        in_transaction = db.session().in_transaction()
+        # 另一个连接读取并写入，调度器持有写锁时 SQLite 会立即报 database is locked
+        with db.engine.connect() as connection:
+            connection.execute(text('PRAGMA busy_timeout = 0'))
+            reminded = connection.execute(select(AttendanceRecord.clock_in_reminded).where(
+                AttendanceRecord.user_id == user.id)).scalar()
+            connection.execute(text("UPDATE system_configs SET value = value WHERE key = 'reminder_enabled'"))
+            connection.commit()
+        self.calls.append((user.id, notification_type, in_transaction, reminded))
+
+
+def test_reminders_sent_outside_transaction(fresh_app, now_at, monkeypatch):
+    probe = TransactionProbe()
+    monkeypatch.setattr(scheduler, 'notification_factory', probe)
+    monkeypatch.setattr(scheduler, '_materialized_on', None)
+    with fresh_app.app_context():
+        user = User(username='alice', is_active=True)
+        user.set_password('123456')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        shift_id = ShiftType.query.filter_by(name='A班').one().id
+        db.session.add(Schedule(user_id=user_id, shift_type_id=shift_id, work_date=now_at(0).date()))
+        db.session.commit()
+
+        scheduler._check_schedules(now_at(0))
+        # A班 09:00 上班，提醒 08:45 到期
+        scheduler._check_schedules(now_at(8, 50))
+
+        assert probe.calls == [(user_id, 'check_in', False, True)]
+        assert ReminderJob.query.filter_by(user_id=user_id, kind='check_in').one().state == SENT
+
+        # 已标记提醒，重复检查不再发送
+        scheduler._check_schedules(now_at(8, 55))
+        assert len(probe.calls) == 1
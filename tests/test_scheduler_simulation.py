@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调度器模拟测试
+用虚拟时钟运行一整天，检查提醒不重复、不遗漏、不在窗口外发送
+确保中文字符编码正确处理
+"""
+
+from datetime import datetime
+
+from app.utils.simulation import simulate
+from conftest import clear_process_caches
+
+
+def test_simulated_day_sends_every_reminder_once():
+    clear_process_caches()
+    # 模拟数据周末休息，固定从周三开始
+    start = datetime(2026, 10, 21)
+    report = simulate(300, start, days=1)
+    assert report['expected'] > 0
+    assert report['duplicates'] == 0
+    assert report['outside_window'] == 0
+    assert report['missed'] == 0
+    assert report['lag_seconds']['max'] == 0
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+班次管理表单测试
+确保中文字符编码正确处理
+"""
+
+from datetime import time
+
+from app.models import ShiftType, time_to_minute
+
+
+def shift_form(**fields):
+    return dict({'name': 'C班', 'start_time': '08:00', 'end_time': '16:30', 'color': '#2ecc71',
+                 'description': '', 'min_staff': '2', 'max_staff': '5'}, **fields)
+
+
+def saved_shift(app, name):
+    with app.app_context():
+        shift = ShiftType.query.filter_by(name=name).one()
+        return (shift.id, shift.start_time, shift.end_time, shift.start_minute, shift.end_minute,
+                shift.min_staff, shift.max_staff)
+
+
+def test_create_and_edit_shift_staffing(fresh_app, fresh_client):
+    response = fresh_client.post('/shift/create', data=shift_form())
+    assert response.status_code == 302
+    shift_id, *values = saved_shift(fresh_app, 'C班')
+    assert values == ['08:00', '16:30', 480, 990, 2, 5]
+
+    page = fresh_client.get(f'/shift/{shift_id}/edit')
+    assert page.status_code == 200
+    assert 'value="08:00"' in page.get_data(as_text=True)
+
+    response = fresh_client.post(f'/shift/{shift_id}/edit',
+                                 data=shift_form(start_time='09:15', min_staff='3', max_staff=''))
+    assert response.status_code == 302
+    assert saved_shift(fresh_app, 'C班')[1:] == ('09:15', '16:30', 555, 990, 3, None)
+
+
+def test_shift_form_rejects_max_below_min(fresh_app, fresh_client):
+    response = fresh_client.post('/shift/create', data=shift_form(min_staff='4', max_staff='2'))
+    assert response.status_code == 200
+    assert '最多人数不能少于最少人数' in response.get_data(as_text=True)
+    with fresh_app.app_context():
+        assert ShiftType.query.filter_by(name='C班').count() == 0
+
+
+def test_create_overnight_shift(fresh_app, fresh_client):
+    response = fresh_client.post('/shift/create', data=shift_form(name='夜班', start_time='22:00', end_time='06:00'))
+    assert response.status_code == 302
+    assert saved_shift(fresh_app, '夜班')[1:5] == ('22:00', '06:00', 1320, 360)
+
+
+def test_shift_form_rejects_zero_length_shift(fresh_app, fresh_client):
+    response = fresh_client.post('/shift/create', data=shift_form(start_time='08:00', end_time='08:00'))
+    assert response.status_code == 200
+    assert '结束时间不能与开始时间相同' in response.get_data(as_text=True)
+
+
+def test_time_to_minute_accepts_time():
+    assert time_to_minute(time(22, 30)) == 1350
+    assert time_to_minute('06:00') == 360
+    assert time_to_minute('25:00') is None